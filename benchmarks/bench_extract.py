@@ -0,0 +1,59 @@
+"""
+Microbenchmark for the PEP HTML extraction backends.
+
+Runs every available backend over the saved PEP pages in tests/fixtures/peps,
+checks that each produces exactly the same text as the bs4 reference, and
+reports the per-page time and speedup.
+
+Usage:
+    uv run python benchmarks/bench_extract.py [--repeat 50] [--fixtures DIR]
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+from pep2testcase.core.agents.tools.extract import available_extractors, get_extractor
+
+DEFAULT_FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "peps"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PEP HTML extraction backends.")
+    parser.add_argument("--repeat", type=int, default=50, help="Iterations per page")
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES, help="Directory of saved PEP HTML")
+    args = parser.parse_args()
+
+    pages = {p.name: p.read_bytes() for p in sorted(args.fixtures.glob("*.html"))}
+    if not pages:
+        print(f"No HTML fixtures found in {args.fixtures}")
+        return 1
+
+    reference = get_extractor("bs4")
+    expected = {name: reference(html) for name, html in pages.items()}
+    backends = available_extractors()
+
+    timings = {}
+    mismatches = []
+    for backend in backends:
+        extract = get_extractor(backend)
+        for name, html in pages.items():
+            if extract(html) != expected[name]:
+                mismatches.append((backend, name))
+        seconds = timeit.timeit(lambda: [extract(h) for h in pages.values()], number=args.repeat)
+        timings[backend] = seconds / (args.repeat * len(pages))
+
+    base = timings["bs4"]
+    print(f"{len(pages)} pages x {args.repeat} iterations")
+    print(f"{'backend':<10}{'ms/page':>10}{'speedup':>10}")
+    for backend in backends:
+        print(f"{backend:<10}{timings[backend] * 1000:>10.3f}{base / timings[backend]:>9.1f}x")
+
+    if mismatches:
+        for backend, name in mismatches:
+            print(f"MISMATCH: {backend} differs from bs4 on {name}")
+        return 1
+    print("All backends produced identical text.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Benchmark for the tester prompt serializer.
+
+Builds a synthetic knowledge graph with ``--requirements`` requirements spread over a
+nested module tree, then times the previous recursive string-concatenation formatter
+against serialize_knowledge_graph (unbudgeted, budgeted with priority truncation, and
+compact), and reports the prompt sizes. ``--depth`` instead nests the modules as
+chains of that depth: the recursive formatter re-copies each subtree's text at every
+level (O(requirements x depth)), while the serializer stays linear.
+
+Usage:
+    uv run python benchmarks/bench_kg_serializer.py [--requirements 12000] [--budget 60000] [--depth 0]
+"""
+import argparse
+import random
+import time
+
+from pep2testcase.core.agents.tester.serialize import serialize_knowledge_graph
+from pep2testcase.core.schema import FeatureModule, PepKnowledgeGraph, RequirementAtom
+from pep2testcase.core.tokens import count_tokens
+
+def legacy_format_module(module: FeatureModule, level: int = 1) -> str:
+    """The tester's original recursive formatter, kept for comparison."""
+    indent = "#" * level
+    text = f"{indent} Module: {module.name}\n"
+    if module.description:
+        text += f"Description: {module.description}\n"
+    if module.requirements:
+        text += "Requirements:\n"
+        for req in module.requirements:
+            text += f"- [{req.id}] ({req.priority}) {req.description}\n"
+            text += f"  Quote: {req.source_quote}\n"
+    text += "\n"
+    for sub in module.sub_modules:
+        text += legacy_format_module(sub, level + 1)
+    return text
+
+def legacy_format_knowledge_graph(kg: PepKnowledgeGraph) -> str:
+    text = f"PEP Title: {kg.title}\nStatus: {kg.status}\n\n"
+    if kg.global_constraints:
+        text += "Global Constraints:\n"
+        for req in kg.global_constraints:
+            text += f"- [{req.id}] ({req.priority}) {req.description}\n"
+        text += "\n"
+    if kg.ambiguities:
+        text += "Ambiguities (Handle carefully):\n"
+        for amb in kg.ambiguities:
+            text += f"- {amb}\n"
+        text += "\n"
+    text += "--- Feature Modules ---\n"
+    for module in kg.root_modules:
+        text += legacy_format_module(module, 1)
+    return text
+
+WORDS = (
+    "server application callable MUST SHOULD MAY return iterable bytes header status "
+    "environ request response stream buffer error exception unicode encoding close"
+).split()
+
+def synthetic_graph(n: int, rng: random.Random, depth: int = 0) -> PepKnowledgeGraph:
+    counter = 0
+
+    def sentence(k: int) -> str:
+        return " ".join(rng.choices(WORDS, k=k))
+
+    def module(level: int, path: str) -> FeatureModule:
+        nonlocal counter
+        reqs = []
+        for _ in range(rng.randint(5, 15)):
+            counter += 1
+            tags = rng.sample(["Syntax", "Errors", "Encoding", "Streaming", "Headers"], 2)
+            reqs.append(RequirementAtom(
+                id=f"REQ-{counter:05d}", description=sentence(14), priority=rng.choice(["Must", "Should", "May"]),
+                source_quote=sentence(20), context_tags=tags,
+            ))
+        subs = [module(level + 1, f"{path}.{i}") for i in range(rng.randint(1, 3))] if level < 3 else []
+        return FeatureModule(name=f"Module {path}", description=sentence(10), requirements=reqs, sub_modules=subs)
+
+    def chain(path: str) -> FeatureModule:
+        nonlocal counter
+        node = None
+        for level in reversed(range(depth)):
+            reqs = []
+            for _ in range(max(1, n // (depth * 20))):
+                counter += 1
+                reqs.append(RequirementAtom(
+                    id=f"REQ-{counter:05d}", description=sentence(14), priority=rng.choice(["Must", "Should", "May"]),
+                    source_quote=sentence(20),
+                ))
+            node = FeatureModule(name=f"Module {path}.{level}", requirements=reqs, sub_modules=[node] if node else [])
+        return node
+
+    roots = []
+    while counter < n:
+        roots.append(chain(str(len(roots))) if depth else module(0, str(len(roots))))
+    return PepKnowledgeGraph(title="PEP 9999 - Synthetic", status="Draft", root_modules=roots, ambiguities=["a", "b"])
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tester knowledge graph serializer.")
+    parser.add_argument("--requirements", type=int, default=12000, help="Requirements in the synthetic graph")
+    parser.add_argument("--budget", type=int, default=60000, help="Token budget for the truncated run")
+    parser.add_argument("--depth", type=int, default=0, help="Nest modules as chains of this depth (0 = bushy tree)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant (best time is reported)")
+    args = parser.parse_args()
+
+    kg = synthetic_graph(args.requirements, random.Random(0), args.depth)
+
+    legacy, legacy_time = timed(lambda: legacy_format_knowledge_graph(kg), args.repeat)
+    full, full_time = timed(lambda: serialize_knowledge_graph(kg), args.repeat)
+    assert full.text == legacy, "serializer output differs from the legacy formatter"
+    budgeted, budget_time = timed(lambda: serialize_knowledge_graph(kg, budget=args.budget), args.repeat)
+    compact, compact_time = timed(lambda: serialize_knowledge_graph(kg, compact=True), args.repeat)
+
+    print(f"Graph: {full.requirements} requirements")
+    print(f"legacy recursive +=       {legacy_time * 1000:8.1f}ms  {count_tokens(legacy):>9} tokens")
+    print(f"serializer                {full_time * 1000:8.1f}ms  {count_tokens(full.text):>9} tokens")
+    print(f"serializer compact        {compact_time * 1000:8.1f}ms  {count_tokens(compact.text):>9} tokens")
+    print(
+        f"serializer budget {args.budget:<7} {budget_time * 1000:8.1f}ms  {count_tokens(budgeted.text):>9} tokens "
+        f"({budgeted.included} requirements kept, omitted {dict(budgeted.dropped)})"
+    )
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,52 @@
+"""
+Measures the Lead Researcher system prompt size with the primary PEP inlined
+("full") versus preamble + table of contents ("toc").
+
+The system prompt is resent on every lead turn, so the difference is the saving
+per model call. Runs over the saved PEP pages in tests/fixtures/peps, or over
+any directory of PEP HTML.
+
+Usage:
+    uv run python benchmarks/bench_lead_prompt.py [--fixtures DIR]
+"""
+import argparse
+from pathlib import Path
+
+from pep2testcase.core.agents.researcher.prompts import (
+    LEAD_RESEARCHER_PROMPT, PRIMARY_CONTENT_FULL, PRIMARY_CONTENT_TOC
+)
+from pep2testcase.core.agents.tools.extract import get_extractor
+from pep2testcase.core.sections import parse_sections, render_toc
+from pep2testcase.core.tokens import count_tokens
+
+DEFAULT_FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "peps"
+
+def lead_prompt(primary_content: str, url: str) -> str:
+    return LEAD_RESEARCHER_PROMPT.format(
+        date="2025-01-01", pep_url=url, primary_content=primary_content, max_iterations=3, max_concurrent=3
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare lead prompt tokens: full content vs TOC.")
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES, help="Directory of PEP HTML pages")
+    args = parser.parse_args()
+
+    extract = get_extractor()
+    print(f"{'page':<28}{'full':>10}{'toc':>10}{'saved':>8}")
+    total_full = total_toc = 0
+    for path in sorted(args.fixtures.glob("*.html")):
+        html = path.read_bytes()
+        url = f"https://peps.python.org/{path.stem}/"
+        tree = parse_sections(html, "html")
+        full = count_tokens(lead_prompt(PRIMARY_CONTENT_FULL.format(raw_content=extract(html)), url))
+        toc = count_tokens(lead_prompt(
+            PRIMARY_CONTENT_TOC.format(pep_url=url, preamble=tree.preamble, toc=render_toc(tree)), url
+        ))
+        total_full += full
+        total_toc += toc
+        print(f"{path.name:<28}{full:>10}{toc:>10}{100 * (full - toc) / full:>7.0f}%")
+    if total_full:
+        print(f"{'total':<28}{total_full:>10}{total_toc:>10}{100 * (total_full - total_toc) / total_full:>7.0f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark for the offline BM25 search backend.
+
+Builds an index of ``--docs`` synthetic documents sampled from the words of the
+saved PEP pages in tests/fixtures/peps (roughly PEP-sized), then reports the
+build time, the incremental re-index time for 1% changed documents, and the
+median / p99 query latency.
+
+Usage:
+    uv run python benchmarks/bench_local_search.py [--docs 700] [--queries 500]
+"""
+import argparse
+import random
+import statistics
+import time
+from pathlib import Path
+
+from pep2testcase.core.agents.tools.extract import get_extractor
+from pep2testcase.core.search_index import BM25Index
+
+DEFAULT_FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "peps"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local BM25 search index.")
+    parser.add_argument("--docs", type=int, default=700, help="Number of synthetic documents")
+    parser.add_argument("--words", type=int, default=4000, help="Words per document")
+    parser.add_argument("--queries", type=int, default=500, help="Number of timed queries")
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES, help="Directory of saved PEP HTML")
+    args = parser.parse_args()
+
+    extract = get_extractor()
+    vocabulary = []
+    for page in sorted(args.fixtures.glob("*.html")):
+        vocabulary.extend(extract(page.read_bytes()).split())
+    if not vocabulary:
+        print(f"No HTML fixtures found in {args.fixtures}")
+        return 1
+
+    rng = random.Random(0)
+    def document() -> str:
+        return " ".join(rng.choices(vocabulary, k=args.words))
+
+    index = BM25Index()
+    started = time.perf_counter()
+    for i in range(args.docs):
+        index.add(f"doc:{i}", f"https://example.org/{i}", f"Document {i}", document(), "1")
+    build = time.perf_counter() - started
+
+    changed = max(1, args.docs // 100)
+    started = time.perf_counter()
+    for i in rng.sample(range(args.docs), changed):
+        index.add(f"doc:{i}", f"https://example.org/{i}", f"Document {i}", document(), "2")
+    update = time.perf_counter() - started
+
+    queries = [" ".join(rng.choices(vocabulary, k=rng.randint(2, 6))) for _ in range(args.queries)]
+    index.search(queries[0])  # Warm up the length norms
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+
+    print(f"Indexed {args.docs} docs x {args.words} words in {build:.2f}s ({len(index.postings)} terms)")
+    print(f"Re-indexed {changed} changed docs in {update * 1000:.1f}ms")
+    print(f"Query latency over {args.queries} queries: "
+          f"median {statistics.median(latencies):.3f}ms, p99 {latencies[int(len(latencies) * 0.99) - 1]:.3f}ms")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+import json
+from pathlib import Path
+from typing import Optional
+
+from rich.console import Console
+from rich.panel import Panel
+
+from pep2testcase.core.agents.tester.coverage import CoverageReport, build_coverage
+from pep2testcase.core.artifacts import render_markdown
+from pep2testcase.core.schema import TestPlan, PepKnowledgeGraph
+
+console = Console()
+
+def artifact_dir_for(url: str, output_dir: str | Path) -> Path:
+    """The per-PEP artifact directory, e.g. <output_dir>/pep-0008."""
+    # Extract PEP number for folder name if possible
+    pep_id = url.rstrip("/").split("-")[-1]
+    if not pep_id.isdigit():
+        pep_id = "output"
+    return Path(output_dir) / f"pep-{pep_id}"
+
+def save_artifacts(pep_url: str, final_state: dict, output_dir: Path, verbose: bool = True) -> Optional[CoverageReport]:
+    """Saves intermediate and final artifacts to disk; returns the coverage of the test plan."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    coverage = None
+
+    def report(message: str):
+        if verbose:
+            console.print(message)
+    
+    # 1. Save Knowledge Graph
+    kg = final_state.get("knowledge_graph")
+    if kg and isinstance(kg, PepKnowledgeGraph):
+        kg_path = output_dir / "knowledge_graph.json"
+        with open(kg_path, "w") as f:
+            f.write(kg.model_dump_json(indent=2))
+        report(f"[green]✅ Saved Knowledge Graph to:[/green] {kg_path}")
+    
+    # 2. Save Test Plan (JSON)
+    plan = final_state.get("test_plan")
+    if plan and isinstance(plan, TestPlan):
+        plan_json_path = output_dir / "test_plan.json"
+        with open(plan_json_path, "w") as f:
+            f.write(plan.model_dump_json(indent=2))
+        report(f"[green]✅ Saved Test Plan (JSON) to:[/green] {plan_json_path}")
+        
+        # 3. Save Test Plan (Markdown)
+        md_content = render_markdown(plan)
+        plan_md_path = output_dir / "test_plan.md"
+        with open(plan_md_path, "w") as f:
+            f.write(md_content)
+        report(f"[green]✅ Saved Test Plan (Markdown) to:[/green] {plan_md_path}")
+
+        # 4. Save Coverage Index
+        if kg and isinstance(kg, PepKnowledgeGraph):
+            coverage = build_coverage(kg, plan)
+            coverage_path = output_dir / "coverage.json"
+            with open(coverage_path, "w") as f:
+                json.dump(coverage.to_dict(), f, indent=2)
+            report(f"[green]✅ Saved Coverage to:[/green] {coverage_path} ({coverage.summary()})")
+        
+        # Show summary
+        if not verbose:
+            pass
+        elif final_state.get("current_phase") == "error":
+            console.print(Panel(
+                f"Test design failed; kept the {len(plan.test_cases)} test cases generated before the error.",
+                title="[bold yellow]Workflow Incomplete[/]",
+                border_style="yellow"
+            ))
+        else:
+            console.print(Panel(
+                f"Successfully generated {len(plan.test_cases)} test cases.",
+                title="[bold green]Workflow Complete[/]",
+                border_style="green"
+            ))
+    return coverage
@@ -0,0 +1,199 @@
+import argparse
+import asyncio
+import json
+import logging
+import re
+import sys
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Iterable, Optional
+
+from rich.console import Console
+
+from pep2testcase.cli.artifacts import artifact_dir_for, save_artifacts
+from pep2testcase.cli.options import add_run_options, apply_run_options
+from pep2testcase.core.checkpoint import new_run_id, open_checkpointer, prepare_resume, run_config
+from pep2testcase.core.config import settings
+from pep2testcase.core.corpus import canonical_pep_url, normalize_pep_url
+from pep2testcase.core.graph import create_graph
+from pep2testcase.core.http import aclose_clients
+from pep2testcase.core.metrics import MetricsRecorder
+from pep2testcase.core.state import RunContext
+
+logger = logging.getLogger(__name__)
+console = Console()
+
+_NUMBER_RE = re.compile(r"^(?:pep-?)?(\d{1,4})$", re.IGNORECASE)
+_RANGE_RE = re.compile(r"^(\d{1,4})-(\d{1,4})$")
+
+def parse_targets(items: Iterable[str]) -> list[str]:
+    """
+    PEP URLs for batch arguments: URLs, PEP numbers ("8", "pep-0008") and inclusive
+    ranges ("1-20"). Duplicates are dropped, keeping the first occurrence.
+    """
+    urls = []
+    for item in items:
+        item = item.strip()
+        if not item or item.startswith("#"):
+            continue
+        if match := _RANGE_RE.match(item):
+            start, end = int(match.group(1)), int(match.group(2))
+            urls.extend(canonical_pep_url(n) for n in range(start, end + 1))
+        elif match := _NUMBER_RE.match(item):
+            urls.append(canonical_pep_url(int(match.group(1))))
+        elif "://" in item:
+            urls.append(normalize_pep_url(item))
+        else:
+            raise ValueError(f"Not a PEP URL, number or range: {item!r}")
+    return list(dict.fromkeys(urls))
+
+async def run_one(app, url: str, output_dir: Path, run_id: Optional[str] = None, resume: bool = False) -> dict:
+    """
+    Runs the workflow for one PEP without the live UI and returns its summary entry.
+    With a ``run_id`` the run is checkpointed under it, and ``resume`` continues that
+    run from its failed or interrupted phase instead of starting over.
+    """
+    artifact_dir = artifact_dir_for(url, output_dir)
+    metrics = MetricsRecorder(url)
+    config = run_config(url, run_id) if run_id else None
+    entry = {"url": url, "artifact_dir": str(artifact_dir), "run_id": run_id}
+    started = time.perf_counter()
+    try:
+        node = await prepare_resume(app, config) if resume and config else "researcher"
+        if node is None:
+            final_state = (await app.aget_state(config)).values
+        else:
+            graph_input = {"pep_url": url, "artifact_dir": str(artifact_dir)} if node == "researcher" else None
+            final_state = await app.ainvoke(graph_input, config, context=RunContext(metrics=metrics))
+    except Exception as e:
+        logger.error(f"Run for {url} failed: {e}", exc_info=True)
+        entry.update(status="failed", error=str(e), test_cases=0, coverage=None)
+    else:
+        coverage = save_artifacts(url, final_state, artifact_dir, verbose=False)
+        plan = final_state.get("test_plan")
+        entry.update(
+            status="done" if final_state.get("current_phase") == "done" else "error",
+            test_cases=len(plan.test_cases) if plan else 0,
+            coverage=round(coverage.percent(), 1) if coverage else None,
+        )
+        if entry["status"] == "error":
+            # The nodes report failures through current_phase; the log has the details
+            phase = "research" if final_state.get("knowledge_graph") is None else "test design"
+            entry["error"] = f"{phase} phase failed"
+    metrics.write(artifact_dir / "metrics.json")
+    totals = metrics.totals()
+    entry.update(
+        duration_s=round(time.perf_counter() - started, 1),
+        tokens=totals.prompt_tokens + totals.completion_tokens,
+        cost_usd=round(totals.cost_usd, 4),
+    )
+    return entry
+
+async def run_batch(urls: list[str], output_dir: str, concurrency: int) -> list[dict]:
+    """
+    Runs the workflow for every URL with at most ``concurrency`` PEPs in flight. All
+    runs share one compiled graph and the process-wide HTTP pools, caches and model
+    rate limiter, so throughput scales with concurrency up to the provider limits.
+    """
+    output = Path(output_dir)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    done = 0
+
+    async with AsyncExitStack() as stack:
+        checkpointer = None
+        if settings.checkpoint.ENABLED:
+            checkpointer = await stack.enter_async_context(open_checkpointer())
+        app = create_graph(checkpointer)
+
+        async def run(url: str) -> dict:
+            nonlocal done
+            async with semaphore:
+                entry = await run_one(app, url, output, new_run_id() if checkpointer else None)
+            done += 1
+            color = {"done": "green", "error": "yellow"}.get(entry["status"], "red")
+            console.print(
+                f"[{color}][{done}/{len(urls)}] {entry['status']:<6}[/] {url}: {entry['test_cases']} test cases "
+                f"({entry['duration_s']}s, ${entry['cost_usd']:.4f})"
+            )
+            return entry
+
+        try:
+            return list(await asyncio.gather(*(run(url) for url in urls)))
+        finally:
+            await aclose_clients()
+
+def write_summary(entries: list[dict], output_dir: str | Path, wall_clock_s: float) -> tuple[Path, Path]:
+    """Writes batch_summary.json and batch_summary.md to the output directory."""
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    counts = {status: sum(e["status"] == status for e in entries) for status in ("done", "error", "failed")}
+    summary = {
+        "peps": len(entries),
+        **counts,
+        "test_cases": sum(e["test_cases"] for e in entries),
+        "tokens": sum(e["tokens"] for e in entries),
+        "cost_usd": round(sum(e["cost_usd"] for e in entries), 4),
+        "wall_clock_s": round(wall_clock_s, 1),
+        "runs": entries,
+    }
+    json_path = output / "batch_summary.json"
+    json_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+    lines = [
+        "# Batch Summary",
+        "",
+        f"{len(entries)} PEPs: {counts['done']} done, {counts['error']} incomplete, {counts['failed']} failed; "
+        f"{summary['test_cases']} test cases, {summary['tokens']} tokens, ${summary['cost_usd']:.4f}, "
+        f"{summary['wall_clock_s']}s wall clock.",
+        "",
+        "| PEP | Status | Test Cases | Coverage | Time | Cost |",
+        "|---|---|---|---|---|---|",
+    ]
+    for e in entries:
+        coverage = f"{e['coverage']}%" if e["coverage"] is not None else "-"
+        lines.append(
+            f"| {e['url']} | {e['status']} | {e['test_cases']} | {coverage} | {e['duration_s']}s | ${e['cost_usd']:.4f} |"
+        )
+    md_path = output / "batch_summary.md"
+    md_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return json_path, md_path
+
+def batch_main(argv: list[str]):
+    """
+    `pep2testcase batch TARGET... [--file FILE]`: generates test plans for many PEPs in
+    one process, running up to --concurrency workflows at a time.
+    """
+    parser = argparse.ArgumentParser(
+        prog="pep2testcase batch",
+        description="Generate test plans for many PEPs concurrently.",
+    )
+    parser.add_argument("targets", nargs="*", help="PEP URLs, numbers (8) or ranges (1-20)")
+    parser.add_argument("--file", "-f", help="File with one URL, number or range per line (# comments)")
+    parser.add_argument(
+        "--concurrency", "-j", type=int, default=None,
+        help=f"PEPs processed at the same time (default: PEP2TC_BATCH_CONCURRENCY or {settings.batch.CONCURRENCY})",
+    )
+    add_run_options(parser)
+    args = parser.parse_args(argv)
+
+    items = list(args.targets)
+    if args.file:
+        items.extend(Path(args.file).read_text(encoding="utf-8").splitlines())
+    try:
+        urls = parse_targets(items)
+    except ValueError as e:
+        console.print(f"[bold red]Error:[/] {e}")
+        sys.exit(1)
+    if not urls:
+        parser.error("no PEPs given")
+    apply_run_options(args)
+
+    concurrency = args.concurrency or settings.batch.CONCURRENCY
+    console.print(f"Processing {len(urls)} PEPs with concurrency {concurrency}...")
+    started = time.perf_counter()
+    entries = asyncio.run(run_batch(urls, args.output_dir, concurrency))
+    json_path, md_path = write_summary(entries, args.output_dir, time.perf_counter() - started)
+    console.print(f"[green]✅ Saved Batch Summary to:[/green] {json_path} and {md_path}")
+    if any(e["status"] == "failed" for e in entries):
+        sys.exit(1)
@@ -0,0 +1,33 @@
+import argparse
+import sys
+from pathlib import Path
+
+from rich.console import Console
+
+from pep2testcase.core.corpus import PepCorpus, default_corpus_path
+
+console = Console()
+
+def ingest_main(argv: list[str]):
+    """
+    `pep2testcase ingest SOURCE`: bulk-loads a python/peps checkout, a built HTML tree
+    or a tarball of either into the offline corpus used by fetch_pep_content.
+    """
+    parser = argparse.ArgumentParser(
+        prog="pep2testcase ingest",
+        description="Load local PEP sources (directory or tarball) into the offline corpus.",
+    )
+    parser.add_argument("source", help="Directory or tarball containing pep-NNNN.rst/.txt/.html files")
+    parser.add_argument("--db", help="Corpus SQLite file (default: PEP2TC_CORPUS_PATH or the cache directory)")
+    args = parser.parse_args(argv)
+
+    source = Path(args.source)
+    if not source.exists():
+        console.print(f"[bold red]Error:[/] {source} does not exist.")
+        sys.exit(1)
+
+    corpus = PepCorpus(args.db or default_corpus_path())
+    with console.status(f"Ingesting PEPs from {source}..."):
+        count = corpus.ingest(source)
+    console.print(f"[green]✅ Ingested {count} PEPs into:[/green] {corpus.path} ({len(corpus)} total)")
+    corpus.close()
@@ -4,17 +4,29 @@ import os
 import logging
 import asyncio
 import json
+from contextlib import AsyncExitStack
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 
 from rich.console import Console
 from rich.logging import RichHandler
-from rich.panel import Panel
 from rich.markdown import Markdown
+from rich.table import Table
 
+from pep2testcase.core.checkpoint import find_run, new_run_id, open_checkpointer, prepare_resume, run_config
+from pep2testcase.core.config import settings
 from pep2testcase.core.graph import create_graph
-from pep2testcase.core.schema import TestPlan, PepKnowledgeGraph
 from pep2testcase.cli.ui import UIManager
+from pep2testcase.cli.artifacts import artifact_dir_for, save_artifacts
+from pep2testcase.cli.batch import batch_main
+from pep2testcase.cli.ingest import ingest_main
+from pep2testcase.cli.options import add_run_options, apply_run_options
+from pep2testcase.cli.worker import enqueue_main, worker_main
+from pep2testcase.core.cache import get_fetch_cache, get_kg_store, get_llm_cache, get_report_store
+from pep2testcase.core.http import aclose_clients
+from pep2testcase.core.metrics import MetricsRecorder
+from pep2testcase.core.state import RunContext
 
 # Load environment variables
 load_dotenv()
@@ -37,126 +49,151 @@ logger = logging.getLogger("pep2tc")
 # Use a fallback console for non-UI output (like errors before UI starts)
 fallback_console = Console()
 
-def render_markdown(plan: TestPlan) -> str:
-    """Renders the TestPlan to a Markdown string."""
-    md = [f"# Test Plan: {plan.pep_title}", ""]
-    
-    md.append(f"**Total Test Cases:** {len(plan.test_cases)}")
-    md.append("")
-    
-    for tc in plan.test_cases:
-        md.append(f"## {tc.id}: {tc.title}")
-        md.append(f"**Type:** {tc.test_type} | **Related Reqs:** {', '.join(tc.related_req_ids)}")
-        md.append("")
-        md.append(f"**Description:** {tc.description}")
-        md.append("")
-        
-        if tc.preconditions:
-            md.append("**Preconditions:**")
-            for pre in tc.preconditions:
-                md.append(f"- {pre}")
-            md.append("")
-            
-        md.append("**Steps:**")
-        for i, step in enumerate(tc.steps, 1):
-            md.append(f"{i}. {step}")
-        md.append("")
-        
-        md.append(f"**Expected Result:** {tc.expected_result}")
-        md.append("")
-        md.append("---")
-        md.append("")
-        
-    return "\n".join(md)
+def save_metrics(metrics: MetricsRecorder, output_dir: Path):
+    """Writes metrics.json next to the artifacts and prints the per-phase totals."""
+    path = metrics.write(output_dir / "metrics.json")
+    fallback_console.print(f"[green]✅ Saved Metrics to:[/green] {path}")
+    table = Table(title="Model Usage", title_justify="left")
+    for column in ("Phase", "Agent", "Calls", "Cache Hits", "Prompt", "Cached", "Completion", "Tools", "Latency", "Cost"):
+        table.add_column(column, justify="left" if column in ("Phase", "Agent") else "right")
+    for phase, data in metrics.to_dict()["phases"].items():
+        for agent, t in data["agents"].items():
+            table.add_row(
+                phase, agent, str(t["calls"]), str(t["cache_hits"]), str(t["prompt_tokens"]), str(t["cached_tokens"]),
+                str(t["completion_tokens"]), str(t["tool_calls"]), f"{t['latency_s']:.1f}s", f"${t['cost_usd']:.4f}",
+            )
+    fallback_console.print(table)
 
-def save_artifacts(pep_url: str, final_state: dict, output_dir: Path):
-    """Saves intermediate and final artifacts to disk."""
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # 1. Save Knowledge Graph
-    kg = final_state.get("knowledge_graph")
-    if kg and isinstance(kg, PepKnowledgeGraph):
-        kg_path = output_dir / "knowledge_graph.json"
-        with open(kg_path, "w") as f:
-            f.write(kg.model_dump_json(indent=2))
-        fallback_console.print(f"[green]✅ Saved Knowledge Graph to:[/green] {kg_path}")
-    
-    # 2. Save Test Plan (JSON)
-    plan = final_state.get("test_plan")
-    if plan and isinstance(plan, TestPlan):
-        plan_json_path = output_dir / "test_plan.json"
-        with open(plan_json_path, "w") as f:
-            f.write(plan.model_dump_json(indent=2))
-        fallback_console.print(f"[green]✅ Saved Test Plan (JSON) to:[/green] {plan_json_path}")
-        
-        # 3. Save Test Plan (Markdown)
-        md_content = render_markdown(plan)
-        plan_md_path = output_dir / "test_plan.md"
-        with open(plan_md_path, "w") as f:
-            f.write(md_content)
-        fallback_console.print(f"[green]✅ Saved Test Plan (Markdown) to:[/green] {plan_md_path}")
-        
-        # Show summary
-        fallback_console.print(Panel(
-            f"Successfully generated {len(plan.test_cases)} test cases.",
-            title="[bold green]Workflow Complete[/]",
-            border_style="green"
-        ))
+def report_cache_stats():
+    """Prints fetch / LLM cache counters so repeat runs can confirm they stayed offline."""
+    cache = get_fetch_cache()
+    if cache:
+        stats = cache.stats
+        fallback_console.print(
+            f"[dim]Fetch cache: {stats.hits} hits, {stats.misses} misses, "
+            f"{stats.revalidated} revalidated, {stats.evictions} evicted[/dim]"
+        )
+    llm_cache = get_llm_cache()
+    if llm_cache:
+        stats = llm_cache.stats
+        fallback_console.print(
+            f"[dim]LLM cache: {stats.hits} hits, {stats.misses} misses, {stats.evictions} evicted[/dim]"
+        )
+    kg_store = get_kg_store()
+    if kg_store and (kg_store.stats.hits or kg_store.stats.misses):
+        stats = kg_store.stats
+        fallback_console.print(f"[dim]Knowledge graph store: {stats.hits} hits, {stats.misses} misses[/dim]")
+    report_store = get_report_store()
+    if report_store and (report_store.stats.hits or report_store.stats.misses):
+        stats = report_store.stats
+        fallback_console.print(
+            f"[dim]Sub-agent reports: {stats.hits} stored, {stats.misses} missed, {stats.invalidated} invalidated[/dim]"
+        )
 
-async def run_workflow(url: str, output_dir: str):
+async def run_workflow(url: str, output_dir: str, resume: Optional[str] = None):
     # Initialize UI Manager
     ui = UIManager(url)
     
-    # Extract PEP number for folder name if possible
-    pep_id = url.rstrip("/").split("-")[-1]
-    if not pep_id.isdigit():
-        pep_id = "output"
-    
-    artifact_dir = Path(output_dir) / f"pep-{pep_id}"
+    artifact_dir = artifact_dir_for(url, output_dir)
     
-    app = create_graph()
+    metrics = MetricsRecorder(url)
+    ui.attach_metrics(metrics)
     
-    # Initial State with UI Manager injected
+    # The UI Manager and metrics travel in the run context, so they stay out of the checkpoints
+    context = RunContext(ui_manager=ui, metrics=metrics)
     initial_state = {
         "pep_url": url,
-        "ui_manager": ui
+        "artifact_dir": str(artifact_dir),
     }
     
-    ui.start()
-    try:
-        ui.set_phase("Starting Workflow...")
-        
-        # We invoke the graph. The middleware inside nodes will update UI via ui_manager
-        final_state = await app.ainvoke(initial_state)
-        
-        ui.stop()
-        
-        save_artifacts(url, final_state, artifact_dir)
-            
-    except Exception as e:
-        ui.stop()
-        logger.error(f"Workflow failed: {e}", exc_info=True)
-        fallback_console.print(f"[bold red]Workflow failed:[/bold red] {e}")
-        sys.exit(1)
-    finally:
-        # Ensure UI is stopped if something crashes hard
+    run_id = None
+    async with AsyncExitStack() as stack:
+        checkpointer = None
+        if settings.checkpoint.ENABLED or resume:
+            checkpointer = await stack.enter_async_context(open_checkpointer())
+        app = create_graph(checkpointer)
+
+        graph_input = initial_state
+        if resume:
+            run_id = await find_run(checkpointer, url, None if resume == "latest" else resume)
+            if run_id is None:
+                fallback_console.print(f"[yellow]No checkpointed run found for {url}; starting a new run.[/yellow]")
+            else:
+                config = run_config(url, run_id)
+                node = await prepare_resume(app, config)
+                if node is None:
+                    fallback_console.print(f"[green]Run {run_id} already completed; saving its artifacts again.[/green]")
+                    save_artifacts(url, (await app.aget_state(config)).values, artifact_dir)
+                    await aclose_clients()
+                    return
+                fallback_console.print(f"[cyan]Resuming run {run_id} from the {node} phase[/cyan]")
+                if node != "researcher":
+                    graph_input = None
+        if run_id is None:
+            run_id = new_run_id()
+        config = run_config(url, run_id) if checkpointer else None
+
+        ui.start()
         try:
+            ui.set_phase("Starting Workflow...")
+            
+            # We invoke the graph. The middleware inside nodes will update UI via ui_manager
+            final_state = await app.ainvoke(graph_input, config, context=context)
+            
+            ui.stop()
+            
+            save_artifacts(url, final_state, artifact_dir)
+            save_metrics(metrics, artifact_dir)
+            report_cache_stats()
+            if checkpointer and final_state.get("current_phase") == "error":
+                fallback_console.print(f"[dim]Retry the failed phase with: pep2testcase {url} --resume {run_id}[/dim]")
+                
+        except Exception as e:
             ui.stop()
-        except:
-            pass
+            logger.error(f"Workflow failed: {e}", exc_info=True)
+            fallback_console.print(f"[bold red]Workflow failed:[/bold red] {e}")
+            if checkpointer:
+                fallback_console.print(f"[dim]Continue from the last completed phase with: pep2testcase {url} --resume {run_id}[/dim]")
+            sys.exit(1)
+        finally:
+            # Ensure UI is stopped if something crashes hard
+            try:
+                ui.stop()
+            except:
+                pass
+            await aclose_clients()
+
+# Subcommands dispatched on the first argument; anything else is treated as a PEP URL.
+COMMANDS = {
+    "batch": batch_main,
+    "enqueue": enqueue_main,
+    "ingest": ingest_main,
+    "worker": worker_main,
+}
 
 def main():
-    parser = argparse.ArgumentParser(description="PEP-2-TestCase: Generate test cases from PEP URL.")
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="PEP-2-TestCase: Generate test cases from PEP URL.",
+        epilog=f"Other commands: {', '.join(COMMANDS)} (run `pep2testcase <command> --help`).",
+    )
     parser.add_argument("url", help="The URL of the PEP (e.g., https://peps.python.org/pep-0008/)")
-    parser.add_argument("--output-dir", "-o", help="Directory to save artifacts", default="artifacts")
+    add_run_options(parser)
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="RUN_ID",
+        help="Continue the latest (or the given) checkpointed run of this PEP, retrying only the failed phase",
+    )
     
     args = parser.parse_args()
-    
-    if not os.getenv("OPENAI_API_KEY"):
-        fallback_console.print("[bold red]Error:[/] OPENAI_API_KEY not found. Please set it in .env file.")
-        sys.exit(1)
+    apply_run_options(args)
         
-    asyncio.run(run_workflow(args.url, args.output_dir))
+    asyncio.run(run_workflow(args.url, args.output_dir, args.resume))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,47 @@
+import argparse
+import os
+import sys
+
+from rich.console import Console
+
+console = Console()
+
+def add_run_options(parser: argparse.ArgumentParser, output_dir: bool = True):
+    """Options shared by every command that runs the workflow."""
+    if output_dir:
+        parser.add_argument("--output-dir", "-o", help="Directory to save artifacts", default="artifacts")
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Answer every model call from the LLM cache and fail on a miss (deterministic reruns / CI)",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Research the PEP again even if a knowledge graph for its current text is stored",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Start designing tests for modules as soon as research finalizes them",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep the previous run's tests for unchanged requirements; only design tests for added or changed ones",
+    )
+
+def apply_run_options(args: argparse.Namespace):
+    """Turns the shared options into settings and checks the API key is available."""
+    if args.replay:
+        os.environ["PEP2TC_LLM_REPLAY"] = "1"
+    if args.refresh:
+        os.environ["PEP2TC_KG_REFRESH"] = "1"
+    if args.pipeline:
+        os.environ["PEP2TC_PIPELINE"] = "1"
+    if args.incremental:
+        os.environ["PEP2TC_TEST_INCREMENTAL"] = "1"
+    
+    if not os.getenv("OPENAI_API_KEY") and not args.replay:
+        console.print("[bold red]Error:[/] OPENAI_API_KEY not found. Please set it in .env file.")
+        sys.exit(1)
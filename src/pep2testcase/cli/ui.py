@@ -24,6 +24,8 @@ class UIManager:
         self.main_todos: List[dict] = [] # Lead Agent's Plan
         self.sub_todos: List[dict] = []  # Sub Agent's Plan
         self.active_agent = "Lead Researcher" # Tracks who is currently executing
+        self.metrics = None  # core.metrics.MetricsRecorder, shown in the header
+        self.test_case_count: Optional[int] = None  # grows while test cases stream in
         
         self.logs: List[Any] = []  # Stores Renderables (Text, Panels, Trees)
         self.max_logs = 50
@@ -55,6 +57,16 @@ class UIManager:
         self.layout["plan"].update(self._render_plan())
         self.layout["logs"].update(self._render_logs())
 
+    def attach_metrics(self, metrics):
+        """Shows live token / cost totals from ``metrics`` in the header."""
+        self.metrics = metrics
+        metrics.listeners.append(self.update)
+        self.update()
+
+    def set_test_case_count(self, count: int):
+        self.test_case_count = count
+        self.update()
+
     def set_phase(self, phase: str):
         self.phase = phase
         self.update()
@@ -127,6 +139,10 @@ class UIManager:
             f"Phase: [bold magenta]{self.phase}[/]",
             f"Actor: [bold yellow]{self.active_agent}[/]"
         )
+        test_cases = f"Test cases: [bold green]{self.test_case_count}[/]" if self.test_case_count is not None else ""
+        if self.metrics is not None or test_cases:
+            summary = f"[dim]{self.metrics.summary()}[/]" if self.metrics is not None else ""
+            grid.add_row(summary, test_cases)
         return Panel(
             grid, 
             style="white on black", 
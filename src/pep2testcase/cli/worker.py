@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Optional
+
+from rich.console import Console
+from rich.table import Table
+
+from pep2testcase.cli.batch import parse_targets, run_one
+from pep2testcase.cli.options import add_run_options, apply_run_options
+from pep2testcase.core.checkpoint import new_run_id, open_checkpointer
+from pep2testcase.core.config import settings
+from pep2testcase.core.graph import create_graph
+from pep2testcase.core.http import aclose_clients
+from pep2testcase.core.jobs import Job, JobQueue, open_job_queue
+
+logger = logging.getLogger(__name__)
+console = Console()
+
+async def process_job(app, queue: JobQueue, job: Job, worker: str, checkpointed: bool) -> Optional[dict]:
+    """
+    Runs one claimed job, renewing its lease while it runs. A retried job resumes its
+    checkpointed run, so only the failed or interrupted phase is repeated. Returns the
+    run's summary entry, or None if the lease was lost to another worker.
+    """
+    run_id, resume = None, False
+    if checkpointed:
+        resume = job.run_id is not None
+        run_id = job.run_id or new_run_id()
+        if not resume:
+            queue.set_run_id(job.id, worker, run_id)
+    note = f" (resuming run {run_id})" if resume else ""
+    console.print(f"[cyan]{worker}[/] job {job.id} attempt {job.attempts}: {job.pep_url}{note}")
+
+    run = asyncio.create_task(run_one(app, job.pep_url, Path(job.output_dir), run_id, resume))
+    try:
+        while not (await asyncio.wait({run}, timeout=queue.lease / 3))[0]:
+            if not queue.heartbeat(job.id, worker):
+                logger.warning(f"Lost the lease on job {job.id}; abandoning it")
+                run.cancel()
+                await asyncio.gather(run, return_exceptions=True)
+                return None
+    except asyncio.CancelledError:
+        # Shutting down: the job goes back to the queue for the next worker
+        run.cancel()
+        await asyncio.gather(run, return_exceptions=True)
+        queue.release(job.id, worker)
+        raise
+
+    entry = run.result()
+    if entry["status"] == "done":
+        queue.complete(job.id, worker, entry)
+        console.print(
+            f"[green]{worker}[/] job {job.id} done: {job.pep_url}: {entry['test_cases']} test cases "
+            f"({entry['duration_s']}s, ${entry['cost_usd']:.4f})"
+        )
+    else:
+        error = entry["error"]
+        status = queue.fail(job.id, worker, error, entry)
+        verdict = "will be retried" if status == "queued" else "gave up"
+        console.print(f"[yellow]{worker}[/] job {job.id} {entry['status']} ({verdict}): {job.pep_url}: {error}")
+    return entry
+
+async def work(queue_path: Optional[str], drain: bool):
+    """A worker's loop: claims and runs jobs one at a time until stopped (or, with ``drain``, the queue is empty)."""
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    queue = open_job_queue(queue_path)
+    async with AsyncExitStack() as stack:
+        checkpointer = None
+        if settings.checkpoint.ENABLED:
+            checkpointer = await stack.enter_async_context(open_checkpointer())
+        app = create_graph(checkpointer)
+        try:
+            while True:
+                job = queue.claim(worker)
+                if job is not None:
+                    await process_job(app, queue, job, worker, checkpointer is not None)
+                elif drain and not queue.pending():
+                    break
+                else:
+                    await asyncio.sleep(settings.queue.POLL_INTERVAL)
+        finally:
+            await aclose_clients()
+            queue.close()
+
+def _worker_process(queue_path: Optional[str], drain: bool):
+    # Entry point of a spawned worker process; settings arrive through the inherited environment
+    logging.basicConfig(level=logging.WARNING, format=f"[worker {os.getpid()}] %(levelname)s %(message)s")
+    try:
+        asyncio.run(work(queue_path, drain))
+    except KeyboardInterrupt:
+        pass
+
+def supervise(processes: int, queue_path: Optional[str], drain: bool):
+    """
+    Starts ``processes`` worker processes and restarts any that crash, up to the
+    configured attempts per slot. A crashed worker's job is picked up again by any
+    worker once its lease runs out.
+    """
+    ctx = multiprocessing.get_context("spawn")
+
+    def start() -> multiprocessing.Process:
+        proc = ctx.Process(target=_worker_process, args=(queue_path, drain), daemon=False)
+        proc.start()
+        return proc
+
+    slots = {slot: start() for slot in range(processes)}
+    restarts = dict.fromkeys(slots, 0)
+    try:
+        while slots:
+            time.sleep(1)
+            for slot, proc in list(slots.items()):
+                if proc.is_alive():
+                    continue
+                del slots[slot]
+                if proc.exitcode == 0:
+                    continue
+                if restarts[slot] >= settings.queue.MAX_ATTEMPTS:
+                    console.print(f"[bold red]Worker {proc.pid} exited with code {proc.exitcode}; not restarting it again.[/]")
+                    continue
+                restarts[slot] += 1
+                console.print(f"[yellow]Worker {proc.pid} exited with code {proc.exitcode}; restarting it.[/]")
+                slots[slot] = start()
+    except KeyboardInterrupt:
+        # The workers got the interrupt too; they hand their jobs back and exit
+        console.print("Stopping workers...")
+        for proc in slots.values():
+            proc.join(timeout=30)
+            if proc.is_alive():
+                proc.terminate()
+
+def print_status(queue: JobQueue):
+    counts = queue.counts()
+    console.print(", ".join(f"{n} {status}" for status, n in counts.items()))
+    failed = queue.jobs("failed")
+    if failed:
+        table = Table(title="Failed Jobs", title_justify="left")
+        for column in ("Job", "PEP", "Attempts", "Error"):
+            table.add_column(column)
+        for job in failed:
+            table.add_row(str(job.id), job.pep_url, str(job.attempts), job.error or "")
+        console.print(table)
+
+def enqueue_main(argv: list[str]):
+    """
+    `pep2testcase enqueue TARGET... [--file FILE]`: adds PEP jobs to the local job queue
+    processed by `pep2testcase worker`.
+    """
+    parser = argparse.ArgumentParser(
+        prog="pep2testcase enqueue",
+        description="Add PEPs to the job queue processed by `pep2testcase worker`.",
+    )
+    parser.add_argument("targets", nargs="*", help="PEP URLs, numbers (8) or ranges (1-20)")
+    parser.add_argument("--file", "-f", help="File with one URL, number or range per line (# comments)")
+    parser.add_argument("--output-dir", "-o", help="Directory to save artifacts", default="artifacts")
+    parser.add_argument("--queue", help="Job queue SQLite file (default: PEP2TC_QUEUE_PATH or the cache directory)")
+    parser.add_argument("--status", action="store_true", help="Show the job counts and failed jobs")
+    args = parser.parse_args(argv)
+
+    items = list(args.targets)
+    if args.file:
+        items.extend(Path(args.file).read_text(encoding="utf-8").splitlines())
+    try:
+        urls = parse_targets(items)
+    except ValueError as e:
+        console.print(f"[bold red]Error:[/] {e}")
+        sys.exit(1)
+    if not urls and not args.status:
+        parser.error("no PEPs given")
+
+    queue = open_job_queue(args.queue)
+    # Workers may run from another directory
+    output_dir = os.path.abspath(args.output_dir)
+    created = sum(queue.enqueue(url, output_dir)[1] for url in urls)
+    if urls:
+        console.print(f"[green]✅ Queued {created} jobs[/green] ({len(urls) - created} already pending) in {queue.path}")
+    print_status(queue)
+    queue.close()
+
+def worker_main(argv: list[str]):
+    """
+    `pep2testcase worker [--processes N]`: runs queued PEP jobs in N processes, each
+    with its own event loop, so large runs use every core.
+    """
+    parser = argparse.ArgumentParser(
+        prog="pep2testcase worker",
+        description="Process queued PEP jobs in several worker processes.",
+    )
+    parser.add_argument(
+        "--processes", "-p", type=int, default=None,
+        help=f"Worker processes (default: PEP2TC_WORKER_PROCESSES or the CPU count, {settings.queue.WORKER_PROCESSES})",
+    )
+    parser.add_argument("--drain", action="store_true", help="Exit once no jobs are queued or running")
+    parser.add_argument("--queue", help="Job queue SQLite file (default: PEP2TC_QUEUE_PATH or the cache directory)")
+    add_run_options(parser, output_dir=False)
+    args = parser.parse_args(argv)
+    apply_run_options(args)
+
+    processes = max(1, args.processes or settings.queue.WORKER_PROCESSES)
+    queue = open_job_queue(args.queue)
+    console.print(f"Starting {processes} workers on {queue.path} ({queue.pending()} jobs pending)...")
+    queue.close()
+    supervise(processes, args.queue, args.drain)
+    if args.drain:
+        queue = open_job_queue(args.queue)
+        print_status(queue)
+        queue.close()
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from typing import Optional
+from langgraph.runtime import Runtime
+
+from pep2testcase.core.state import AgentState, RunContext, run_context
+from pep2testcase.core.schema import FeatureModule, ModuleTests, PepKnowledgeGraph, TestCase
+from pep2testcase.core.config import settings
+from pep2testcase.core.agents.researcher import node as researcher
+from pep2testcase.core.agents.tester import node as tester
+from pep2testcase.core.agents.tester.incremental import load_previous
+from pep2testcase.core.agents.tester.shards import count_requirements
+from pep2testcase.core.agents.tools.modules import module_sink
+
+logger = logging.getLogger(__name__)
+
+class ModulePipeline:
+    """
+    Designs tests for the modules the lead researcher finalizes (``finalize_module``)
+    while the research continues, with at most ``concurrency`` tester calls at a time.
+    A module reported again under the same name replaces the earlier version.
+    The PEP title is not known before the final graph, so the modules are designed
+    untitled; early_tests_baseline and order_by_requirements use the final graph's title.
+    """
+
+    def __init__(self, chain, metrics=None, ui_manager=None, concurrency: int = 4):
+        self.chain = chain
+        self.metrics = metrics
+        self.ui_manager = ui_manager
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._loop = asyncio.get_running_loop()
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._cases = 0
+
+    def submit(self, module: FeatureModule) -> str:
+        """The finalize_module sink; starts test design for the module and returns the tool result."""
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._start(module)
+        else:
+            self._loop.call_soon_threadsafe(self._start, module)
+        return (
+            f"Module '{module.name}' ({count_requirements(module)} requirements) handed to test design. "
+            f"Keep it unchanged in the final knowledge graph."
+        )
+
+    def _start(self, module: FeatureModule):
+        previous = self._tasks.pop(module.name, None)
+        if previous is not None:
+            previous.cancel()
+            logger.info(f"Module '{module.name}' was finalized again; designing its tests anew")
+        self._tasks[module.name] = asyncio.create_task(self._design(module))
+        if self.ui_manager:
+            self.ui_manager.add_log(f"[cyan]Module finalized:[/] {module.name} (test design started)")
+
+    def _on_case(self, case: TestCase):
+        self._cases += 1
+        if self.ui_manager:
+            self.ui_manager.set_test_case_count(self._cases)
+
+    async def _design(self, module: FeatureModule) -> ModuleTests:
+        kg = PepKnowledgeGraph(title="", status="", root_modules=[module])
+        async with self._semaphore:
+            if tester.should_shard(kg):
+                plan = await tester.design_sharded(self.chain, kg, self.metrics, None, self._on_case)
+            else:
+                spec_text = tester.PIPELINE_NOTE + tester.format_knowledge_graph(kg).text
+                plan = await tester.design_test_plan(self.chain, spec_text, self.metrics, self._on_case)
+        logger.info(f"Pipelined test design for '{module.name}': {len(plan.test_cases)} test cases")
+        return ModuleTests(module=module, test_cases=plan.test_cases)
+
+    async def results(self) -> list[ModuleTests]:
+        """Waits for the outstanding designs; modules whose design failed are left to the tester phase."""
+        names = list(self._tasks)
+        outcomes = await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        results = []
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.warning(f"Pipelined test design for '{name}' failed: {outcome}")
+            else:
+                results.append(outcome)
+        return results
+
+    def cancel(self):
+        for task in self._tasks.values():
+            task.cancel()
+
+async def pipelined_research_node(state: AgentState, runtime: Optional[Runtime[RunContext]] = None):
+    """
+    Phase 1 with test design running alongside it: every module the lead reports through
+    finalize_module is designed right away, and the results travel in ``early_tests``.
+    The tester phase then keeps the tests of modules that are unchanged in the final graph
+    and only designs the rest, so the run takes about max(research, test) instead of both.
+    """
+    context = run_context(runtime)
+    if settings.tester.INCREMENTAL and state.artifact_dir and load_previous(state.artifact_dir) is not None:
+        # The previous run's tests are reused instead; nothing needs designing early
+        return await researcher.research_node(state, runtime)
+
+    pipeline = ModulePipeline(
+        tester.build_tester_chain(), context.metrics, context.ui_manager, settings.tester.CONCURRENCY,
+    )
+    token = module_sink.set(pipeline.submit)
+    try:
+        update = await researcher.research_node(state, runtime)
+    except BaseException:
+        pipeline.cancel()
+        raise
+    finally:
+        module_sink.reset(token)
+
+    if update.get("knowledge_graph") is None:
+        pipeline.cancel()
+        return update
+    early = await pipeline.results()
+    if early:
+        logger.info(
+            f"{len(early)} modules were designed during research "
+            f"({sum(len(m.test_cases) for m in early)} test cases)"
+        )
+    return {**update, "early_tests": early}
@@ -1,30 +1,95 @@
+import hashlib
+import json
 import os
 from datetime import date
+from typing import Optional
 from deepagents import create_deep_agent
 from langchain_core.messages import HumanMessage
+from langgraph.runtime import Runtime
 
-from pep2testcase.core.state import AgentState
+from pep2testcase.core.cache import get_kg_store, get_report_store
+from pep2testcase.core.state import AgentState, RunContext, run_context
 from pep2testcase.core.schema import PepKnowledgeGraph
-from pep2testcase.core.agents.tools.fetcher import fetch_pep_content
-from pep2testcase.core.llm import get_model
+from pep2testcase.core.agents.tools.fetcher import acompress_pep_content, afetch_pep_page, fetch_pep_tool
+from pep2testcase.core.agents.tools.modules import finalize_module_tool, module_sink
+from pep2testcase.core.agents.tools.prefetch import prefetch_references
+from pep2testcase.core.agents.tools.sections import aload_pep_sections, get_pep_section_tool
+from pep2testcase.core.config import settings
+from pep2testcase.core.llm import get_fallback_model, get_model
+from pep2testcase.core.sections import render_toc
+from pep2testcase.core.tokens import count_tokens
 
-from .prompts import LEAD_RESEARCHER_PROMPT, SUB_RESEARCHER_PROMPT
+from .prompts import LEAD_RESEARCHER_PROMPT, SUB_RESEARCHER_PROMPT, PRIMARY_CONTENT_FULL, PRIMARY_CONTENT_TOC, PIPELINE_INSTRUCTIONS
 from pep2testcase.core.agents.tools.search import internet_search
-from pep2testcase.core.middleware import SimpleToolLoggerMiddleware
+from pep2testcase.core.middleware import (
+    DelegationBudget, DelegationSchedulerMiddleware, MetricsMiddleware, OverloadFallbackMiddleware,
+    ReportMemoMiddleware, SimpleToolLoggerMiddleware,
+)
 
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def research_node(state: AgentState):
+async def build_primary_content(pep_url: str, raw_content: str) -> str:
+    """
+    Builds the primary content block of the Lead prompt.
+    In "toc" mode a large PEP is replaced by its preamble and table of contents, which the
+    lead expands with get_pep_section; falls back to the full text if parsing fails.
+    """
+    full = PRIMARY_CONTENT_FULL.format(raw_content=raw_content)
+    if settings.research.LEAD_CONTEXT != "toc":
+        return full
+    full_tokens = count_tokens(full)
+    if full_tokens < settings.research.TOC_MIN_TOKENS:
+        return full
+
+    try:
+        tree = await aload_pep_sections(pep_url)
+    except Exception as e:
+        logger.warning(f"Could not build section tree for {pep_url}, inlining full content: {e}")
+        return full
+    if not tree.sections:
+        return full
+
+    toc = PRIMARY_CONTENT_TOC.format(pep_url=pep_url, preamble=tree.preamble, toc=render_toc(tree))
+    toc_tokens = count_tokens(toc)
+    saved = 100 * (full_tokens - toc_tokens) / full_tokens
+    logger.info(
+        f"Lead prompt primary content: {toc_tokens} tokens with TOC vs {full_tokens} inlined "
+        f"({saved:.0f}% fewer prompt tokens per lead turn)"
+    )
+    return toc
+
+def research_prompt_version() -> str:
+    """
+    Changes whenever the research prompts or the knowledge graph schema change.
+    PIPELINE_INSTRUCTIONS is left out: it changes when modules are reported, not the graph.
+    """
+    source = json.dumps(
+        [LEAD_RESEARCHER_PROMPT, SUB_RESEARCHER_PROMPT, PRIMARY_CONTENT_FULL, PRIMARY_CONTENT_TOC,
+         PepKnowledgeGraph.model_json_schema()],
+        sort_keys=True,
+    )
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+def research_model_key() -> str:
+    return f"{settings.model.LEAD_MODEL_NAME}+{settings.model.SUB_MODEL_NAME}"
+
+def sub_report_version() -> str:
+    """Sub-agent setup a stored report is only valid for: its model and prompt."""
+    prompt = hashlib.sha256(SUB_RESEARCHER_PROMPT.encode("utf-8")).hexdigest()[:16]
+    return f"{settings.model.SUB_MODEL_NAME}:{prompt}"
+
+async def research_node(state: AgentState, runtime: Optional[Runtime[RunContext]] = None):
     """
     Agent node that performs deep research on the PEP content using a Multi-Agent system.
     """
     logger.info("--- [Phase 1] Starting Deep Research (Multi-Agent) ---")
+    context = run_context(runtime)
     
     # Update UI if available
-    if hasattr(state, "ui_manager") and state.ui_manager:
-        state.ui_manager.set_phase("Phase 1: 需求分析 Agent")
+    if context.ui_manager:
+        context.ui_manager.set_phase("Phase 1: 需求分析 Agent")
     
     # 1. Prepare Context & Prompts
     today = date.today().isoformat()
@@ -34,57 +99,110 @@ async def research_node(state: AgentState):
     # but the agent can also fetch it.
     # Let's fetch it if missing so we can provide a snippet in the initial message.
     raw_content = state.raw_pep_content
+    # The downloaded page, so compression does not request it again
+    html = None
     if not raw_content:
         logger.info(f"Fetching PEP from {pep_url}...")
-        # Since fetch_pep_content is sync, we run it directly. 
-        # In a fully async world, we might want to run_in_executor or make it async.
-        raw_content = fetch_pep_content(pep_url)
+        raw_content, html = await afetch_pep_page(pep_url)
         # Store back in state later
+
+    # An unchanged PEP researched with the same models and prompts has a stored graph.
+    # A failed or empty fetch is not PEP text: nothing is stored under it or served for it
+    fetched = bool(raw_content.strip()) and not raw_content.startswith("Error fetching")
+    store = get_kg_store() if fetched else None
+    prompt_version = research_prompt_version()
+    if store is not None and not settings.research.KG_REFRESH:
+        knowledge_graph = store.get(raw_content, research_model_key(), prompt_version)
+        if knowledge_graph is not None:
+            logger.info(f"Reusing stored knowledge graph for {pep_url} (PEP content unchanged); skipping research")
+            if context.ui_manager:
+                context.ui_manager.add_log("[green]Reusing stored knowledge graph[/] (PEP unchanged, use --refresh to research again)")
+            return {
+                "raw_pep_content": raw_content,
+                "knowledge_graph": knowledge_graph,
+                "current_phase": "research_done",
+            }
+
+    # Warm the fetch cache with referenced PEPs so sub-agent fetches are instant
+    await prefetch_references(pep_url, raw_content)
     
-    # Format Prompts
+    # Format Prompts (from the compressed text; raw_content is kept as fetched in the state)
+    prompt_content = await acompress_pep_content(pep_url, raw_content, html)
+    primary_content = await build_primary_content(pep_url, prompt_content)
     lead_prompt = LEAD_RESEARCHER_PROMPT.format(
         date=today,
         pep_url=pep_url,
-        raw_content=raw_content,
-        max_iterations=3,
-        max_concurrent=3
+        primary_content=primary_content,
+        max_iterations=settings.research.MAX_ROUNDS,
+        max_concurrent=settings.research.MAX_CONCURRENT
     )
     
+    # In pipelined mode the lead reports settled modules so their tests are designed early
+    lead_tools = [fetch_pep_tool, get_pep_section_tool] # Lead can also fetch directly
+    if module_sink.get() is not None:
+        lead_prompt += PIPELINE_INSTRUCTIONS
+        lead_tools.append(finalize_module_tool)
+    
     sub_prompt = SUB_RESEARCHER_PROMPT.format(
         date=today
     )
     
-    # Initialize Model from factory
-    model_instance = get_model()
+    # Initialize Models from factory: the lead plans and synthesises, sub-researchers
+    # mostly read and summarise and can run on a cheaper, faster model.
+    lead_model = get_model(role="lead")
+    sub_model = get_model(role="sub")
     
-    # Retrieve UI Manager from state if available (injected by graph config)
-    ui_manager = state.ui_manager if hasattr(state, "ui_manager") else None
+    # Retrieve UI Manager from the run context if available (injected by the CLI)
+    ui_manager = context.ui_manager
     
     # Create Middleware
     lead_middleware = SimpleToolLoggerMiddleware(ui_manager=ui_manager, agent_name="Lead Researcher")
     sub_middleware = SimpleToolLoggerMiddleware(ui_manager=ui_manager, agent_name="Sub Researcher")
+    metrics = context.metrics
+    lead_metrics = MetricsMiddleware(metrics, agent_name="Lead Researcher", phase="research")
+    sub_metrics = MetricsMiddleware(metrics, agent_name="Sub Researcher", phase="research")
+    # The delegation limits stated in the lead prompt, enforced, plus a time / token budget
+    budget = DelegationBudget(
+        max_concurrent=settings.research.MAX_CONCURRENT,
+        max_rounds=settings.research.MAX_ROUNDS,
+        max_seconds=settings.research.TIME_BUDGET,
+        max_tokens=settings.research.TOKEN_BUDGET,
+    )
+    lead_extra = [DelegationSchedulerMiddleware(budget, agent_name="Lead Researcher", ui_manager=ui_manager)]
+    sub_extra = [DelegationSchedulerMiddleware(budget, agent_name="Sub Researcher", lead=False)]
+    # Reports of earlier runs answer repeated delegations while the sources they read are unchanged
+    if (report_store := get_report_store()) is not None:
+        memo = dict(store=report_store, source_tools=[fetch_pep_tool, get_pep_section_tool], version=sub_report_version())
+        lead_extra.insert(0, ReportMemoMiddleware(
+            **memo, refresh=settings.research.KG_REFRESH, agent_name="Lead Researcher", ui_manager=ui_manager,
+        ))
+        sub_extra.append(ReportMemoMiddleware(**memo, lead=False, agent_name="Sub Researcher"))
+    if (fallback := get_fallback_model(role="lead")) is not None:
+        lead_extra.append(OverloadFallbackMiddleware(fallback, agent_name="Lead Researcher"))
+    if (fallback := get_fallback_model(role="sub")) is not None:
+        sub_extra.append(OverloadFallbackMiddleware(fallback, agent_name="Sub Researcher"))
     
     # 2. Define Sub Agent
     research_subagent_config = {
         "name": "research_subagent",
         "description": "Used to research specific in-depth questions, check dependencies, or verify edge cases.",
         "system_prompt": sub_prompt,
-        "tools": [internet_search, fetch_pep_content],
-        "model": model_instance,
-        "middleware": [sub_middleware], # Specific middleware for Sub Agent
+        "tools": [internet_search, fetch_pep_tool, get_pep_section_tool],
+        "model": sub_model,
+        "middleware": [sub_middleware, sub_metrics, *sub_extra], # Specific middleware for Sub Agent
     }
     
     # 3. Create Deep Agent (Lead)
     # response_format=PepKnowledgeGraph ensures the final output is structured
     
     agent = create_deep_agent(
-        model=model_instance,
+        model=lead_model,
         subagents=[research_subagent_config],
         system_prompt=lead_prompt,
-        tools=[fetch_pep_content], # Lead can also fetch directly
+        tools=lead_tools,
         response_format=PepKnowledgeGraph,
         name="lead_researcher",
-        middleware=[lead_middleware], # Specific middleware for Lead Agent
+        middleware=[lead_middleware, lead_metrics, *lead_extra], # Specific middleware for Lead Agent
         debug=False
     )
     
@@ -92,7 +210,7 @@ async def research_node(state: AgentState):
     # We provide the initial instruction.
     initial_instruction = (
         f"Please research the PEP at {pep_url}.\n"
-        f"The full content is provided in your system prompt.\n"
+        f"The primary content (or its table of contents) is provided in your system prompt.\n"
         f"Analyze it first, then use Sub-Researchers to investigate references or ambiguities.\n"
         f"Please generate the complete PepKnowledgeGraph."
     )
@@ -118,6 +236,8 @@ async def research_node(state: AgentState):
         
         if knowledge_graph:
             logger.info(f"Research Complete. Found {len(knowledge_graph.root_modules)} root modules.")
+            if store is not None:
+                store.put(pep_url, raw_content, research_model_key(), prompt_version, knowledge_graph)
         
         return {
             "raw_pep_content": raw_content,
@@ -0,0 +1,68 @@
+from dataclasses import dataclass, field
+
+from pep2testcase.core.schema import PepKnowledgeGraph, TestPlan
+from .incremental import iter_requirements
+from .serialize import PRIORITIES
+
+@dataclass
+class CoverageReport:
+    # Requirement ID -> priority, in document order
+    requirements: dict[str, str] = field(default_factory=dict)
+    # Requirement ID -> IDs of the test cases referencing it
+    tests: dict[str, list[str]] = field(default_factory=dict)
+    # (test case ID, referenced ID) pairs that point at no requirement of the graph
+    dangling: list[tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def uncovered(self) -> list[str]:
+        return [req_id for req_id in self.requirements if not self.tests.get(req_id)]
+
+    @property
+    def complete(self) -> bool:
+        return not self.uncovered
+
+    def by_priority(self) -> dict[str, tuple[int, int]]:
+        """(covered, total) per priority, Must/Should/May first."""
+        counts = {p: [0, 0] for p in PRIORITIES}
+        for req_id, priority in self.requirements.items():
+            entry = counts.setdefault(priority, [0, 0])
+            entry[1] += 1
+            entry[0] += bool(self.tests.get(req_id))
+        return {p: (covered, total) for p, (covered, total) in counts.items() if total}
+
+    def percent(self) -> float:
+        if not self.requirements:
+            return 100.0
+        return 100.0 * (len(self.requirements) - len(self.uncovered)) / len(self.requirements)
+
+    def summary(self) -> str:
+        parts = [f"{self.percent():.1f}% of {len(self.requirements)} requirements covered"]
+        parts += [f"{p} {100.0 * c / t:.0f}%" for p, (c, t) in self.by_priority().items()]
+        if self.dangling:
+            parts.append(f"{len(self.dangling)} dangling references")
+        return ", ".join(parts)
+
+    def to_dict(self) -> dict:
+        return {
+            "requirements": len(self.requirements),
+            "covered": len(self.requirements) - len(self.uncovered),
+            "percent": round(self.percent(), 2),
+            "by_priority": {
+                p: {"covered": c, "total": t, "percent": round(100.0 * c / t, 2)}
+                for p, (c, t) in self.by_priority().items()
+            },
+            "uncovered": self.uncovered,
+            "dangling": [{"test_case": tc, "requirement": req} for tc, req in self.dangling],
+            "tests": {req_id: self.tests.get(req_id, []) for req_id in self.requirements},
+        }
+
+def build_coverage(kg: PepKnowledgeGraph, plan: TestPlan) -> CoverageReport:
+    """Indexes which test cases reference each requirement of the graph."""
+    report = CoverageReport(requirements={req.id: req.priority for req in iter_requirements(kg)})
+    for case in plan.test_cases:
+        for req_id in dict.fromkeys(case.related_req_ids):
+            if req_id in report.requirements:
+                report.tests.setdefault(req_id, []).append(case.id)
+            else:
+                report.dangling.append((case.id, req_id))
+    return report
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+from pep2testcase.core.schema import FeatureModule, PepKnowledgeGraph, RequirementAtom, TestCase, TestPlan
+
+logger = logging.getLogger(__name__)
+
+def requirement_hash(req: RequirementAtom) -> str:
+    """Content hash of a requirement; whitespace-only edits do not count as changes."""
+    payload = json.dumps(
+        [req.id, " ".join(req.description.split()), req.priority,
+         " ".join(req.source_quote.split()), sorted(req.context_tags)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def iter_requirements(kg: PepKnowledgeGraph) -> Iterable[RequirementAtom]:
+    yield from kg.global_constraints
+    stack = list(reversed(kg.root_modules))
+    while stack:
+        module = stack.pop()
+        yield from module.requirements
+        stack.extend(reversed(module.sub_modules))
+
+@dataclass
+class GraphDiff:
+    added: set[str] = field(default_factory=set)
+    changed: set[str] = field(default_factory=set)
+    removed: set[str] = field(default_factory=set)
+    unchanged: set[str] = field(default_factory=set)
+
+    @property
+    def regenerate(self) -> set[str]:
+        return self.added | self.changed
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.changed)} changed, "
+            f"{len(self.removed)} removed, {len(self.unchanged)} unchanged"
+        )
+
+def diff_graphs(old: PepKnowledgeGraph, new: PepKnowledgeGraph) -> GraphDiff:
+    """Compares requirements by ID and content hash."""
+    old_hashes = {req.id: requirement_hash(req) for req in iter_requirements(old)}
+    diff = GraphDiff()
+    for req in iter_requirements(new):
+        previous = old_hashes.pop(req.id, None)
+        if previous is None:
+            diff.added.add(req.id)
+        elif previous != requirement_hash(req):
+            diff.changed.add(req.id)
+        else:
+            diff.unchanged.add(req.id)
+    diff.removed = set(old_hashes)
+    return diff
+
+def _prune(module: FeatureModule, keep: set[str]) -> Optional[FeatureModule]:
+    subs = [pruned for sub in module.sub_modules if (pruned := _prune(sub, keep)) is not None]
+    reqs = [req for req in module.requirements if req.id in keep]
+    if not reqs and not subs:
+        return None
+    return module.model_copy(update={"requirements": reqs, "sub_modules": subs})
+
+def subgraph(kg: PepKnowledgeGraph, keep: set[str]) -> PepKnowledgeGraph:
+    """The graph restricted to the requirements in ``keep`` (empty modules are dropped)."""
+    return kg.model_copy(update={
+        "root_modules": [pruned for m in kg.root_modules if (pruned := _prune(m, keep)) is not None],
+        "global_constraints": [req for req in kg.global_constraints if req.id in keep],
+    })
+
+def carry_over(plan: TestPlan, diff: GraphDiff) -> list[TestCase]:
+    """
+    Test cases from the previous plan that stay valid: cases covering a changed
+    requirement are dropped (they are regenerated), cases covering only removed
+    requirements are dropped, and removed IDs are pruned from the rest.
+    """
+    kept = []
+    for case in plan.test_cases:
+        related = set(case.related_req_ids)
+        if related & diff.changed:
+            continue
+        if related and related <= diff.removed:
+            continue
+        if related & diff.removed:
+            case = case.model_copy(update={
+                "related_req_ids": [r for r in case.related_req_ids if r not in diff.removed]
+            })
+        kept.append(case)
+    return kept
+
+_TC_NUMBER = re.compile(r"^TC-(\d+)$")
+
+def merge_incremental(title: str, kept: list[TestCase], new: list[TestCase]) -> TestPlan:
+    """
+    Appends regenerated cases after the kept ones. Kept cases keep their IDs, so test
+    plans stay diffable across revisions; new cases are numbered after the highest one.
+    """
+    numbers = [int(m.group(1)) for case in kept if (m := _TC_NUMBER.match(case.id))]
+    width = max([3] + [len(m.group(1)) for case in kept if (m := _TC_NUMBER.match(case.id))])
+    start = max(numbers, default=0)
+    renumbered = [
+        case.model_copy(update={"id": f"TC-{start + n:0{width}d}"}) for n, case in enumerate(new, 1)
+    ]
+    return TestPlan(pep_title=title, test_cases=kept + renumbered)
+
+def load_previous(artifact_dir: Path | str) -> Optional[tuple[PepKnowledgeGraph, TestPlan]]:
+    """The knowledge graph and test plan of the previous run, if both are readable."""
+    artifact_dir = Path(artifact_dir)
+    try:
+        kg = PepKnowledgeGraph.model_validate_json((artifact_dir / "knowledge_graph.json").read_text(encoding="utf-8"))
+        plan = TestPlan.model_validate_json((artifact_dir / "test_plan.json").read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logger.warning(f"Ignoring unreadable previous artifacts in {artifact_dir}: {e}")
+        return None
+    return kg, plan
@@ -1,9 +1,22 @@
+import asyncio
 import logging
+import time
+from pathlib import Path
+from typing import Callable, Optional
 from langchain_core.prompts import ChatPromptTemplate
+from langgraph.runtime import Runtime
 
-from pep2testcase.core.state import AgentState
-from pep2testcase.core.schema import TestPlan, PepKnowledgeGraph, FeatureModule
-from pep2testcase.core.llm import get_model
+from pep2testcase.core.state import AgentState, RunContext, run_context
+from pep2testcase.core.schema import TestPlan, TestCase, PepKnowledgeGraph
+from pep2testcase.core.artifacts import TestPlanWriter
+from pep2testcase.core.config import settings
+from pep2testcase.core.llm import OVERLOAD_ERRORS, get_fallback_model, get_model
+from .coverage import build_coverage
+from .incremental import carry_over, diff_graphs, load_previous, merge_incremental, subgraph
+from .pipeline import early_tests_baseline, order_by_requirements
+from .serialize import SerializedGraph, serialize_knowledge_graph
+from .shards import count_requirements, merge_test_plans, shard_knowledge_graph
+from .streaming import TestCaseStreamHandler, plan_from_message
 
 logger = logging.getLogger(__name__)
 
@@ -30,58 +43,181 @@ Each Test Case MUST have:
 - test_type: One of Positive, Negative, EdgeCase, Security, Performance.
 """
 
-def format_module(module: FeatureModule, level: int = 1) -> str:
-    """Recursively formats a feature module and its requirements."""
-    indent = "#" * level
-    text = f"{indent} Module: {module.name}\n"
-    if module.description:
-        text += f"Description: {module.description}\n"
-    
-    if module.requirements:
-        text += "Requirements:\n"
-        for req in module.requirements:
-            text += f"- [{req.id}] ({req.priority}) {req.description}\n"
-            text += f"  Quote: {req.source_quote}\n"
-    
-    text += "\n"
-    
-    for sub in module.sub_modules:
-        text += format_module(sub, level + 1)
-        
-    return text
-
-def format_knowledge_graph(kg: PepKnowledgeGraph) -> str:
-    """Formats the entire Knowledge Graph into a string for the prompt."""
-    text = f"PEP Title: {kg.title}\nStatus: {kg.status}\n\n"
+def format_knowledge_graph(kg: PepKnowledgeGraph) -> SerializedGraph:
+    """Formats the Knowledge Graph for the prompt, within the configured token budget."""
+    serialized = serialize_knowledge_graph(
+        kg,
+        budget=settings.tester.PROMPT_MAX_TOKENS or None,
+        compact=settings.tester.COMPACT_PROMPT,
+        model_name=settings.model.TESTER_MODEL_NAME,
+    )
+    if serialized.truncated:
+        logger.warning(
+            f"Tester prompt over budget: {serialized.included} of {serialized.requirements} "
+            f"requirements included ({dict(serialized.dropped)} omitted)"
+        )
+    return serialized
+
+OnCase = Callable[[TestCase], None]
+
+INCREMENTAL_NOTE = (
+    "(Incremental update: the PEP was revised. Tests for the other requirements are kept; "
+    "design tests only for the new or changed requirements below.)\n\n"
+)
+
+PIPELINE_NOTE = (
+    "(Pipelined design: research is still running, but this module is final. "
+    "Design tests only for the module below.)\n\n"
+)
+
+REMAINDER_NOTE = (
+    "(Tests for the other requirements were designed while research was running; "
+    "design tests only for the requirements below.)\n\n"
+)
+
+GAP_FILL_NOTE = (
+    "(Coverage follow-up: the test plan has no tests yet for the requirements below. "
+    "Design tests only for them.)\n\n"
+)
+
+def streaming_model(model):
+    """
+    Binds the TestPlan schema as a forced tool call and streams the response, so test
+    cases can be parsed while the arguments arrive. Responses still go through the
+    LLM cache (a cache hit returns the whole plan at once).
+    """
+    return model.bind_tools([TestPlan], tool_choice="TestPlan").bind(stream=True, stream_usage=True)
+
+def build_tester_chain():
+    """
+    The tester prompt and model with its fallback. Streaming chains (see streaming_model)
+    must be run with an ``on_case`` callback; the others return the raw message too,
+    so its usage can be recorded.
+    """
+    llm = get_model(temperature=0.2, role="tester")
+    fallback = get_fallback_model(temperature=0.2, role="tester")
+    if settings.tester.STREAM:
+        model = streaming_model(llm)
+        fallbacks = [streaming_model(fallback)] if fallback is not None else []
+    else:
+        model = llm.with_structured_output(TestPlan, include_raw=True)
+        fallbacks = [fallback.with_structured_output(TestPlan, include_raw=True)] if fallback is not None else []
+    if fallbacks:
+        model = model.with_fallbacks(fallbacks, exceptions_to_handle=OVERLOAD_ERRORS)
     
-    if kg.global_constraints:
-        text += "Global Constraints:\n"
-        for req in kg.global_constraints:
-            text += f"- [{req.id}] ({req.priority}) {req.description}\n"
-        text += "\n"
-        
-    if kg.ambiguities:
-        text += "Ambiguities (Handle carefully):\n"
-        for amb in kg.ambiguities:
-            text += f"- {amb}\n"
-        text += "\n"
-        
-    text += "--- Feature Modules ---\n"
-    for module in kg.root_modules:
-        text += format_module(module, 1)
-        
-    return text
-
-async def tester_node(state: AgentState):
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", TESTER_SYSTEM_PROMPT),
+        ("user", "Here is the PEP Knowledge Graph:\n\n{spec_text}")
+    ])
+    return prompt | model
+
+async def design_test_plan(
+    chain, spec_text: str, metrics=None, on_case: Optional[OnCase] = None, title: str = ""
+) -> TestPlan:
+    """
+    Runs one test design call and records its usage. With ``on_case`` the chain must
+    end in a streaming_model, and each test case is reported as soon as it is complete.
+    """
+    started = time.perf_counter()
+    if on_case is None:
+        output = await chain.ainvoke({"spec_text": spec_text})
+        if metrics is not None:
+            metrics.record("test_design", "Tester", output["raw"], time.perf_counter() - started)
+        test_plan = output["parsed"]
+        if test_plan is None:
+            raise output["parsing_error"] or ValueError("Model returned no TestPlan")
+        return test_plan
+
+    handler = TestCaseStreamHandler(on_case)
+    message = await chain.ainvoke({"spec_text": spec_text}, config={"callbacks": [handler]})
+    if metrics is not None:
+        metrics.record("test_design", "Tester", message, time.perf_counter() - started)
+    return plan_from_message(message, handler.cases, title)
+
+async def design_sharded(
+    chain, kg: PepKnowledgeGraph, metrics=None, ui_manager=None, on_case: Optional[OnCase] = None
+) -> TestPlan:
+    """
+    Designs tests for a large graph in shards (see shards.py) with bounded parallelism,
+    so no single call has to emit the whole plan, then merges them with fresh TC- IDs.
+    Streamed cases are reported with a provisional "S<shard>-" ID prefix.
+    """
+    shards = shard_knowledge_graph(kg, settings.tester.SHARD_MAX_REQUIREMENTS)
+    semaphore = asyncio.Semaphore(max(1, settings.tester.CONCURRENCY))
+    logger.info(f"Designing tests in {len(shards)} shards (concurrency {settings.tester.CONCURRENCY})...")
+
+    async def run(i: int, shard: PepKnowledgeGraph) -> TestPlan:
+        spec_text = f"(Part {i} of {len(shards)}; design tests only for the modules below.)\n\n"
+        spec_text += format_knowledge_graph(shard).text
+        shard_on_case = None
+        if on_case is not None:
+            def shard_on_case(case: TestCase):
+                on_case(case.model_copy(update={"id": f"S{i}-{case.id}"}))
+        async with semaphore:
+            plan = await design_test_plan(chain, spec_text, metrics, shard_on_case, kg.title)
+        logger.info(f"Shard {i}/{len(shards)}: {len(plan.test_cases)} test cases")
+        if ui_manager:
+            ui_manager.add_log(f"[green]Tester shard {i}/{len(shards)} done[/] ({len(plan.test_cases)} test cases)")
+        return plan
+
+    plans = await asyncio.gather(*(run(i, shard) for i, shard in enumerate(shards, 1)))
+    return merge_test_plans(kg.title, list(plans))
+
+async def fill_coverage_gaps(
+    chain, kg: PepKnowledgeGraph, plan: TestPlan, metrics=None, ui_manager=None, on_case: Optional[OnCase] = None
+) -> TestPlan:
+    """
+    Follow-up passes that ask the model only about requirements no test case references
+    (e.g. left out of a truncated prompt or skipped by the model), appending the results
+    after the existing cases. A failed pass keeps the plan as it is.
+    Streamed cases are reported with a provisional "GAP-" ID prefix.
+    """
+    gap_on_case = None
+    if on_case is not None:
+        def gap_on_case(case: TestCase):
+            on_case(case.model_copy(update={"id": f"GAP-{case.id}"}))
+
+    for n in range(1, settings.tester.GAP_FILL_PASSES + 1):
+        coverage = build_coverage(kg, plan)
+        if coverage.complete:
+            break
+        uncovered = coverage.uncovered
+        logger.info(f"Coverage gap-fill pass {n}: designing tests for {len(uncovered)} uncovered requirements")
+        if ui_manager:
+            ui_manager.add_log(f"[yellow]Tester gap-fill pass {n}[/] ({len(uncovered)} uncovered requirements)")
+        spec_text = GAP_FILL_NOTE + format_knowledge_graph(subgraph(kg, set(uncovered))).text
+        try:
+            extra = await design_test_plan(chain, spec_text, metrics, gap_on_case, kg.title)
+        except Exception as e:
+            logger.warning(f"Coverage gap-fill pass {n} failed: {e}")
+            break
+        plan = merge_incremental(kg.title, plan.test_cases, extra.test_cases)
+
+    coverage = build_coverage(kg, plan)
+    logger.info(f"Test coverage: {coverage.summary()}")
+    if not coverage.complete:
+        logger.warning(f"Requirements without test cases: {', '.join(coverage.uncovered)}")
+    return plan
+
+def should_shard(kg: PepKnowledgeGraph) -> bool:
+    mode = settings.tester.SHARDING
+    if mode == "always":
+        return True
+    if mode == "off":
+        return False
+    total = sum(count_requirements(m) for m in kg.root_modules) + len(kg.global_constraints)
+    return total > settings.tester.SHARD_MAX_REQUIREMENTS
+
+async def tester_node(state: AgentState, runtime: Optional[Runtime[RunContext]] = None):
     """
     Agent node that designs test cases based on the specification.
     """
-    # Initialize LLM from factory
-    llm = get_model(temperature=0.2)
+    context = run_context(runtime)
     
     # Update UI if available
-    if hasattr(state, "ui_manager") and state.ui_manager:
-        state.ui_manager.set_phase("Phase 2: Test Case 生成 Agent")
+    ui_manager = context.ui_manager
+    if ui_manager:
+        ui_manager.set_phase("Phase 2: Test Case 生成 Agent")
     
     logger.info("--- [Phase 2] Starting Test Case Design ---")
     
@@ -90,29 +226,103 @@ async def tester_node(state: AgentState):
         logger.error("Error: No Knowledge Graph found in state. Did the Researcher fail?")
         return {"current_phase": "error"}
     
-    # Prepare context from KG
-    spec_text = format_knowledge_graph(kg)
-        
-    # Count requirements for logging (rough count)
-    req_count = spec_text.count("REQ-")
-    logger.info(f"Designing tests for approx {req_count} requirements...")
-    
-    structured_llm = llm.with_structured_output(TestPlan)
+    artifact_dir = getattr(state, "artifact_dir", None)
+
+    # Incremental mode: keep the previous run's tests for unchanged requirements and
+    # only design tests for what was added or changed (or lost its tests). Tests designed
+    # during a pipelined research phase are reconciled the same way.
+    kept: list[TestCase] = []
+    target = kg
+    incremental = False
+    note = INCREMENTAL_NOTE
+    previous = load_previous(artifact_dir) if settings.tester.INCREMENTAL and artifact_dir else None
+    pipelined = previous is None and bool(state.early_tests)
+    if pipelined:
+        previous = early_tests_baseline(kg.title, state.early_tests)
+        note = REMAINDER_NOTE
+    if previous is not None:
+        old_kg, old_plan = previous
+        diff = diff_graphs(old_kg, kg)
+        kept = carry_over(old_plan, diff)
+        covered = {req_id for case in kept for req_id in case.related_req_ids}
+        targets = diff.regenerate | (diff.unchanged - covered)
+        logger.info(
+            f"{'Pipelined' if pipelined else 'Incremental'} run: {diff.summary()}; keeping {len(kept)} of "
+            f"{len(old_plan.test_cases)} test cases, designing tests for {len(targets)} requirements"
+        )
+        if not targets:
+            if pipelined:
+                test_plan = order_by_requirements(kg, kept)
+            else:
+                test_plan = TestPlan(pep_title=kg.title, test_cases=kept)
+            if artifact_dir:
+                TestPlanWriter(Path(artifact_dir), kg.title).finalize(test_plan)
+            if ui_manager:
+                ui_manager.set_test_case_count(len(test_plan.test_cases))
+            return {"test_plan": test_plan, "current_phase": "done"}
+        target = subgraph(kg, targets)
+        incremental = True
     
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", TESTER_SYSTEM_PROMPT),
-        ("user", "Here is the PEP Knowledge Graph:\n\n{spec_text}")
-    ])
+    req_count = sum(count_requirements(m) for m in target.root_modules) + len(target.global_constraints)
+    logger.info(f"Designing tests for {req_count} requirements...")
     
-    chain = prompt | structured_llm
+    # Streaming parses test cases as they arrive and writes them to the artifacts right away
+    streaming = settings.tester.STREAM
+    chain = build_tester_chain()
+    metrics = context.metrics
+
+    writer = None
+    on_case = None
+    streamed: list[TestCase] = []
+    if streaming:
+        writer = TestPlanWriter(Path(artifact_dir), kg.title, initial=kept) if artifact_dir else None
+
+        def on_case(case: TestCase):
+            streamed.append(case)
+            if writer is not None:
+                writer.add(case)
+            if ui_manager:
+                ui_manager.set_test_case_count(len(kept) + len(streamed))
     
     try:
-        test_plan = await chain.ainvoke({"spec_text": spec_text})
+        if should_shard(target):
+            test_plan = await design_sharded(chain, target, metrics, ui_manager, on_case)
+        else:
+            spec_text = format_knowledge_graph(target).text
+            if incremental:
+                spec_text = note + spec_text
+            test_plan = await design_test_plan(chain, spec_text, metrics, on_case, kg.title)
         logger.info(f"Successfully designed {len(test_plan.test_cases)} test cases.")
+        if pipelined:
+            test_plan = order_by_requirements(kg, kept + test_plan.test_cases)
+        elif incremental:
+            test_plan = merge_incremental(kg.title, kept, test_plan.test_cases)
+        test_plan = await fill_coverage_gaps(chain, kg, test_plan, metrics, ui_manager, on_case)
+        if writer is not None:
+            writer.finalize(test_plan)
+        if ui_manager:
+            ui_manager.set_test_case_count(len(test_plan.test_cases))
         return {
             "test_plan": test_plan,
             "current_phase": "done"
         }
     except Exception as e:
         logger.error(f"Error in testing phase: {e}", exc_info=True)
+        if kept or streamed:
+            # Keep what was generated before the failure, numbered like a finished plan:
+            # streamed IDs are the model's own (or provisional "S1-"/"GAP-" ones) and
+            # would be carried forward by the next --incremental run
+            if pipelined:
+                test_plan = order_by_requirements(kg, kept + streamed)
+            elif incremental:
+                test_plan = merge_incremental(kg.title, kept, streamed)
+            else:
+                test_plan = merge_test_plans(kg.title, [TestPlan(pep_title=kg.title, test_cases=streamed)])
+            logger.warning(f"Keeping {len(test_plan.test_cases)} test cases available before the error")
+            if writer is not None:
+                writer.finalize(test_plan)
+            return {
+                "test_plan": test_plan,
+                "current_phase": "error"
+            }
         return {"current_phase": "error"}
@@ -0,0 +1,31 @@
+from pep2testcase.core.schema import ModuleTests, PepKnowledgeGraph, TestCase, TestPlan
+from .incremental import iter_requirements
+from .shards import merge_test_plans
+
+def early_tests_baseline(title: str, early: list[ModuleTests]) -> tuple[PepKnowledgeGraph, TestPlan]:
+    """
+    The modules finalized during research and their tests, as a graph and plan that the
+    final knowledge graph can be diffed against like a previous run: tests of modules
+    that stayed the same are kept, the rest is designed again. Case IDs get a per-module
+    prefix, since every module was numbered from TC-001.
+    """
+    kg = PepKnowledgeGraph(title=title, status="", root_modules=[m.module for m in early])
+    cases = [
+        case.model_copy(update={"id": f"M{i}-{case.id}"})
+        for i, m in enumerate(early, 1)
+        for case in m.test_cases
+    ]
+    return kg, TestPlan(pep_title=title, test_cases=cases)
+
+def order_by_requirements(kg: PepKnowledgeGraph, cases: list[TestCase]) -> TestPlan:
+    """
+    Sorts test cases by the first graph requirement they cover (document order, stable
+    otherwise; cases covering none go last) and renumbers them TC-001, TC-002, ...
+    """
+    position = {req.id: n for n, req in enumerate(iter_requirements(kg))}
+    last = len(position)
+
+    def first_requirement(case: TestCase) -> int:
+        return min((position[r] for r in case.related_req_ids if r in position), default=last)
+
+    return merge_test_plans(kg.title, [TestPlan(pep_title=kg.title, test_cases=sorted(cases, key=first_requirement))])
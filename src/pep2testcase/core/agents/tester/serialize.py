@@ -0,0 +1,215 @@
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+from pep2testcase.core.schema import FeatureModule, PepKnowledgeGraph, RequirementAtom
+from pep2testcase.core.tokens import count_tokens
+
+PRIORITIES = ("Must", "Should", "May")
+
+# Tokens kept free for the note appended to a truncated prompt
+_NOTE_RESERVE = 60
+
+@dataclass
+class SerializedGraph:
+    text: str
+    requirements: int
+    included: int
+    # Requirements left out to fit the token budget, by priority
+    dropped: Counter = field(default_factory=Counter)
+    # Estimated prompt tokens (sum over pieces); only computed when a budget is set
+    tokens: Optional[int] = None
+
+    @property
+    def truncated(self) -> bool:
+        return self.included < self.requirements
+
+@dataclass
+class _Module:
+    parent: int
+    head: str
+    has_reqs: bool
+    charged: bool = False
+    reqs_charged: bool = False
+
+def _norm(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+def _module_tags(module: FeatureModule) -> list[str]:
+    """The distinct tags of a module's requirements, in first-seen order."""
+    return list(dict.fromkeys(tag for req in module.requirements for tag in req.context_tags))
+
+def _module_head(module: FeatureModule, level: int, compact: bool) -> str:
+    indent = "#" * level
+    if not compact:
+        text = f"{indent} Module: {module.name}\n"
+        if module.description:
+            text += f"Description: {module.description}\n"
+        return text
+    text = f"{indent} {module.name}\n"
+    if module.description:
+        text += f"{module.description}\n"
+    tags = _module_tags(module)
+    if tags:
+        text += f"Tags: {', '.join(tags)}\n"
+    return text
+
+def _req_text(req: RequirementAtom, compact: bool, previous_quote: Optional[str]) -> str:
+    if not compact:
+        return f"- [{req.id}] ({req.priority}) {req.description}\n  Quote: {req.source_quote}\n"
+    text = f"- {req.id} {req.priority}: {req.description}\n"
+    quote = _norm(req.source_quote)
+    # Quotes that repeat the description (or the previous requirement's quote) add nothing
+    if quote and quote not in _norm(req.description) and req.source_quote != previous_quote:
+        text += f"  > {req.source_quote}\n"
+    return text
+
+def _global_text(req: RequirementAtom, compact: bool) -> str:
+    if compact:
+        return f"- {req.id} {req.priority}: {req.description}\n"
+    return f"- [{req.id}] ({req.priority}) {req.description}\n"
+
+def serialize_knowledge_graph(
+    kg: PepKnowledgeGraph,
+    budget: Optional[int] = None,
+    compact: bool = False,
+    model_name: Optional[str] = None,
+) -> SerializedGraph:
+    """
+    Serialises the knowledge graph for the tester prompt in linear time.
+
+    One iterative walk flattens the graph into module headings, requirement pieces and
+    an event list; the prompt is a single join. When ``budget`` (tokens) is set and the
+    graph does not fit, requirements are admitted by priority (every Must, then Should,
+    then May, each in document order) while they fit, a module heading being charged
+    with the first requirement admitted below it. Omitted counts are stated at the end.
+
+    ``compact`` drops the "Module:"/"Description:"/"Quote:" labels, lists the tags of a
+    module's requirements once under its heading, and omits quotes that repeat the
+    description or the previous requirement's quote.
+    """
+    modules: list[_Module] = []
+    # (module index, or -1 for a global constraint; priority; text)
+    reqs: list[tuple[int, str, str]] = [(-1, req.priority, _global_text(req, compact)) for req in kg.global_constraints]
+    # ("head", module) / ("req", requirement) / ("tail", module), in output order
+    events: list[tuple[str, int]] = []
+
+    stack: list[tuple[FeatureModule, int, int]] = [(m, 1, -1) for m in reversed(kg.root_modules)]
+    while stack:
+        module, level, parent = stack.pop()
+        index = len(modules)
+        modules.append(_Module(parent, _module_head(module, level, compact), bool(module.requirements)))
+        events.append(("head", index))
+        previous_quote = None
+        for req in module.requirements:
+            events.append(("req", len(reqs)))
+            reqs.append((index, req.priority, _req_text(req, compact, previous_quote)))
+            previous_quote = req.source_quote
+        # A blank line closes the module's own requirements, before its sub-modules
+        events.append(("tail", index))
+        stack.extend((sub, level + 1, index) for sub in reversed(module.sub_modules))
+
+    header = f"PEP Title: {kg.title}\nStatus: {kg.status}\n\n"
+    ambiguities = ""
+    if kg.ambiguities:
+        ambiguities = "Ambiguities (Handle carefully):\n" + "".join(f"- {a}\n" for a in kg.ambiguities) + "\n"
+    modules_header = "--- Feature Modules ---\n"
+    globals_header = "Global Constraints:\n"
+    reqs_header = "Requirements:\n"
+
+    included = [True] * len(reqs)
+    dropped: Counter = Counter()
+    tokens = None
+    for m in modules:
+        m.charged = m.reqs_charged = True
+    globals_shown = bool(kg.global_constraints)
+
+    if budget is not None:
+        def cost(text: str) -> int:
+            return count_tokens(text, model_name)
+
+        req_costs = [cost(text) for _, _, text in reqs]
+        head_costs = [cost(m.head) + 1 for m in modules]  # + the closing blank line
+        reqs_header_cost = cost(reqs_header)
+        globals_cost = cost(globals_header) + 1
+        fixed = cost(header) + cost(ambiguities) + cost(modules_header)
+        tokens = (
+            fixed + sum(req_costs) + sum(head_costs)
+            + reqs_header_cost * sum(m.has_reqs for m in modules)
+            + (globals_cost if globals_shown else 0)
+        )
+        if tokens > budget:
+            included = [False] * len(reqs)
+            for m in modules:
+                m.charged = m.reqs_charged = False
+            globals_shown = False
+            remaining = budget - fixed - _NOTE_RESERVE
+            buckets: dict[str, list[int]] = {p: [] for p in PRIORITIES}
+            for i, (_, priority, _) in enumerate(reqs):
+                buckets.setdefault(priority, []).append(i)
+            cheapest = min(req_costs, default=0)
+            for priority, indices in buckets.items():
+                for n, i in enumerate(indices):
+                    if remaining < cheapest:
+                        # Nothing else can fit; skip the ancestor walks for the rest
+                        dropped[priority] += len(indices) - n
+                        break
+                    module = reqs[i][0]
+                    need = req_costs[i]
+                    uncharged = []
+                    if module < 0:
+                        need += 0 if globals_shown else globals_cost
+                    else:
+                        if not modules[module].reqs_charged:
+                            need += reqs_header_cost
+                        node = module
+                        while node >= 0 and not modules[node].charged:
+                            uncharged.append(node)
+                            need += head_costs[node]
+                            node = modules[node].parent
+                    if need > remaining:
+                        dropped[priority] += 1
+                        continue
+                    remaining -= need
+                    included[i] = True
+                    if module < 0:
+                        globals_shown = True
+                    else:
+                        modules[module].reqs_charged = True
+                        for node in uncharged:
+                            modules[node].charged = True
+            tokens = budget - _NOTE_RESERVE - remaining
+
+    parts = [header]
+    if globals_shown:
+        parts.append(globals_header)
+        parts.extend(text for i, (module, _, text) in enumerate(reqs) if module < 0 and included[i])
+        parts.append("\n")
+    parts.append(ambiguities)
+    parts.append(modules_header)
+    for kind, index in events:
+        if kind == "req":
+            if included[index]:
+                parts.append(reqs[index][2])
+            continue
+        m = modules[index]
+        if not m.charged:
+            continue
+        if kind == "head":
+            parts.append(m.head)
+            if m.reqs_charged and m.has_reqs:
+                parts.append(reqs_header)
+        else:
+            parts.append("\n")
+
+    shown = sum(included)
+    if shown < len(reqs):
+        omitted = ", ".join(f"{dropped[p]} {p}" for p in dropped)
+        parts.append(
+            f"\n[Prompt budget reached: {shown} of {len(reqs)} requirements shown; omitted {omitted}. "
+            "Design tests only for the requirements shown.]\n"
+        )
+    return SerializedGraph(
+        text="".join(parts), requirements=len(reqs), included=shown, dropped=dropped, tokens=tokens,
+    )
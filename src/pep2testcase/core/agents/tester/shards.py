@@ -0,0 +1,67 @@
+from typing import Iterable
+
+from pep2testcase.core.schema import FeatureModule, PepKnowledgeGraph, TestPlan
+
+def count_requirements(module: FeatureModule) -> int:
+    return len(module.requirements) + sum(count_requirements(sub) for sub in module.sub_modules)
+
+def _split_module(module: FeatureModule, budget: int, path: str = "") -> Iterable[FeatureModule]:
+    """
+    Yields pieces of ``module`` with at most ``budget`` requirements each. A module over
+    budget is split into its own requirements (in chunks) and its sub-modules (recursively);
+    pieces keep the parent path in their name so the tester still sees where they belong.
+    """
+    name = f"{path} / {module.name}" if path else module.name
+    if count_requirements(module) <= budget:
+        yield module.model_copy(update={"name": name}) if path else module
+        return
+    for start in range(0, len(module.requirements), budget):
+        yield FeatureModule(
+            name=name,
+            description=module.description,
+            requirements=module.requirements[start:start + budget],
+        )
+    for sub in module.sub_modules:
+        yield from _split_module(sub, budget, name)
+
+def shard_knowledge_graph(kg: PepKnowledgeGraph, budget: int) -> list[PepKnowledgeGraph]:
+    """
+    Splits a knowledge graph into shards of at most ``budget`` requirements, keeping
+    root modules whole when they fit and packing small neighbouring pieces together
+    (in document order, so the result is deterministic).
+
+    Ambiguities are repeated in every shard as context; global constraints go to the
+    first shard only, so they are tested once.
+    """
+    groups: list[list[FeatureModule]] = [[]]
+    size = len(kg.global_constraints)
+    for root in kg.root_modules:
+        for piece in _split_module(root, max(1, budget)):
+            n = count_requirements(piece)
+            if groups[-1] and size + n > budget:
+                groups.append([])
+                size = 0
+            groups[-1].append(piece)
+            size += n
+    return [
+        kg.model_copy(update={
+            "root_modules": modules,
+            "global_constraints": kg.global_constraints if i == 0 else [],
+        })
+        for i, modules in enumerate(groups)
+    ]
+
+def merge_test_plans(title: str, plans: list[TestPlan]) -> TestPlan:
+    """
+    Concatenates shard plans in shard order and renumbers test cases TC-001, TC-002, ...
+    Each shard numbers its cases independently, so model-chosen IDs would collide.
+    """
+    cases = [case for plan in plans for case in plan.test_cases]
+    width = max(3, len(str(len(cases))))
+    return TestPlan(
+        pep_title=title,
+        test_cases=[
+            case.model_copy(update={"id": f"TC-{n:0{width}d}"})
+            for n, case in enumerate(cases, 1)
+        ],
+    )
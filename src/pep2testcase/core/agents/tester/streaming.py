@@ -0,0 +1,127 @@
+import json
+import logging
+from typing import Any, Callable, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from pydantic import ValidationError
+
+from pep2testcase.core.schema import TestCase, TestPlan
+
+logger = logging.getLogger(__name__)
+
+class TestCaseStreamParser:
+    """
+    Incremental parser for a streamed TestPlan JSON document.
+
+    ``feed`` takes the next fragment of the JSON text and returns the test cases whose
+    objects were completed by it. Only the lexical state (string/escape flags and the
+    bracket stack) is kept between calls, so each character is scanned once.
+    """
+    __test__ = False  # not a pytest class
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = ""
+        self._key: Optional[str] = None
+        self._in_cases = False
+        self._object_start: Optional[int] = None
+
+    def feed(self, text: str) -> list[TestCase]:
+        self.buffer += text
+        cases = []
+        buffer = self.buffer
+        for i in range(self._pos, len(buffer)):
+            c = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start + 1:i]
+                continue
+            depth = len(self._stack)
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":" and depth == 1:
+                self._key = self._last_string
+            elif c == "[":
+                if depth == 1 and self._key == "test_cases":
+                    self._in_cases = True
+                self._stack.append(c)
+            elif c == "{":
+                if self._in_cases and depth == 2:
+                    self._object_start = i
+                self._stack.append(c)
+            elif c in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if c == "}" and self._in_cases and depth == 3 and self._object_start is not None:
+                    case = self._parse_case(buffer[self._object_start:i + 1])
+                    if case is not None:
+                        cases.append(case)
+                    self._object_start = None
+                elif c == "]" and self._in_cases and depth == 2:
+                    self._in_cases = False
+        self._pos = len(buffer)
+        return cases
+
+    @staticmethod
+    def _parse_case(text: str) -> Optional[TestCase]:
+        try:
+            return TestCase.model_validate(json.loads(text))
+        except (ValueError, ValidationError) as e:
+            logger.debug(f"Skipping malformed streamed test case: {e}")
+            return None
+
+class TestCaseStreamHandler(AsyncCallbackHandler):
+    """
+    Callback handler that feeds streamed model output (tool call arguments, or content
+    for JSON-mode responses) to a parser per model run and reports each completed
+    test case to ``on_case`` as soon as it is complete.
+    """
+
+    def __init__(self, on_case: Callable[[TestCase], None]):
+        self.on_case = on_case
+        self.cases: list[TestCase] = []
+        self._parsers: dict[UUID, TestCaseStreamParser] = {}
+
+    async def on_llm_new_token(self, token: str, *, chunk: Any = None, run_id: UUID, **kwargs: Any) -> None:
+        message = getattr(chunk, "message", None)
+        fragments = [c.get("args") or "" for c in (getattr(message, "tool_call_chunks", None) or [])]
+        if not any(fragments):
+            fragments = [token] if isinstance(token, str) else []
+        parser = self._parsers.setdefault(run_id, TestCaseStreamParser())
+        for fragment in fragments:
+            for case in parser.feed(fragment):
+                self.cases.append(case)
+                self.on_case(case)
+
+def plan_from_message(message: Any, streamed: list[TestCase], title: str) -> TestPlan:
+    """
+    Parses the final TestPlan from the model's message. If the output was cut short
+    (e.g. the output token limit was hit), the cases completed while streaming are kept.
+    """
+    for call in getattr(message, "tool_calls", None) or []:
+        try:
+            return TestPlan.model_validate(call["args"])
+        except ValidationError as e:
+            logger.warning(f"Invalid TestPlan tool call: {e}")
+    content = getattr(message, "content", None)
+    if isinstance(content, str) and content.strip().startswith("{"):
+        try:
+            return TestPlan.model_validate_json(content)
+        except ValidationError as e:
+            logger.warning(f"Invalid TestPlan JSON: {e}")
+    if streamed:
+        logger.warning(f"Model output was incomplete; keeping the {len(streamed)} test cases streamed so far")
+        return TestPlan(pep_title=title, test_cases=list(streamed))
+    raise ValueError("Model returned no TestPlan")
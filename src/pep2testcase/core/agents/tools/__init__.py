@@ -1,5 +1,11 @@
 # Core Agents Tools Package
-from .fetcher import fetch_pep_content
+from .fetcher import fetch_pep_content, afetch_pep_content, fetch_pep_tool
 from .search import internet_search
+from .sections import get_pep_section, get_pep_section_tool
+from .modules import finalize_module_tool, module_sink
 
-__all__ = ["fetch_pep_content", "internet_search"]
+__all__ = [
+    "fetch_pep_content", "afetch_pep_content", "fetch_pep_tool",
+    "get_pep_section", "get_pep_section_tool", "internet_search",
+    "finalize_module_tool", "module_sink"
+]
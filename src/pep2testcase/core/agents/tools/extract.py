@@ -0,0 +1,108 @@
+import logging
+import re
+from typing import Callable, Dict
+
+from bs4 import BeautifulSoup
+
+from pep2testcase.core.config import settings
+
+try:
+    import lxml.html as lxml_html
+except ImportError:  # Optional "fast" extra
+    lxml_html = None
+
+logger = logging.getLogger(__name__)
+
+Extractor = Callable[[bytes], str]
+
+def _clean(text: str) -> str:
+    # Basic cleanup: remove excessive newlines
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+def extract_with_bs4(html: bytes) -> str:
+    """Reference backend: BeautifulSoup with the pure-Python html.parser."""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Try to find the main content article
+    content = soup.find('article', class_='content')
+    if not content:
+        content = soup.find('div', class_='document')
+
+    if content:
+        text = content.get_text(separator='\n')
+    else:
+        # Fallback to body
+        text = soup.body.get_text(separator='\n')
+
+    return _clean(text)
+
+def _has_class(tag: str, cls: str) -> str:
+    return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+
+# Same selection order as the bs4 backend: article.content, div.document, body.
+_CONTENT_XPATHS = (_has_class("article", "content"), _has_class("div", "document"), "//body")
+
+# BeautifulSoup's get_text() skips strings held by these containers (Script,
+# Stylesheet, TemplateString, Ruby*), as well as comments. Mirror that exactly.
+_TEXT_XPATH = (
+    "descendant::text()[not(ancestor::script or ancestor::style or ancestor::template"
+    " or ancestor::rt or ancestor::rp)]"
+)
+
+# BeautifulSoup collapses whitespace-only strings (ASCII spaces only) to a single
+# newline or space, except inside whitespace-preserving tags.
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+_PRESERVE_WHITESPACE = frozenset(("pre", "textarea"))
+
+def _normalize_blank(node) -> str:
+    element = node.getparent()
+    if node.is_tail:
+        element = element.getparent()
+    while element is not None:
+        if element.tag in _PRESERVE_WHITESPACE:
+            return node
+        element = element.getparent()
+    return "\n" if "\n" in node else " "
+
+def extract_with_lxml(html: bytes) -> str:
+    """Fast backend: libxml2 via lxml, producing the same text as extract_with_bs4."""
+    root = lxml_html.document_fromstring(html)
+    for xpath in _CONTENT_XPATHS:
+        found = root.xpath(xpath)
+        if found:
+            strings = [
+                node if node.strip(_ASCII_SPACES) else _normalize_blank(node)
+                for node in found[0].xpath(_TEXT_XPATH)
+            ]
+            return _clean("\n".join(strings))
+    return ""
+
+_EXTRACTORS: Dict[str, Extractor] = {"bs4": extract_with_bs4}
+if lxml_html is not None:
+    _EXTRACTORS["lxml"] = extract_with_lxml
+
+# Preference order for "auto"
+_AUTO_ORDER = ("lxml", "bs4")
+
+def register_extractor(name: str, extractor: Extractor):
+    """Registers an additional extraction backend (e.g. for a different parser)."""
+    _EXTRACTORS[name] = extractor
+
+def available_extractors() -> list[str]:
+    return list(_EXTRACTORS)
+
+def get_extractor(name: str | None = None) -> Extractor:
+    """
+    Returns the extraction backend called ``name`` (defaults to settings).
+    "auto" picks the fastest installed backend and falls back to bs4.
+    """
+    name = name or settings.fetch.EXTRACTOR
+    if name == "auto":
+        for candidate in _AUTO_ORDER:
+            if candidate in _EXTRACTORS:
+                return _EXTRACTORS[candidate]
+    extractor = _EXTRACTORS.get(name)
+    if extractor is None:
+        logger.warning(f"HTML extractor '{name}' is not available, falling back to bs4")
+        return extract_with_bs4
+    return extractor
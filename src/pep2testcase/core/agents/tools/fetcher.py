@@ -1,30 +1,206 @@
-import requests
-from bs4 import BeautifulSoup
-import re
+import asyncio
+import logging
+from typing import Optional
+from langchain_core.tools import StructuredTool
+
+from pep2testcase.core.cache import FetchCache, get_fetch_cache
+from pep2testcase.core.compression import compress_source
+from pep2testcase.core.config import settings
+from pep2testcase.core.corpus import get_corpus, normalize_pep_url, pep_number_from_url
+from pep2testcase.core.http import get_async_client, get_session, host_slot
+from pep2testcase.core.tokens import count_tokens
+from .extract import get_extractor
+
+logger = logging.getLogger(__name__)
+
+def extract_text(html: bytes) -> str:
+    """
+    Extracts the cleaned article text from raw PEP HTML using the configured backend.
+    """
+    return get_extractor()(html)
+
+def _from_corpus(url: str) -> str | None:
+    """Resolves PEP URLs from the offline corpus, if one has been ingested."""
+    corpus = get_corpus()
+    return corpus.lookup_url(url) if corpus else None
+
+def _download_page(url: str) -> tuple[str, Optional[bytes]]:
+    """
+    Downloads a page, going through the fetch cache when it is enabled. Returns the
+    extracted text and the HTML if it was downloaded by this call (None when it came
+    from the corpus or the cache, where fetch_pep_source finds it without a request).
+    """
+    text = _from_corpus(url)
+    if text is not None:
+        return text, None
+
+    cache = get_fetch_cache()
+    page, fresh = cache.lookup(url) if cache else (None, False)
+    if fresh:
+        return page.text, None
+
+    response = get_session().get(url, timeout=settings.fetch.TIMEOUT, headers=FetchCache.validators(page))
+    if page is not None and response.status_code == 304:
+        return cache.mark_not_modified(page, response.headers).text, None
+    response.raise_for_status()
+
+    if cache is None:
+        return extract_text(response.content), response.content
+    return cache.store(url, response.content, response.headers, extract_text).text, response.content
+
+async def _adownload_page(url: str) -> tuple[str, Optional[bytes]]:
+    """Async twin of _download_page using the pooled AsyncClient and per-host limits."""
+    text = _from_corpus(url)
+    if text is not None:
+        return text, None
+
+    cache = get_fetch_cache()
+    page, fresh = cache.lookup(url) if cache else (None, False)
+    if fresh:
+        return page.text, None
+
+    async with host_slot(url):
+        response = await get_async_client().get(url, headers=FetchCache.validators(page))
+    if page is not None and response.status_code == 304:
+        return cache.mark_not_modified(page, response.headers).text, None
+    response.raise_for_status()
+
+    # HTML parsing is CPU bound; keep it off the event loop.
+    if cache is None:
+        return await asyncio.to_thread(extract_text, response.content), response.content
+    stored = await asyncio.to_thread(cache.store, url, response.content, response.headers, extract_text)
+    return stored.text, response.content
+
+def _download(url: str) -> str:
+    return _download_page(url)[0]
+
+async def _adownload(url: str) -> str:
+    return (await _adownload_page(url))[0]
+
+def _source_from_corpus(url: str) -> tuple[bytes, str] | None:
+    corpus = get_corpus()
+    number = pep_number_from_url(url)
+    if corpus is None or number is None:
+        return None
+    record = corpus.get(number, with_raw=True)
+    if record is None:
+        return None
+    return (record.raw or record.text.encode("utf-8")), record.format
+
+def fetch_pep_source(url: str) -> tuple[bytes, str]:
+    """
+    Returns the raw source of a page as ``(data, format)`` where format is "html",
+    "rst" or "txt". Used where document structure matters (e.g. section parsing).
+    """
+    url = normalize_pep_url(url)
+    source = _source_from_corpus(url)
+    if source is not None:
+        return source
+    cache = get_fetch_cache()
+    if cache is not None:
+        _download(url)
+        html = cache.get_html(url)
+        if html is not None:
+            return html, "html"
+    response = get_session().get(url, timeout=settings.fetch.TIMEOUT)
+    response.raise_for_status()
+    return response.content, "html"
+
+async def afetch_pep_source(url: str) -> tuple[bytes, str]:
+    """Async twin of fetch_pep_source."""
+    url = normalize_pep_url(url)
+    source = _source_from_corpus(url)
+    if source is not None:
+        return source
+    cache = get_fetch_cache()
+    if cache is not None:
+        await _adownload(url)
+        html = cache.get_html(url)
+        if html is not None:
+            return html, "html"
+    async with host_slot(url):
+        response = await get_async_client().get(url)
+    response.raise_for_status()
+    return response.content, "html"
 
 def fetch_pep_content(url: str) -> str:
     """
     Fetches and parses the text content of a PEP from its URL.
     """
+    return fetch_pep_page(url)[0]
+
+async def afetch_pep_content(url: str) -> str:
+    """
+    Fetches and parses the text content of a PEP from its URL without blocking the event loop.
+    """
+    return (await afetch_pep_page(url))[0]
+
+def fetch_pep_page(url: str) -> tuple[str, Optional[bytes]]:
+    """
+    fetch_pep_content that also returns the HTML it downloaded (see _download_page),
+    so compress_pep_content does not request the page again.
+    """
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Try to find the main content article
-        content = soup.find('article', class_='content')
-        if not content:
-            content = soup.find('div', class_='document')
-            
-        if content:
-            text = content.get_text(separator='\n')
-        else:
-            # Fallback to body
-            text = soup.body.get_text(separator='\n')
-            
-        # Basic cleanup: remove excessive newlines
-        clean_text = re.sub(r'\n{3,}', '\n\n', text)
-        return clean_text.strip()
+        return _download_page(normalize_pep_url(url))
     except Exception as e:
-        return f"Error fetching PEP content: {str(e)}"
+        return f"Error fetching PEP content: {str(e)}", None
+
+async def afetch_pep_page(url: str) -> tuple[str, Optional[bytes]]:
+    """Async twin of fetch_pep_page."""
+    try:
+        return await _adownload_page(normalize_pep_url(url))
+    except Exception as e:
+        return f"Error fetching PEP content: {str(e)}", None
+
+def _compress(url: str, text: str, source: tuple[bytes, str]) -> str:
+    result = compress_source(*source, url, text)
+    before, after = count_tokens(text), count_tokens(result.text)
+    change = f" ({100 * (after - before) / before:+.0f}%)" if before else ""
+    logger.info(f"Compressed {url}: {before} -> {after} tokens{change}")
+    return result.text
+
+def compress_pep_content(url: str, text: str, html: Optional[bytes] = None) -> str:
+    """
+    Returns the prompt-ready version of a fetched PEP (see core.compression), or ``text``
+    unchanged when compression is disabled, the fetch failed or the source is unavailable.
+    ``html`` is the page the caller already downloaded (see fetch_pep_page); without it
+    the source is looked up with fetch_pep_source.
+    """
+    if not settings.compression.ENABLED or text.startswith("Error fetching"):
+        return text
+    try:
+        source = (html, "html") if html is not None else fetch_pep_source(url)
+        return _compress(url, text, source)
+    except Exception as e:
+        logger.warning(f"Could not compress {url}, using extracted text: {e}")
+        return text
+
+async def acompress_pep_content(url: str, text: str, html: Optional[bytes] = None) -> str:
+    """Async twin of compress_pep_content."""
+    if not settings.compression.ENABLED or text.startswith("Error fetching"):
+        return text
+    try:
+        source = (html, "html") if html is not None else await afetch_pep_source(url)
+        return await asyncio.to_thread(_compress, url, text, source)
+    except Exception as e:
+        logger.warning(f"Could not compress {url}, using extracted text: {e}")
+        return text
+
+def fetch_pep_for_prompt(url: str) -> str:
+    """
+    Fetches the text content of a PEP from its URL, with navigation, boilerplate and
+    duplicate code removed and very long listings truncated (each truncation names the
+    get_pep_section call that returns the full text).
+    """
+    return compress_pep_content(url, *fetch_pep_page(url))
+
+async def afetch_pep_for_prompt(url: str) -> str:
+    return await acompress_pep_content(url, *(await afetch_pep_page(url)))
+
+# Tool exposed to agents under the familiar name: async agents await the pooled
+# coroutine, sync callers still get the blocking implementation.
+fetch_pep_tool = StructuredTool.from_function(
+    func=fetch_pep_for_prompt,
+    coroutine=afetch_pep_for_prompt,
+    name="fetch_pep_content",
+)
@@ -0,0 +1,197 @@
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from pep2testcase.core.cache import get_fetch_cache
+from pep2testcase.core.config import settings
+from pep2testcase.core.corpus import canonical_pep_url, default_corpus_path, get_corpus
+from pep2testcase.core.search_index import BM25Index, IndexedDoc, make_snippet
+from .extract import get_extractor
+
+logger = logging.getLogger(__name__)
+
+# Mirrored mailing-list archives and docs; HTML is run through the PEP extractor
+MIRROR_SUFFIXES = {".txt", ".md", ".rst", ".html", ".htm", ".eml"}
+
+def _corpus_key(number: int) -> str:
+    return f"corpus:{number}"
+
+def _cache_key(url: str) -> str:
+    return f"cache:{url}"
+
+def _mirror_key(path: Path) -> str:
+    return f"mirror:{path}"
+
+def _first_line(text: str) -> str:
+    for line in text.splitlines():
+        line = line.strip().lstrip("#").strip()
+        if line:
+            return line[:120]
+    return ""
+
+def _read_mirror_file(path: Path) -> str:
+    data = path.read_bytes()
+    if path.suffix.lower() in (".html", ".htm"):
+        return get_extractor()(data)
+    return data.decode("utf-8", errors="replace")
+
+class LocalSearch:
+    """
+    Offline search over everything already on disk: the ingested PEP corpus, pages in
+    the fetch cache and files under the mirror directory (mailing-list archives, docs).
+
+    The BM25 index is persisted next to the other caches and kept in sync incrementally:
+    documents are re-tokenized only when their content hash (or file size/mtime) changes.
+    Sources are re-scanned when the corpus file, the fetch cache or the mirror root
+    change, and at least every ``refresh_interval`` seconds.
+    """
+
+    def __init__(self, index_path: Path | str, mirror_dir: Optional[Path | str], refresh_interval: float):
+        self.index_path = Path(index_path)
+        self.mirror_dir = Path(mirror_dir) if mirror_dir else None
+        self.refresh_interval = refresh_interval
+        self.index = BM25Index.load(self.index_path)
+        self._signature = None
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+        self._text = lru_cache(maxsize=64)(self._load_text)
+
+    # --- Sources ---
+
+    def _source_signature(self) -> tuple:
+        def mtime(path) -> int:
+            try:
+                return os.stat(path).st_mtime_ns
+            except OSError:
+                return 0
+        cache = get_fetch_cache()
+        return (
+            mtime(default_corpus_path()),
+            mtime(cache.entries_dir) if cache else 0,
+            mtime(self.mirror_dir) if self.mirror_dir else 0,
+        )
+
+    def _iter_sources(self) -> Iterator[tuple[str, str, str, str, Callable[[], str]]]:
+        """Yields ``(key, url, title, stamp, load_text)``; text is only loaded when the stamp changed."""
+        seen_urls = set()
+        corpus = get_corpus()
+        if corpus is not None:
+            for number, sha in corpus.digests().items():
+                record = corpus.get(number) if self.index.stamp(_corpus_key(number)) != sha else None
+                url = canonical_pep_url(number)
+                seen_urls.add(url)
+                title = record.title if record and record.title else f"PEP {number}"
+                if record and not title.startswith("PEP"):
+                    title = f"PEP {number} – {title}"
+                yield _corpus_key(number), url, title, sha, (lambda r=record: r.text)
+
+        cache = get_fetch_cache()
+        if cache is not None:
+            for url, sha in cache.iter_entries():
+                if url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                def load(url=url):
+                    return cache.peek_text(url) or ""
+                yield _cache_key(url), url, "", sha, load
+
+        if self.mirror_dir and self.mirror_dir.is_dir():
+            for dirpath, _, filenames in os.walk(self.mirror_dir):
+                for filename in filenames:
+                    path = Path(dirpath) / filename
+                    if path.suffix.lower() not in MIRROR_SUFFIXES:
+                        continue
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    stamp = f"{st.st_size}:{st.st_mtime_ns}"
+                    yield _mirror_key(path), path.as_uri(), "", stamp, (lambda p=path: _read_mirror_file(p))
+
+    def refresh(self, force: bool = False) -> int:
+        """Brings the index in line with the sources. Returns the number of documents (re)indexed."""
+        with self._lock:
+            now = time.monotonic()
+            signature = self._source_signature()
+            if not force and signature == self._signature and now - self._synced_at < self.refresh_interval:
+                return 0
+
+            changed = 0
+            present = set()
+            for key, url, title, stamp, load in self._iter_sources():
+                present.add(key)
+                if self.index.stamp(key) == stamp:
+                    continue
+                try:
+                    text = load()
+                except Exception as e:
+                    logger.debug(f"Skipping {url} in local search index: {e}")
+                    continue
+                self.index.add(key, url, title or _first_line(text) or url, text, stamp)
+                changed += 1
+            removed = [key for key in self.index.keys() - present if self.index.remove(key)]
+
+            if changed or removed:
+                self._text.cache_clear()
+                self.index.save(self.index_path)
+                logger.info(
+                    f"Local search index: {changed} updated, {len(removed)} removed, {len(self.index)} documents"
+                )
+            self._signature = signature
+            self._synced_at = now
+            return changed
+
+    # --- Query ---
+
+    def _load_text(self, key: str, stamp: str) -> str:
+        kind, _, ident = key.partition(":")
+        if kind == "corpus":
+            corpus = get_corpus()
+            record = corpus.get(int(ident)) if corpus else None
+            return record.text if record else ""
+        if kind == "cache":
+            cache = get_fetch_cache()
+            return (cache.peek_text(ident) if cache else None) or ""
+        try:
+            return _read_mirror_file(Path(ident))
+        except OSError:
+            return ""
+
+    def search(self, query: str, max_results: int = 5) -> list[tuple[IndexedDoc, float]]:
+        self.refresh()
+        with self._lock:
+            return self.index.search(query, max_results)
+
+    def format_results(self, query: str, max_results: int = 5) -> str:
+        """Same ``- [title](url): snippet...`` layout as the Tavily backend."""
+        lines = []
+        for doc, _ in self.search(query, max_results):
+            snippet = make_snippet(self._text(doc.key, doc.stamp), query)
+            lines.append(f"- [{doc.title}]({doc.url}): {snippet}...")
+        return "\n".join(lines)
+
+_searches: dict[tuple, LocalSearch] = {}
+_searches_lock = threading.Lock()
+
+def get_local_search() -> LocalSearch:
+    """Returns the process-wide local search backend for the current settings."""
+    mirror = settings.search.MIRROR_DIR or os.path.join(settings.cache.DIR, "mirror")
+    key = (
+        os.path.join(settings.cache.DIR, "search-index.pickle"),
+        mirror,
+        settings.search.INDEX_REFRESH,
+    )
+    with _searches_lock:
+        search = _searches.get(key)
+        if search is None:
+            search = LocalSearch(*key)
+            _searches[key] = search
+        return search
+
+def local_search(query: str, max_results: int = 5) -> str:
+    """Searches the local index. Returns an empty string when nothing matches."""
+    return get_local_search().format_results(query, max_results)
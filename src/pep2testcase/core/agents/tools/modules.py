@@ -0,0 +1,30 @@
+from contextvars import ContextVar
+from typing import Callable, Optional
+from langchain_core.tools import StructuredTool
+
+from pep2testcase.core.schema import FeatureModule
+
+# Receives the modules reported during a pipelined research run (set by the pipelined node)
+module_sink: ContextVar[Optional[Callable[[FeatureModule], str]]] = ContextVar("module_sink", default=None)
+
+_NOT_PIPELINED = "Test design does not run in parallel in this run; just include the module in the final knowledge graph."
+
+def finalize_module(module: FeatureModule) -> str:
+    """
+    Reports a top-level feature module whose requirements are final, so its test cases
+    can be designed while research continues. Pass the complete module, with its
+    sub-modules and requirement IDs exactly as they will appear in the final knowledge graph.
+    """
+    sink = module_sink.get()
+    return sink(module) if sink is not None else _NOT_PIPELINED
+
+async def afinalize_module(module: FeatureModule) -> str:
+    # Runs on the event loop, so the sink can start test design tasks
+    sink = module_sink.get()
+    return sink(module) if sink is not None else _NOT_PIPELINED
+
+finalize_module_tool = StructuredTool.from_function(
+    func=finalize_module,
+    coroutine=afinalize_module,
+    name="finalize_module",
+)
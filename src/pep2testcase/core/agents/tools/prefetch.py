@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Iterable, Optional
+
+from pep2testcase.core.cache import get_fetch_cache
+from pep2testcase.core.config import settings
+from pep2testcase.core.corpus import PEP_URL_RE, canonical_pep_url, get_corpus, pep_number_from_url
+from .fetcher import afetch_pep_content
+
+logger = logging.getLogger(__name__)
+
+# "PEP 484", "PEP-484", "PEP\xa0484" in text; "../pep-0484/" style links in HTML
+_PEP_MENTION_RE = re.compile(r"\bPEP[\s\xa0-]*(\d{1,4})\b")
+_PEP_HREF_RE = re.compile(r"""href=["'][^"']*?\bpep-(\d{4})/?(?:#[^"']*)?["']""", re.IGNORECASE)
+
+def find_pep_references(text: str, html: Optional[bytes] = None, exclude: Iterable[int] = ()) -> list[str]:
+    """
+    Returns canonical URLs of PEPs referenced in ``text`` (mentions and URLs) and,
+    if given, in the links of ``html``. Ordered by first appearance, without duplicates.
+    """
+    skip = set(exclude)
+    # PEP 0 is the index of all PEPs, not a reference worth reading.
+    skip.add(0)
+
+    numbers: list[int] = []
+    def add(number: int):
+        if number not in skip:
+            skip.add(number)
+            numbers.append(number)
+
+    for match in _PEP_MENTION_RE.finditer(text):
+        add(int(match.group(1)))
+    for match in PEP_URL_RE.finditer(text):
+        add(int(match.group(1)))
+    if html:
+        for match in _PEP_HREF_RE.finditer(html.decode("utf-8", errors="replace")):
+            add(int(match.group(1)))
+    return [canonical_pep_url(n) for n in numbers]
+
+async def prefetch_urls(urls: list[str], concurrency: int) -> int:
+    """
+    Fetches ``urls`` into the fetch cache with at most ``concurrency`` requests
+    in flight. Returns the number fetched successfully.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch(url: str) -> bool:
+        async with semaphore:
+            result = await afetch_pep_content(url)
+        ok = not result.startswith("Error fetching PEP content")
+        if not ok:
+            logger.debug(f"Prefetch failed for {url}: {result}")
+        return ok
+
+    results = await asyncio.gather(*(fetch(url) for url in urls))
+    return sum(results)
+
+async def prefetch_references(pep_url: str, raw_content: str) -> list[str]:
+    """
+    Pre-research stage: warms the fetch cache with every PEP referenced by the primary
+    PEP, so later fetch_pep_content / get_pep_section calls from agents return immediately.
+    Bounded by PEP2TC_PREFETCH_LIMIT / _CONCURRENCY / _TIMEOUT. Returns the URLs attempted.
+    """
+    if not settings.research.PREFETCH_ENABLED:
+        return []
+    cache = get_fetch_cache()
+    if cache is None and get_corpus() is None:
+        logger.info("Fetch cache disabled; skipping reference prefetch.")
+        return []
+
+    primary = pep_number_from_url(pep_url)
+    html = cache.get_html(pep_url) if cache else None
+    urls = find_pep_references(raw_content, html, exclude=[primary] if primary is not None else [])
+    urls = urls[:settings.research.PREFETCH_LIMIT]
+    if not urls:
+        return []
+
+    started = time.perf_counter()
+    try:
+        fetched = await asyncio.wait_for(
+            prefetch_urls(urls, settings.research.PREFETCH_CONCURRENCY),
+            timeout=settings.research.PREFETCH_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        # Whatever finished is already cached; the agents fetch the rest on demand.
+        logger.warning(f"Reference prefetch timed out after {settings.research.PREFETCH_TIMEOUT}s")
+        return urls
+    logger.info(
+        f"Prefetched {fetched}/{len(urls)} referenced PEPs in {time.perf_counter() - started:.2f}s"
+    )
+    return urls
@@ -1,31 +1,64 @@
 import logging
+import threading
 from tavily import TavilyClient
 import os
 from pep2testcase.core.agents.tools.fetcher import fetch_pep_content
+from pep2testcase.core.agents.tools.local_search import local_search
+from pep2testcase.core.cache import get_search_cache
 from pep2testcase.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# One client per API key, shared by every agent in the process
+_clients: dict[str, TavilyClient] = {}
+_clients_lock = threading.Lock()
+
+def _get_client(api_key: str) -> TavilyClient:
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = TavilyClient(api_key=api_key)
+            _clients[api_key] = client
+        return client
+
+def _tavily_search(api_key: str, query: str) -> str:
+    """Runs the remote search and formats the results. Raises on API errors."""
+    # Using advanced search depth for better technical results
+    response = _get_client(api_key).search(query=query, search_depth=settings.search.DEPTH)
+
+    # Format results concisely
+    results = response.get("results", [])
+    formatted = "\n".join([f"- [{r['title']}]({r['url']}): {r['content'][:200]}..." for r in results])
+    return formatted if formatted else "No relevant results found."
+
+def _local_search(query: str) -> str:
+    try:
+        results = local_search(query)
+    except Exception as e:
+        return f"Error during search: {str(e)}"
+    if results:
+        return results
+    # Nothing indexed yet (no corpus, empty fetch cache): keep dev/test runs going
+    logger.warning(f"No TAVILY_API_KEY and no local results. Mocking search for: {query}")
+    return f"Mock search result for '{query}': Found related PEP discussions and documentation."
+
 def internet_search(query: str) -> str:
     """
     Search the internet for technical details, mailing list discussions, and documentation.
     Useful for finding context about PEPs, resolving ambiguities, or checking referenced implementations.
     """
     api_key = settings.tavily.API_KEY
+    backend = settings.search.BACKEND
+    if backend == "local" or (backend == "auto" and not api_key):
+        return _local_search(query)
     if not api_key:
-        # Fallback for dev/test without key
-        logger.warning(f"No TAVILY_API_KEY found. Mocking search for: {query}")
-        return f"Mock search result for '{query}': Found related PEP discussions and documentation."
+        return f"Error during search: PEP2TC_SEARCH_BACKEND={backend} requires TAVILY_API_KEY"
     
     try:
-        client = TavilyClient(api_key=api_key)
-        # Using advanced search depth for better technical results
-        response = client.search(query=query, search_depth="advanced")
-        
-        # Format results concisely
-        results = response.get("results", [])
-        formatted = "\n".join([f"- [{r['title']}]({r['url']}): {r['content'][:200]}..." for r in results])
-        return formatted if formatted else "No relevant results found."
+        cache = get_search_cache()
+        if cache is None:
+            return _tavily_search(api_key, query)
+        # Repeated or concurrent identical queries share one outbound request
+        return cache.get_or_compute(query, lambda: _tavily_search(api_key, query))
     except Exception as e:
         return f"Error during search: {str(e)}"
-
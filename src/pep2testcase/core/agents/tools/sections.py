@@ -0,0 +1,57 @@
+import asyncio
+import re
+from langchain_core.tools import StructuredTool
+
+from pep2testcase.core.corpus import canonical_pep_url
+from pep2testcase.core.sections import SectionTree, parse_sections
+from .fetcher import afetch_pep_source, fetch_pep_source
+
+def resolve_pep_url(pep: str) -> str:
+    """Accepts a PEP URL, a number ("8", "0008") or "PEP 8" and returns a URL."""
+    match = re.fullmatch(r"\s*(?:pep[\s-]*)?(\d{1,4})\s*", pep, re.IGNORECASE)
+    if match:
+        return canonical_pep_url(int(match.group(1)))
+    return pep.strip()
+
+def load_pep_sections(url: str) -> SectionTree:
+    """Returns the section tree of a PEP (sources come from corpus, cache or network)."""
+    data, fmt = fetch_pep_source(url)
+    return parse_sections(data, fmt)
+
+async def aload_pep_sections(url: str) -> SectionTree:
+    data, fmt = await afetch_pep_source(url)
+    return await asyncio.to_thread(parse_sections, data, fmt)
+
+def _format_section(tree: SectionTree, pep: str, section_id: str) -> str:
+    section = tree.find(section_id)
+    if section is None:
+        return (
+            f"Error: section '{section_id}' not found in {pep}. "
+            f"Available section ids: {', '.join(['preamble'] + tree.ids())}"
+        )
+    return f"[{section.id}] {section.title}\n\n{section.text}"
+
+def get_pep_section(pep: str, section_id: str) -> str:
+    """
+    Returns the full text of one section of a PEP, including its sub-sections.
+    `pep` is a PEP URL or number (e.g. "484"); `section_id` is an id from the
+    PEP's table of contents (e.g. "specification"), or "preamble" for the header fields.
+    """
+    url = resolve_pep_url(pep)
+    try:
+        return _format_section(load_pep_sections(url), pep, section_id)
+    except Exception as e:
+        return f"Error fetching PEP section: {str(e)}"
+
+async def aget_pep_section(pep: str, section_id: str) -> str:
+    url = resolve_pep_url(pep)
+    try:
+        return _format_section(await aload_pep_sections(url), pep, section_id)
+    except Exception as e:
+        return f"Error fetching PEP section: {str(e)}"
+
+get_pep_section_tool = StructuredTool.from_function(
+    func=get_pep_section,
+    coroutine=aget_pep_section,
+    name="get_pep_section",
+)
@@ -0,0 +1,93 @@
+import os
+import threading
+from pathlib import Path
+from typing import Iterable
+
+from pep2testcase.core.schema import TestCase, TestPlan
+
+def _test_case_lines(tc: TestCase) -> list[str]:
+    md = [f"## {tc.id}: {tc.title}"]
+    md.append(f"**Type:** {tc.test_type} | **Related Reqs:** {', '.join(tc.related_req_ids)}")
+    md.append("")
+    md.append(f"**Description:** {tc.description}")
+    md.append("")
+
+    if tc.preconditions:
+        md.append("**Preconditions:**")
+        for pre in tc.preconditions:
+            md.append(f"- {pre}")
+        md.append("")
+
+    md.append("**Steps:**")
+    for i, step in enumerate(tc.steps, 1):
+        md.append(f"{i}. {step}")
+    md.append("")
+
+    md.append(f"**Expected Result:** {tc.expected_result}")
+    md.append("")
+    md.append("---")
+    md.append("")
+    return md
+
+def render_test_case(tc: TestCase) -> str:
+    """Renders one test case as a Markdown section."""
+    return "\n".join(_test_case_lines(tc)) + "\n"
+
+def render_markdown(plan: TestPlan) -> str:
+    """Renders the TestPlan to a Markdown string."""
+    md = [f"# Test Plan: {plan.pep_title}", ""]
+    md.append(f"**Total Test Cases:** {len(plan.test_cases)}")
+    md.append("")
+    for tc in plan.test_cases:
+        md.extend(_test_case_lines(tc))
+    return "\n".join(md)
+
+def _write_atomic(path: Path, text: str):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+class TestPlanWriter:
+    """
+    Writes test_plan.json / test_plan.md while test cases are still being generated.
+
+    ``add`` appends each case to the Markdown file and rewrites the JSON file atomically,
+    so both are valid (and readable by other tools) at every point, and a crash late in
+    generation keeps everything produced so far. ``finalize`` replaces both with the
+    final plan.
+    """
+    __test__ = False  # not a pytest class
+
+    def __init__(self, output_dir: Path | str, pep_title: str, initial: Iterable[TestCase] = ()):
+        self.output_dir = Path(output_dir)
+        self.pep_title = pep_title
+        # ``initial``: cases known up front (e.g. carried over by an incremental run)
+        self.cases: list[TestCase] = list(initial)
+        self.json_path = self.output_dir / "test_plan.json"
+        self.md_path = self.output_dir / "test_plan.md"
+        self._lock = threading.Lock()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.md_path.write_text(
+            f"# Test Plan: {pep_title}\n\n_Generation in progress..._\n\n"
+            + "".join(render_test_case(case) for case in self.cases),
+            encoding="utf-8",
+        )
+        self._write_json()
+
+    def _write_json(self):
+        plan = TestPlan(pep_title=self.pep_title, test_cases=self.cases)
+        _write_atomic(self.json_path, plan.model_dump_json(indent=2))
+
+    def add(self, case: TestCase):
+        with self._lock:
+            self.cases.append(case)
+            with open(self.md_path, "a", encoding="utf-8") as f:
+                f.write(render_test_case(case))
+            self._write_json()
+
+    def finalize(self, plan: TestPlan):
+        with self._lock:
+            self.cases = list(plan.test_cases)
+            self.pep_title = plan.pep_title
+            self._write_json()
+            _write_atomic(self.md_path, render_markdown(plan))
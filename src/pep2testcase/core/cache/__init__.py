@@ -0,0 +1,14 @@
+# Core Cache Package
+from .fetch import FetchCache, CachedPage, CacheStats, get_fetch_cache
+from .search import SearchCache, normalize_query, get_search_cache
+from .llm import SQLiteLLMCache, LLMCacheMiss, get_llm_cache, is_cached_response
+from .kg import KnowledgeGraphStore, get_kg_store
+from .reports import ReportStore, StoredReport, get_report_store
+
+__all__ = [
+    "FetchCache", "CachedPage", "CacheStats", "get_fetch_cache",
+    "SearchCache", "normalize_query", "get_search_cache",
+    "SQLiteLLMCache", "LLMCacheMiss", "get_llm_cache", "is_cached_response",
+    "KnowledgeGraphStore", "get_kg_store",
+    "ReportStore", "StoredReport", "get_report_store",
+]
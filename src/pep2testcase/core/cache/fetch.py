@@ -0,0 +1,272 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Callable, Iterator, Mapping, Optional
+
+from pep2testcase.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CacheStats:
+    """Counters reported by the fetch cache."""
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+@dataclass
+class CachedPage:
+    """A cached PEP page: validators plus a pointer to its content-addressed blobs."""
+    url: str
+    sha: str
+    text: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = field(default_factory=time.time)
+
+def url_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class FetchCache:
+    """
+    Persistent, revalidating cache for fetched PEP pages.
+
+    Layout under ``root``:
+    - ``entries/<sha256(url)>.json``: URL metadata (ETag, Last-Modified, fetch/access times).
+    - ``blobs/<sha256(html)>.html`` / ``.txt``: raw HTML and cleaned text, shared by
+      every URL that serves identical bytes. A known HTML hash is never parsed twice.
+
+    Entries are served without network access while younger than ``ttl`` seconds and
+    revalidated with If-None-Match / If-Modified-Since afterwards. When the blobs exceed
+    ``max_bytes``, the least recently accessed entries are evicted.
+    """
+
+    def __init__(self, root: Path | str, ttl: float, max_bytes: int):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries_dir = self.root / "entries"
+        self.blobs_dir = self.root / "blobs"
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    # --- Paths ---
+
+    def _entry_path(self, url: str) -> Path:
+        return self.entries_dir / f"{url_key(url)}.json"
+
+    def _blob_path(self, sha: str, suffix: str) -> Path:
+        return self.blobs_dir / f"{sha}{suffix}"
+
+    # --- Lookup ---
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Returns the cached page for ``url`` (fresh or stale), or None."""
+        path = self._entry_path(url)
+        try:
+            meta = json.loads(path.read_text(encoding="utf-8"))
+            text = self._blob_path(meta["sha"], ".txt").read_text(encoding="utf-8")
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # Bump access time for LRU ordering without rewriting the entry.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return CachedPage(
+            url=url,
+            sha=meta["sha"],
+            text=text,
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+            fetched_at=meta.get("fetched_at", 0.0),
+        )
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return (time.time() - page.fetched_at) < self.ttl
+
+    def lookup(self, url: str) -> tuple[Optional[CachedPage], bool]:
+        """
+        Returns ``(page, fresh)``. A fresh page counts as a hit and can be served as is;
+        a stale one should be revalidated with ``validators(page)``.
+        """
+        page = self.get(url)
+        fresh = page is not None and self.is_fresh(page)
+        if fresh:
+            with self._lock:
+                self.stats.hits += 1
+        return page, fresh
+
+    def get_html(self, url: str) -> Optional[bytes]:
+        """Returns the raw HTML stored for ``url``, regardless of freshness."""
+        page = self.get(url)
+        if page is None:
+            return None
+        try:
+            return self._blob_path(page.sha, ".html").read_bytes()
+        except OSError:
+            return None
+
+    def peek_text(self, url: str) -> Optional[str]:
+        """Returns cached text regardless of freshness, without touching counters."""
+        page = self.get(url)
+        return page.text if page else None
+
+    def iter_entries(self) -> Iterator[tuple[str, str]]:
+        """Yields ``(url, sha)`` for every cached page, without reading any blob."""
+        for path in self.entries_dir.glob("*.json"):
+            try:
+                meta = json.loads(path.read_text(encoding="utf-8"))
+                yield meta["url"], meta["sha"]
+            except (OSError, ValueError, KeyError):
+                continue
+
+    @staticmethod
+    def validators(page: Optional[CachedPage]) -> dict:
+        """Conditional request headers for revalidating ``page``."""
+        headers = {}
+        if page is None:
+            return headers
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    # --- Updates ---
+
+    def mark_not_modified(self, page: CachedPage, headers: Mapping[str, str]) -> CachedPage:
+        """Records a 304 response: the stored content stays valid for another TTL."""
+        page.fetched_at = time.time()
+        page.etag = headers.get("ETag") or page.etag
+        page.last_modified = headers.get("Last-Modified") or page.last_modified
+        self._write_entry(page)
+        with self._lock:
+            self.stats.revalidated += 1
+        return page
+
+    def store(
+        self,
+        url: str,
+        html: bytes,
+        headers: Mapping[str, str],
+        extract: Callable[[bytes], str],
+    ) -> CachedPage:
+        """
+        Stores a freshly downloaded page. ``extract`` is only called when no cleaned text
+        exists yet for these exact bytes.
+        """
+        sha = content_hash(html)
+        text_path = self._blob_path(sha, ".txt")
+        try:
+            text = text_path.read_text(encoding="utf-8")
+        except OSError:
+            text = extract(html)
+            self._atomic_write(self._blob_path(sha, ".html"), html)
+            self._atomic_write(text_path, text.encode("utf-8"))
+
+        page = CachedPage(
+            url=url,
+            sha=sha,
+            text=text,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+        )
+        self._write_entry(page)
+        with self._lock:
+            self.stats.misses += 1
+        self.evict()
+        return page
+
+    def _write_entry(self, page: CachedPage):
+        meta = {
+            "url": page.url,
+            "sha": page.sha,
+            "etag": page.etag,
+            "last_modified": page.last_modified,
+            "fetched_at": page.fetched_at,
+        }
+        self._atomic_write(self._entry_path(page.url), json.dumps(meta).encode("utf-8"))
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes):
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    # --- Eviction ---
+
+    def size_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.blobs_dir.iterdir() if p.is_file())
+
+    def evict(self):
+        """Drops least recently accessed entries until the blobs fit in ``max_bytes``."""
+        with self._lock:
+            total = self.size_bytes()
+            if total <= self.max_bytes:
+                return
+
+            entries = []
+            refs: dict[str, int] = {}
+            for path in self.entries_dir.glob("*.json"):
+                try:
+                    sha = json.loads(path.read_text(encoding="utf-8"))["sha"]
+                    accessed = path.stat().st_mtime
+                except (OSError, ValueError, KeyError):
+                    continue
+                entries.append((accessed, path, sha))
+                refs[sha] = refs.get(sha, 0) + 1
+
+            for _, path, sha in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                self.stats.evictions += 1
+                refs[sha] -= 1
+                if refs[sha] == 0:
+                    for suffix in (".html", ".txt"):
+                        blob = self._blob_path(sha, suffix)
+                        try:
+                            total -= blob.stat().st_size
+                            blob.unlink()
+                        except OSError:
+                            pass
+            logger.debug(f"Fetch cache evicted down to {total} bytes")
+
+_caches: dict[tuple, FetchCache] = {}
+_caches_lock = threading.Lock()
+
+def get_fetch_cache() -> Optional[FetchCache]:
+    """
+    Returns the process-wide fetch cache for the current settings,
+    or None if caching is disabled.
+    """
+    if not settings.fetch.CACHE_ENABLED:
+        return None
+    key = (
+        os.path.join(settings.cache.DIR, "fetch"),
+        settings.fetch.CACHE_TTL,
+        settings.fetch.CACHE_MAX_BYTES,
+    )
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = FetchCache(*key)
+            _caches[key] = cache
+        return cache
@@ -0,0 +1,104 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional
+
+from pep2testcase.core.config import settings
+from pep2testcase.core.schema import PepKnowledgeGraph
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+PRAGMA journal_mode=WAL;
+CREATE TABLE IF NOT EXISTS graphs (
+    key TEXT PRIMARY KEY,
+    pep_url TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS graphs_url ON graphs (pep_url);
+"""
+
+def normalize_content(text: str) -> str:
+    """PEP text as hashed for the store: whitespace-only differences do not count."""
+    return " ".join(text.split())
+
+@dataclass
+class KGStoreStats:
+    hits: int = 0
+    misses: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+class KnowledgeGraphStore:
+    """
+    Research results keyed by the hash of the normalized PEP text, the research models
+    and the research prompt version: an unchanged PEP researched with the same setup
+    maps to the same knowledge graph, so Phase 1 can be skipped.
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.stats = KGStoreStats()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(content: str, model: str, prompt_version: str) -> str:
+        digest = hashlib.sha256(normalize_content(content).encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{digest}\x00{model}\x00{prompt_version}".encode("utf-8")).hexdigest()
+
+    def get(self, content: str, model: str, prompt_version: str) -> Optional[PepKnowledgeGraph]:
+        key = self.key(content, model, prompt_version)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM graphs WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+        try:
+            return PepKnowledgeGraph.model_validate_json(row[0])
+        except ValueError as e:
+            logger.warning(f"Dropping unreadable knowledge graph entry {key[:12]}: {e}")
+            return None
+
+    def put(self, pep_url: str, content: str, model: str, prompt_version: str, kg: PepKnowledgeGraph):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO graphs (key, pep_url, model, prompt_version, value, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.key(content, model, prompt_version), pep_url, model, prompt_version,
+                 kg.model_dump_json(), time.time()),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM graphs").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+_stores: dict[str, KnowledgeGraphStore] = {}
+_stores_lock = threading.Lock()
+
+def get_kg_store() -> Optional[KnowledgeGraphStore]:
+    """Returns the process-wide knowledge graph store, or None if reuse is disabled."""
+    if not settings.research.KG_CACHE_ENABLED:
+        return None
+    path = os.path.join(settings.cache.DIR, "knowledge_graphs.sqlite")
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = KnowledgeGraphStore(path)
+            _stores[path] = store
+        return store
@@ -0,0 +1,182 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Optional
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+from pep2testcase.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+PRAGMA journal_mode=WAL;
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in replay mode when a model call has no recorded response."""
+
+@dataclass
+class LLMCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+def _model_name(llm_string: str) -> Optional[str]:
+    # llm_string embeds the serialized model kwargs; good enough for a debugging column
+    marker = '"model_name": "'
+    start = llm_string.find(marker)
+    if start < 0:
+        return None
+    start += len(marker)
+    return llm_string[start:llm_string.find('"', start)]
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Persistent chat model response cache, plugged into ChatOpenAI via ``cache=``.
+
+    LangChain hands us the serialized message list as ``prompt`` and the model config
+    (model name, temperature, ...) plus call kwargs (bound tools, response_format) as
+    ``llm_string``; the key is the hash of both. When the stored responses exceed
+    ``max_bytes``, the least recently used ones are evicted.
+
+    With ``replay=True`` a miss raises :class:`LLMCacheMiss` instead of reaching the API,
+    which makes reruns deterministic (and fail loudly when a prompt changed).
+    """
+
+    def __init__(self, path: Path | str, max_bytes: int, replay: bool = False):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.stats = LLMCacheStats()
+        # IDs of the messages answered from the cache; a hit keeps the recorded message's ID
+        self._served: set[str] = set()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self.key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                with self._conn:
+                    self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+        if row is None:
+            if self.replay:
+                raise LLMCacheMiss(
+                    f"No recorded response for this model call (key {key[:12]}) in {self.path}; "
+                    "rerun without --replay to record it."
+                )
+            return None
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", LangChainBetaWarning)
+                generations = loads(row[0], allowed_objects="core")
+        except Exception as e:
+            logger.warning(f"Dropping unreadable LLM cache entry {key[:12]}: {e}")
+            return None
+        served = {gen.message.id for gen in generations if getattr(getattr(gen, "message", None), "id", None)}
+        with self._lock:
+            self._served |= served
+        return generations
+
+    def served(self, message: Any) -> bool:
+        """True if ``message`` was returned by a lookup of this cache rather than by the model."""
+        message_id = getattr(message, "id", None)
+        with self._lock:
+            return message_id is not None and message_id in self._served
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        value = dumps(return_val)
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.key(prompt, llm_string), _model_name(llm_string), value, size, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.stats.evictions += 1
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+_caches: dict[tuple, SQLiteLLMCache] = {}
+_caches_lock = threading.Lock()
+
+def get_llm_cache() -> Optional[SQLiteLLMCache]:
+    """
+    Returns the process-wide LLM response cache for the current settings,
+    or None if caching is disabled. Replay mode always needs the cache.
+    """
+    replay = settings.llm.REPLAY
+    if not (settings.llm.CACHE_ENABLED or replay):
+        return None
+    key = (
+        os.path.join(settings.cache.DIR, "llm.sqlite"),
+        settings.llm.CACHE_MAX_BYTES,
+        replay,
+    )
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = SQLiteLLMCache(*key)
+            _caches[key] = cache
+        return cache
+
+def is_cached_response(message: Any) -> bool:
+    """True if ``message`` came from the LLM cache (every response does in replay mode)."""
+    if settings.llm.REPLAY:
+        return True
+    cache = get_llm_cache()
+    return cache is not None and cache.served(message)
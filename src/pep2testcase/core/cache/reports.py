@@ -0,0 +1,123 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Optional
+
+from pep2testcase.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+PRAGMA journal_mode=WAL;
+CREATE TABLE IF NOT EXISTS reports (
+    fingerprint TEXT PRIMARY KEY,
+    subagent TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    report TEXT NOT NULL,
+    sources TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+"""
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+@dataclass
+class StoredReport:
+    report: str
+    # Source tool calls the report was built from: {"tool", "args", "sha"} of each result
+    sources: list[dict] = field(default_factory=list)
+
+@dataclass
+class ReportStoreStats:
+    hits: int = 0
+    misses: int = 0
+    invalidated: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+class ReportStore:
+    """
+    Completed sub-agent reports, keyed by a fingerprint of the sub-agent type, the
+    task instruction (case- and whitespace-folded) and the sub-agent setup (``version``).
+    Each report keeps the hashes of the sources it read, so a caller can check they are
+    unchanged before reusing it; entries older than ``ttl`` seconds are dropped.
+    """
+
+    def __init__(self, path: Path | str, ttl: float):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.stats = ReportStoreStats()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(subagent: str, instruction: str, version: str) -> str:
+        # Only case and whitespace are folded: word order and small words ("without",
+        # "does") change what is asked, and a report must answer exactly its question
+        normalized = " ".join(instruction.casefold().split())
+        return content_hash(f"{subagent}\x00{normalized}\x00{version}")
+
+    def get(self, fingerprint: str) -> Optional[StoredReport]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT report, sources, created_at FROM reports WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            if row is not None and now - row[2] >= self.ttl:
+                with self._conn:
+                    self._conn.execute("DELETE FROM reports WHERE fingerprint = ?", (fingerprint,))
+                row = None
+            if row is None:
+                self.stats.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE reports SET accessed_at = ? WHERE fingerprint = ?", (now, fingerprint))
+            self.stats.hits += 1
+        return StoredReport(report=row[0], sources=json.loads(row[1]))
+
+    def put(self, fingerprint: str, subagent: str, topic: str, report: StoredReport):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reports (fingerprint, subagent, topic, report, sources, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (fingerprint, subagent, topic, report.report, json.dumps(report.sources), now, now),
+            )
+
+    def invalidate(self, fingerprint: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM reports WHERE fingerprint = ?", (fingerprint,))
+            self.stats.invalidated += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+_stores: dict[tuple, ReportStore] = {}
+_stores_lock = threading.Lock()
+
+def get_report_store() -> Optional[ReportStore]:
+    """Returns the process-wide sub-agent report store, or None if memoization is disabled."""
+    if not settings.research.REPORT_CACHE_ENABLED:
+        return None
+    key = (os.path.join(settings.cache.DIR, "reports.sqlite"), settings.research.REPORT_CACHE_TTL)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = ReportStore(*key)
+            _stores[key] = store
+        return store
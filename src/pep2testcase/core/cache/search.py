@@ -0,0 +1,182 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Optional
+
+from pep2testcase.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+PRAGMA journal_mode=WAL;
+CREATE TABLE IF NOT EXISTS searches (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS searches_accessed ON searches (accessed_at);
+"""
+
+# Negations ("without", "not", "no", ...) must never be listed: dropping them would
+# answer a query from the cache entry of its opposite
+_STOP_WORDS = frozenset("""
+a an and are as at be by can do does for from how i in into is it its of on or over
+please should show that the their this to under was what when where which who why
+will with
+""".split())
+
+_TOKEN_RE = re.compile(r"[\w.+#/-]+")
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key for a search query: case-folded, punctuation and whitespace collapsed
+    and stop words dropped, so "How does PEP 8 handle tabs?" and "pep 8 handle tabs"
+    share one entry. Terms keep their order: "convert int to str" is not
+    "convert str to int".
+    """
+    tokens = [t.strip(".-/") for t in _TOKEN_RE.findall(query.casefold())]
+    tokens = [t for t in tokens if t]
+    terms = [t for t in tokens if t not in _STOP_WORDS] or tokens
+    return " ".join(terms)
+
+@dataclass
+class SearchCacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+class SearchCache:
+    """
+    TTL + LRU cache of formatted search results, one row per key in a SQLite file in
+    WAL mode, so worker processes share entries instead of overwriting each other's.
+
+    ``get_or_compute`` also coalesces in-flight requests: parallel sub-agents asking
+    the same (normalized) question wait on a single outbound search.
+    """
+
+    def __init__(self, path: Optional[Path | str], ttl: float, max_entries: int):
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = SearchCacheStats()
+        self._inflight: dict[str, Future] = {}
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path or ":memory:", check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, query: str) -> Optional[str]:
+        key = normalize_query(query)
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        row = self._conn.execute("SELECT result, created_at FROM searches WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        result, created_at = row
+        with self._conn:
+            if now - created_at >= self.ttl:
+                self._conn.execute("DELETE FROM searches WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE searches SET accessed_at = ? WHERE key = ?", (now, key))
+        return result
+
+    def put(self, query: str, result: str):
+        with self._lock:
+            self._put(normalize_query(query), result)
+
+    def _put(self, key: str, result: str):
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches (key, result, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, result, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+        if total <= self.max_entries:
+            return
+        cursor = self._conn.execute(
+            "DELETE FROM searches WHERE key IN (SELECT key FROM searches ORDER BY accessed_at LIMIT ?)",
+            (total - self.max_entries,),
+        )
+        self.stats.evictions += cursor.rowcount
+
+    def get_or_compute(self, query: str, compute: Callable[[], str]) -> str:
+        """
+        Returns the cached result for ``query`` or runs ``compute`` once for all
+        concurrent callers. Exceptions are propagated to every waiter and not cached.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            cached = self._get(key)
+            if cached is not None:
+                self.stats.hits += 1
+                return cached
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self.stats.misses += 1
+            else:
+                self.stats.coalesced += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            with self._lock:
+                self._put(key, result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+_caches: dict[tuple, SearchCache] = {}
+_caches_lock = threading.Lock()
+
+def get_search_cache() -> Optional[SearchCache]:
+    """Returns the process-wide search cache for the current settings, or None if disabled."""
+    if not settings.search.CACHE_ENABLED:
+        return None
+    key = (
+        os.path.join(settings.cache.DIR, "search.sqlite"),
+        settings.search.CACHE_TTL,
+        settings.search.CACHE_MAX_ENTRIES,
+    )
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = SearchCache(*key)
+            _caches[key] = cache
+        return cache
@@ -0,0 +1,76 @@
+import logging
+import os
+import secrets
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from pep2testcase.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Application types stored in the workflow state, allowed through checkpoint deserialization
+CHECKPOINT_TYPES = [
+    ("pep2testcase.core.schema.research", "PepKnowledgeGraph"),
+    ("pep2testcase.core.schema.test", "TestPlan"),
+    ("pep2testcase.core.schema.test", "ModuleTests"),
+]
+
+def default_checkpoint_path() -> str:
+    return settings.checkpoint.PATH or os.path.join(settings.cache.DIR, "checkpoints.sqlite")
+
+@asynccontextmanager
+async def open_checkpointer(path: Optional[str] = None) -> AsyncIterator[AsyncSqliteSaver]:
+    """The durable SQLite checkpointer; every completed node of a run is saved to it."""
+    path = path or default_checkpoint_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    async with aiosqlite.connect(path) as conn:
+        yield AsyncSqliteSaver(conn, serde=JsonPlusSerializer(allowed_msgpack_modules=CHECKPOINT_TYPES))
+
+def new_run_id() -> str:
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{secrets.token_hex(2)}"
+
+def run_config(pep_url: str, run_id: str) -> RunnableConfig:
+    """
+    Graph config of one run: the checkpoint thread is keyed by PEP URL and run ID, and
+    both are stored in the checkpoint metadata so runs can be looked up by URL.
+    """
+    return {
+        "configurable": {"thread_id": f"{pep_url}#{run_id}"},
+        "metadata": {"pep_url": pep_url, "run_id": run_id},
+    }
+
+async def find_run(saver: AsyncSqliteSaver, pep_url: str, run_id: Optional[str] = None) -> Optional[str]:
+    """The ID of the given run of a PEP, or of its latest run, if it has checkpoints."""
+    filter = {"pep_url": pep_url}
+    if run_id:
+        filter["run_id"] = run_id
+    latest = [checkpoint async for checkpoint in saver.alist(None, filter=filter, limit=1)]
+    return latest[0].metadata.get("run_id") if latest else None
+
+async def prepare_resume(app, config: RunnableConfig) -> Optional[str]:
+    """
+    Positions a checkpointed run and returns the node it restarts from (None if the
+    run already completed). From "researcher" the run is invoked with its initial state
+    again; from any later node with no input, which continues from the checkpoint.
+
+    A run killed mid-node still has that node pending. A phase that failed (the nodes
+    report errors through ``current_phase`` rather than raising) is retried alone: a
+    failed tester is rescheduled on top of the saved knowledge graph.
+    """
+    snapshot = await app.aget_state(config)
+    if snapshot.next:
+        return snapshot.next[0]
+    values = snapshot.values
+    if values.get("knowledge_graph") is None:
+        # Research never completed: the whole run starts over on the same thread
+        return "researcher"
+    if values.get("current_phase") == "done":
+        return None
+    await app.aupdate_state(config, {"current_phase": "research_done"}, as_node="researcher")
+    return "tester"
@@ -0,0 +1,295 @@
+import functools
+import hashlib
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+from pep2testcase.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# RFC 2119 keywords; longer alternatives first so "MUST NOT" is not counted as "MUST".
+NORMATIVE_RE = re.compile(
+    r"\b(MUST NOT|MUST|SHALL NOT|SHALL|SHOULD NOT|SHOULD|REQUIRED|RECOMMENDED|MAY|OPTIONAL)\b"
+)
+
+# Sections that are pure boilerplate or link lists in almost every PEP
+BOILERPLATE_SECTIONS = {"copyright"}
+REFERENCE_SECTIONS = {"references", "footnotes", "links", "citations"}
+
+_BLOCK_TAGS = {
+    "p", "pre", "table", "ul", "ol", "dl", "section", "div", "blockquote", "aside",
+    "details", "figure", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "article",
+}
+
+def normative_counts(text: str) -> Counter:
+    return Counter(match.group(1) for match in NORMATIVE_RE.finditer(text))
+
+def _has_normative(text: str) -> bool:
+    return NORMATIVE_RE.search(text) is not None
+
+def _inline(tag) -> str:
+    return " ".join(tag.get_text().split())
+
+@dataclass(frozen=True)
+class CompressionResult:
+    text: str
+    notes: tuple[str, ...] = ()
+    # False when compression would have lost a normative keyword; ``text`` is then the extracted text
+    guard_ok: bool = True
+
+@dataclass
+class _Context:
+    pep: str
+    max_lines: int
+    max_rows: int
+    seen_code: dict[str, str] = field(default_factory=dict)
+    notes: list[str] = field(default_factory=list)
+
+    def pointer(self, section_id: Optional[str]) -> str:
+        where = f"get_pep_section('{self.pep}', '{section_id}')" if section_id else "fetch_pep_content"
+        return f"full text: {where}"
+
+# --- HTML ---
+
+def _html_root(soup: BeautifulSoup) -> Tag:
+    return (
+        soup.find("section", id="pep-content")
+        or soup.find("article", class_="content")
+        or soup.find("div", class_="document")
+        or soup.body
+        or soup
+    )
+
+def _strip_chrome(root: Tag):
+    """Removes navigation, the inline table of contents and page furniture."""
+    for tag in root.find_all(["script", "style", "nav", "header", "footer", "button", "svg"]):
+        tag.decompose()
+    for toc in root.find_all(["section", "div"], id="contents"):
+        toc.decompose()
+    for tag in root.find_all(["a"], class_=["headerlink", "toc-backref"]):
+        tag.unwrap()
+
+def _section_id(tag: Tag) -> Optional[str]:
+    if tag.name == "section" or (tag.name == "div" and "section" in (tag.get("class") or [])):
+        return tag.get("id")
+    return None
+
+def _render_pre(tag: Tag, ctx: _Context, section_id: Optional[str]) -> Iterator[str]:
+    code = tag.get_text().strip("\n")
+    if not code.strip():
+        return
+    digest = hashlib.sha256(" ".join(code.split()).encode("utf-8")).hexdigest()
+    keep_all = _has_normative(code)
+    first_seen = ctx.seen_code.get(digest)
+    if first_seen is not None and not keep_all:
+        ctx.notes.append(f"collapsed duplicate code block in '{section_id}'")
+        yield f"[Code block identical to the one in section '{first_seen}' omitted]"
+        return
+    ctx.seen_code.setdefault(digest, section_id or "preamble")
+
+    lines = code.split("\n")
+    if len(lines) > ctx.max_lines and not keep_all:
+        shown = ctx.max_lines - ctx.max_lines // 4
+        ctx.notes.append(f"truncated {len(lines)}-line listing in '{section_id}'")
+        lines = lines[:shown] + [f"# ... {len(lines) - shown} more lines ({ctx.pointer(section_id)})"]
+    yield "```\n" + "\n".join(lines) + "\n```"
+
+def _render_table(tag: Tag, ctx: _Context, section_id: Optional[str]) -> Iterator[str]:
+    rows = [
+        " | ".join(_inline(cell) for cell in row.find_all(["th", "td"]))
+        for row in tag.find_all("tr")
+    ]
+    if len(rows) > ctx.max_rows + 1 and not _has_normative("\n".join(rows)):
+        shown = ctx.max_rows
+        ctx.notes.append(f"truncated {len(rows)}-row table in '{section_id}'")
+        rows = rows[:shown + 1] + [f"... {len(rows) - shown - 1} more rows ({ctx.pointer(section_id)})"]
+    yield "\n".join(rows)
+
+def _render_list(tag: Tag, ctx: _Context, section_id: Optional[str], indent: str = "") -> Iterator[str]:
+    lines = []
+    ordered = tag.name == "ol"
+    for n, item in enumerate(tag.find_all("li", recursive=False), 1):
+        nested = item.find_all(["ul", "ol"], recursive=False)
+        for sub in nested:
+            sub.extract()
+        marker = f"{n}." if ordered else "-"
+        lines.append(f"{indent}{marker} {_inline(item)}")
+        for sub in nested:
+            lines.extend(_render_list(sub, ctx, section_id, indent + "  "))
+    if lines:
+        yield "\n".join(lines)
+
+def _render_dl(tag: Tag) -> Iterator[str]:
+    lines = []
+    for term in tag.find_all("dt", recursive=False):
+        definition = term.find_next_sibling("dd")
+        name = _inline(term).rstrip(":").strip()
+        lines.append(f"{name}: {_inline(definition) if definition else ''}")
+    if lines:
+        yield "\n".join(lines)
+
+def _render_references(tag: Tag, title: str, section_id: str, ctx: _Context, level: int) -> Iterator[str]:
+    text = tag.get_text(" ")
+    if _has_normative(text):
+        yield from _render_section(tag, ctx, level, force_body=True)
+        return
+    entries = tag.find_all(["li", "dt", "aside"]) or tag.find_all("p")
+    ctx.notes.append(f"collapsed reference list '{section_id}'")
+    yield f"{'#' * (level + 1)} {title}\n[{len(entries)} reference entries omitted ({ctx.pointer(section_id)})]"
+
+def _render_blocks(tag: Tag, ctx: _Context, section_id: Optional[str], level: int) -> Iterator[str]:
+    for child in tag.children:
+        if isinstance(child, NavigableString):
+            text = " ".join(str(child).split())
+            if text:
+                yield text
+            continue
+        if not isinstance(child, Tag):
+            continue
+        name = child.name
+        if _section_id(child) is not None or name == "section":
+            yield from _render_section(child, ctx, level + 1)
+        elif name == "pre":
+            yield from _render_pre(child, ctx, section_id)
+        elif name == "table":
+            yield from _render_table(child, ctx, section_id)
+        elif name in ("ul", "ol"):
+            yield from _render_list(child, ctx, section_id)
+        elif name == "dl":
+            yield from _render_dl(child)
+        elif name == "hr":
+            continue
+        elif re.fullmatch(r"h[1-6]", name):
+            yield f"{'#' * max(1, level)} {_inline(child)}"
+        elif name in _BLOCK_TAGS and child.find(_BLOCK_TAGS):
+            yield from _render_blocks(child, ctx, section_id, level)
+        else:
+            text = _inline(child)
+            if text:
+                yield text
+
+def _render_section(tag: Tag, ctx: _Context, level: int, force_body: bool = False) -> Iterator[str]:
+    section_id = _section_id(tag) or tag.get("id")
+    heading = next((c for c in tag.children if isinstance(c, Tag) and re.fullmatch(r"h[1-6]", c.name)), None)
+    title = _inline(heading) if heading else (section_id or "")
+    if not force_body and section_id in BOILERPLATE_SECTIONS and not _has_normative(tag.get_text(" ")):
+        ctx.notes.append(f"dropped '{section_id}' section")
+        return
+    if not force_body and section_id in REFERENCE_SECTIONS:
+        yield from _render_references(tag, title, section_id, ctx, level)
+        return
+    if heading is not None:
+        heading.extract()
+        yield f"{'#' * (level + 1)} {title}"
+    yield from _render_blocks(tag, ctx, section_id, level)
+
+def _drop_footer(root: Tag):
+    """The "Source: ..." / "Last modified: ..." paragraphs after the last section."""
+    for p in root.find_all("p", recursive=False):
+        if re.match(r"\s*(Source|Last modified):", p.get_text()):
+            p.decompose()
+
+def compress_html(html: bytes, pep: str, max_lines: int, max_rows: int) -> tuple[str, str, list[str]]:
+    """Returns ``(compressed, baseline, notes)``; ``baseline`` is the body text the guard counts keywords in."""
+    soup = BeautifulSoup(html, "html.parser")
+    root = _html_root(soup)
+    _strip_chrome(root)
+    baseline = root.get_text(" ")
+    _drop_footer(root)
+
+    ctx = _Context(pep=pep, max_lines=max_lines, max_rows=max_rows)
+    title = root.find("h1")
+    blocks = []
+    if title is not None:
+        blocks.append(f"# {_inline(title)}")
+        title.decompose()
+    blocks.extend(_render_blocks(root, ctx, None, 0))
+    return "\n\n".join(b for b in blocks if b.strip()), baseline, ctx.notes
+
+# --- reStructuredText / plain text sources ---
+
+_RST_DROP = [
+    # Link targets: ".. _PEP 8: https://..."
+    re.compile(r"^\.\. _[^:]+:\s*\S+\s*$", re.MULTILINE),
+    # Editor footer
+    re.compile(r"^\.\.\s*\n(?:\s+.*\n?)*?\s+(?:Local Variables|vim?):.*(?:\n\s+.*)*", re.MULTILINE),
+]
+_RST_COPYRIGHT = re.compile(r"^Copyright\n[=\-~^]{3,}\n(?:(?!\S.*\n[=\-~^]{3,}\n).*\n?)*", re.MULTILINE)
+
+def compress_rst(text: str, pep: str, max_lines: int) -> tuple[str, list[str]]:
+    notes = []
+    for pattern in _RST_DROP:
+        text, n = pattern.subn("", text)
+        if n:
+            notes.append(f"dropped {n} link target / footer block(s)")
+    copyright_match = _RST_COPYRIGHT.search(text)
+    if copyright_match and not _has_normative(copyright_match.group(0)):
+        text = text[:copyright_match.start()] + text[copyright_match.end():]
+        notes.append("dropped 'copyright' section")
+
+    # Literal blocks: a "::" paragraph followed by indented lines
+    out, seen = [], set()
+    lines = text.split("\n")
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        out.append(line)
+        i += 1
+        if not line.rstrip().endswith("::"):
+            continue
+        start = i
+        while i < len(lines) and (not lines[i].strip() or lines[i].startswith((" ", "\t"))):
+            i += 1
+        block = lines[start:i]
+        code = "\n".join(block).strip("\n")
+        digest = " ".join(code.split())
+        if not code or _has_normative(code):
+            out.extend(block)
+        elif digest in seen:
+            notes.append("collapsed duplicate literal block")
+            out.extend(["", "    [Code block identical to an earlier one omitted]", ""])
+        elif len(code.split("\n")) > max_lines:
+            seen.add(digest)
+            body = code.split("\n")
+            shown = max_lines - max_lines // 4
+            notes.append(f"truncated {len(body)}-line literal block")
+            out.extend(["", *body[:shown], f"    # ... {len(body) - shown} more lines (full text: fetch_pep_content)", ""])
+        else:
+            seen.add(digest)
+            out.extend(block)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(out)).strip(), notes
+
+def compress_source(data: bytes, fmt: str, pep: str, extracted: str) -> CompressionResult:
+    """
+    Compresses a PEP source (HTML page or reST/text) for prompts: drops navigation,
+    TOC and footer boilerplate, the copyright section and reference link lists, collapses
+    duplicate code blocks and truncates long listings / tables with pointers to the full
+    section. Never drops a normative keyword: if the guard finds fewer MUST/SHOULD/MAY
+    (etc.) than the source body, ``extracted`` (the caller's text of the page) is
+    returned unchanged instead.
+    """
+    return _compress(
+        data, fmt, pep, extracted, settings.compression.MAX_LISTING_LINES, settings.compression.MAX_TABLE_ROWS,
+    )
+
+@functools.lru_cache(maxsize=32)
+def _compress(data: bytes, fmt: str, pep: str, extracted: str, max_lines: int, max_rows: int) -> CompressionResult:
+    if fmt == "html":
+        text, baseline, notes = compress_html(data, pep, max_lines, max_rows)
+    else:
+        baseline = data.decode("utf-8", errors="replace")
+        text, notes = compress_rst(baseline, pep, max_lines)
+
+    before, after = normative_counts(baseline), normative_counts(text)
+    missing = before - after
+    if missing:
+        logger.warning(f"Compression of {pep} would drop normative keywords {dict(missing)}; keeping full text")
+        # The baseline is only fit for counting (HTML text joined with spaces loses
+        # every line break), so the caller's extracted text is kept as it is
+        return CompressionResult(text=extracted, guard_ok=False)
+    return CompressionResult(text=text, notes=tuple(notes))
@@ -4,6 +4,20 @@ from dotenv import load_dotenv
 # Load .env file
 load_dotenv()
 
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off")
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
 class ModelSettings:
     @property
     def API_KEY(self) -> str | None:
@@ -17,11 +31,341 @@ class ModelSettings:
     def MODEL_NAME(self) -> str:
         return os.getenv("OPENAI_MODEL_NAME", "gpt-4o")
 
+    # Per-role models; each defaults to OPENAI_MODEL_NAME.
+    @property
+    def LEAD_MODEL_NAME(self) -> str:
+        return os.getenv("PEP2TC_MODEL_LEAD") or self.MODEL_NAME
+
+    @property
+    def SUB_MODEL_NAME(self) -> str:
+        """Sub-researchers mostly read and summarise; a smaller model (e.g. gpt-4o-mini) is usually enough."""
+        return os.getenv("PEP2TC_MODEL_SUB") or self.MODEL_NAME
+
+    @property
+    def TESTER_MODEL_NAME(self) -> str:
+        return os.getenv("PEP2TC_MODEL_TESTER") or self.MODEL_NAME
+
+    @property
+    def FALLBACK_MODEL_NAME(self) -> str | None:
+        """Model retried once when the primary times out or is overloaded (unset = no fallback)."""
+        return os.getenv("PEP2TC_MODEL_FALLBACK") or None
+
+    @property
+    def TIMEOUT(self) -> float:
+        """Per-request timeout in seconds before the client retries / falls back."""
+        return _env_float("PEP2TC_MODEL_TIMEOUT", 120.0)
+
+    @property
+    def MAX_RETRIES(self) -> int:
+        return _env_int("PEP2TC_MODEL_MAX_RETRIES", 2)
+
+class LLMSettings:
+    @property
+    def CACHE_ENABLED(self) -> bool:
+        return _env_bool("PEP2TC_LLM_CACHE", True)
+
+    @property
+    def CACHE_MAX_BYTES(self) -> int:
+        return _env_int("PEP2TC_LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+
+    @property
+    def REPLAY(self) -> bool:
+        """Serve model calls from the LLM cache only; a miss is an error (set by --replay)."""
+        return _env_bool("PEP2TC_LLM_REPLAY", False)
+
+    @property
+    def RPM(self) -> int:
+        """Model API requests per minute shared by all agents (0 = unlimited)."""
+        return _env_int("PEP2TC_LLM_RPM", 0)
+
+    @property
+    def TPM(self) -> int:
+        """Model API tokens per minute shared by all agents (0 = unlimited)."""
+        return _env_int("PEP2TC_LLM_TPM", 0)
+
+    @property
+    def MAX_IN_FLIGHT(self) -> int:
+        """Concurrent model API requests (0 = unlimited)."""
+        return _env_int("PEP2TC_LLM_MAX_IN_FLIGHT", 8)
+
+class MetricsSettings:
+    @property
+    def PRICE_PER_MTOK(self) -> tuple[float, float, float] | None:
+        """USD per 1M tokens as "input,cached_input,output"; overrides the built-in price table."""
+        value = os.getenv("PEP2TC_PRICE_PER_MTOK")
+        if not value:
+            return None
+        input_price, cached_price, output_price = (float(part) for part in value.split(","))
+        return input_price, cached_price, output_price
+
 class TavilySettings:
     @property
     def API_KEY(self) -> str | None:
         return os.getenv("TAVILY_API_KEY")
 
+class SearchSettings:
+    @property
+    def BACKEND(self) -> str:
+        """"tavily", "local" (offline BM25 index) or "auto" (Tavily when a key is set)."""
+        return os.getenv("PEP2TC_SEARCH_BACKEND", "auto").strip().lower()
+
+    @property
+    def MIRROR_DIR(self) -> str | None:
+        """Extra local text (mailing-list archives, docs) for the offline index. Defaults to <cache>/mirror."""
+        return os.getenv("PEP2TC_SEARCH_MIRROR_DIR")
+
+    @property
+    def INDEX_REFRESH(self) -> float:
+        return _env_float("PEP2TC_SEARCH_INDEX_REFRESH", 60)
+
+    @property
+    def DEPTH(self) -> str:
+        return os.getenv("PEP2TC_SEARCH_DEPTH", "advanced")
+
+    @property
+    def CACHE_ENABLED(self) -> bool:
+        return _env_bool("PEP2TC_SEARCH_CACHE", True)
+
+    @property
+    def CACHE_TTL(self) -> float:
+        return _env_float("PEP2TC_SEARCH_CACHE_TTL", 7 * 24 * 3600)
+
+    @property
+    def CACHE_MAX_ENTRIES(self) -> int:
+        return _env_int("PEP2TC_SEARCH_CACHE_MAX_ENTRIES", 2000)
+
+class CacheSettings:
+    @property
+    def DIR(self) -> str:
+        """Root directory shared by all on-disk caches."""
+        explicit = os.getenv("PEP2TC_CACHE_DIR")
+        if explicit:
+            return explicit
+        base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(base, "pep2testcase")
+
+class FetchSettings:
+    @property
+    def TIMEOUT(self) -> float:
+        return _env_float("PEP2TC_FETCH_TIMEOUT", 10.0)
+
+    @property
+    def EXTRACTOR(self) -> str:
+        """HTML extraction backend: auto, lxml or bs4."""
+        return os.getenv("PEP2TC_HTML_EXTRACTOR", "auto")
+
+    @property
+    def CACHE_ENABLED(self) -> bool:
+        return _env_bool("PEP2TC_FETCH_CACHE", True)
+
+    @property
+    def CACHE_TTL(self) -> float:
+        """Seconds a cached page is served without revalidation."""
+        return _env_float("PEP2TC_FETCH_CACHE_TTL", 24 * 3600)
+
+    @property
+    def CACHE_MAX_BYTES(self) -> int:
+        return _env_int("PEP2TC_FETCH_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+
+class CorpusSettings:
+    @property
+    def PATH(self) -> str | None:
+        """SQLite file of the offline PEP corpus (defaults to <cache dir>/corpus.sqlite)."""
+        return os.getenv("PEP2TC_CORPUS_PATH")
+
+class CheckpointSettings:
+    @property
+    def ENABLED(self) -> bool:
+        """Save the workflow state after every node so runs can be resumed."""
+        return _env_bool("PEP2TC_CHECKPOINT", True)
+
+    @property
+    def PATH(self) -> str | None:
+        """SQLite file of the workflow checkpoints (defaults to <cache dir>/checkpoints.sqlite)."""
+        return os.getenv("PEP2TC_CHECKPOINT_PATH")
+
+class BatchSettings:
+    @property
+    def CONCURRENCY(self) -> int:
+        """PEP workflows run at the same time by `pep2testcase batch`."""
+        return _env_int("PEP2TC_BATCH_CONCURRENCY", 4)
+
+class QueueSettings:
+    @property
+    def PATH(self) -> str | None:
+        """SQLite file of the job queue (defaults to <cache dir>/jobs.sqlite)."""
+        return os.getenv("PEP2TC_QUEUE_PATH")
+
+    @property
+    def LEASE(self) -> float:
+        """Seconds a claimed job stays with its worker without a heartbeat before others may take it."""
+        return _env_float("PEP2TC_QUEUE_LEASE", 120.0)
+
+    @property
+    def MAX_ATTEMPTS(self) -> int:
+        """Runs of a job (including ones lost to crashed workers) before it is marked failed."""
+        return _env_int("PEP2TC_QUEUE_MAX_ATTEMPTS", 3)
+
+    @property
+    def RETRY_DELAY(self) -> float:
+        """Seconds before a failed job can be claimed again; doubles with every attempt."""
+        return _env_float("PEP2TC_QUEUE_RETRY_DELAY", 30.0)
+
+    @property
+    def POLL_INTERVAL(self) -> float:
+        """Seconds an idle worker waits before checking the queue again."""
+        return _env_float("PEP2TC_QUEUE_POLL_INTERVAL", 2.0)
+
+    @property
+    def WORKER_PROCESSES(self) -> int:
+        """Worker processes started by `pep2testcase worker` (defaults to the CPU count)."""
+        return _env_int("PEP2TC_WORKER_PROCESSES", os.cpu_count() or 1)
+
+class HttpSettings:
+    @property
+    def MAX_CONNECTIONS(self) -> int:
+        return _env_int("PEP2TC_HTTP_MAX_CONNECTIONS", 20)
+
+    @property
+    def MAX_KEEPALIVE(self) -> int:
+        return _env_int("PEP2TC_HTTP_MAX_KEEPALIVE", 10)
+
+    @property
+    def KEEPALIVE_EXPIRY(self) -> float:
+        return _env_float("PEP2TC_HTTP_KEEPALIVE_EXPIRY", 30.0)
+
+    @property
+    def PER_HOST_LIMIT(self) -> int:
+        """Max concurrent requests to a single host."""
+        return _env_int("PEP2TC_HTTP_PER_HOST_LIMIT", 4)
+
+class ResearchSettings:
+    @property
+    def LEAD_CONTEXT(self) -> str:
+        """How the primary PEP reaches the lead prompt: "toc" (sections on demand) or "full"."""
+        return os.getenv("PEP2TC_LEAD_CONTEXT", "toc")
+
+    @property
+    def TOC_MIN_TOKENS(self) -> int:
+        """PEPs smaller than this are inlined even in "toc" mode (saves tool round trips)."""
+        return _env_int("PEP2TC_LEAD_TOC_MIN_TOKENS", 4000)
+
+    @property
+    def PREFETCH_ENABLED(self) -> bool:
+        return _env_bool("PEP2TC_PREFETCH", True)
+
+    @property
+    def PREFETCH_LIMIT(self) -> int:
+        """Max referenced PEPs to prefetch before research starts."""
+        return _env_int("PEP2TC_PREFETCH_LIMIT", 20)
+
+    @property
+    def PREFETCH_CONCURRENCY(self) -> int:
+        return _env_int("PEP2TC_PREFETCH_CONCURRENCY", 4)
+
+    @property
+    def PREFETCH_TIMEOUT(self) -> float:
+        return _env_float("PEP2TC_PREFETCH_TIMEOUT", 30.0)
+
+    @property
+    def MAX_ROUNDS(self) -> int:
+        """Delegation rounds (lead turns that start sub-agents) per research run."""
+        return _env_int("PEP2TC_RESEARCH_MAX_ROUNDS", 3)
+
+    @property
+    def MAX_CONCURRENT(self) -> int:
+        """Sub-agents running at the same time."""
+        return _env_int("PEP2TC_RESEARCH_MAX_CONCURRENT", 3)
+
+    @property
+    def TIME_BUDGET(self) -> float:
+        """Wall-clock seconds per research run before the lead is made to finish (0 = unlimited)."""
+        return _env_float("PEP2TC_RESEARCH_TIME_BUDGET", 1800.0)
+
+    @property
+    def TOKEN_BUDGET(self) -> int:
+        """Model tokens (lead and sub-agents) per research run before the lead is made to finish (0 = unlimited)."""
+        return _env_int("PEP2TC_RESEARCH_TOKEN_BUDGET", 2_000_000)
+
+    @property
+    def REPORT_CACHE_ENABLED(self) -> bool:
+        """Serve repeated sub-agent delegations from reports stored by earlier runs."""
+        return _env_bool("PEP2TC_REPORT_CACHE", True)
+
+    @property
+    def REPORT_CACHE_TTL(self) -> float:
+        return _env_float("PEP2TC_REPORT_CACHE_TTL", 30 * 24 * 3600)
+
+    @property
+    def PIPELINE(self) -> bool:
+        """Design tests for each module the lead finalizes while the research continues."""
+        return _env_bool("PEP2TC_PIPELINE", False)
+
+    @property
+    def KG_CACHE_ENABLED(self) -> bool:
+        """Reuse the knowledge graph of an unchanged PEP instead of researching it again."""
+        return _env_bool("PEP2TC_KG_CACHE", True)
+
+    @property
+    def KG_REFRESH(self) -> bool:
+        """Research even if a stored knowledge graph or sub-agent report matches (set by --refresh); results replace them."""
+        return _env_bool("PEP2TC_KG_REFRESH", False)
+
+class TesterSettings:
+    @property
+    def SHARDING(self) -> str:
+        """"auto" shards graphs larger than SHARD_MAX_REQUIREMENTS, "always" or "off"."""
+        return os.getenv("PEP2TC_TEST_SHARDING", "auto")
+
+    @property
+    def SHARD_MAX_REQUIREMENTS(self) -> int:
+        """Requirement budget of one test design call."""
+        return _env_int("PEP2TC_TEST_SHARD_MAX_REQUIREMENTS", 25)
+
+    @property
+    def CONCURRENCY(self) -> int:
+        """Shards designed at the same time."""
+        return _env_int("PEP2TC_TEST_CONCURRENCY", 4)
+
+    @property
+    def PROMPT_MAX_TOKENS(self) -> int:
+        """Token budget of the knowledge graph in one tester prompt (0 = unlimited)."""
+        return _env_int("PEP2TC_TEST_PROMPT_MAX_TOKENS", 60000)
+
+    @property
+    def COMPACT_PROMPT(self) -> bool:
+        return _env_bool("PEP2TC_TEST_PROMPT_COMPACT", False)
+
+    @property
+    def GAP_FILL_PASSES(self) -> int:
+        """Follow-up calls for requirements left without test cases (0 = off)."""
+        return _env_int("PEP2TC_TEST_GAP_FILL_PASSES", 1)
+
+    @property
+    def INCREMENTAL(self) -> bool:
+        """Reuse the previous run's test plan and only design tests for changed requirements."""
+        return _env_bool("PEP2TC_TEST_INCREMENTAL", False)
+
+    @property
+    def STREAM(self) -> bool:
+        """Parse test cases from the streamed response and write them as they complete."""
+        return _env_bool("PEP2TC_TEST_STREAM", True)
+
+class CompressionSettings:
+    @property
+    def ENABLED(self) -> bool:
+        """Compress PEP content (boilerplate, duplicate code, long listings) before prompting."""
+        return _env_bool("PEP2TC_COMPRESS", True)
+
+    @property
+    def MAX_LISTING_LINES(self) -> int:
+        """Code listings longer than this are truncated with a pointer to the full section."""
+        return _env_int("PEP2TC_COMPRESS_MAX_LISTING_LINES", 40)
+
+    @property
+    def MAX_TABLE_ROWS(self) -> int:
+        return _env_int("PEP2TC_COMPRESS_MAX_TABLE_ROWS", 20)
+
 class Settings:
     """
     Application configuration settings.
@@ -29,6 +373,19 @@ class Settings:
     """
     def __init__(self):
         self.model = ModelSettings()
+        self.llm = LLMSettings()
+        self.metrics = MetricsSettings()
         self.tavily = TavilySettings()
+        self.search = SearchSettings()
+        self.cache = CacheSettings()
+        self.fetch = FetchSettings()
+        self.http = HttpSettings()
+        self.corpus = CorpusSettings()
+        self.checkpoint = CheckpointSettings()
+        self.batch = BatchSettings()
+        self.queue = QueueSettings()
+        self.research = ResearchSettings()
+        self.compression = CompressionSettings()
+        self.tester = TesterSettings()
 
 settings = Settings()
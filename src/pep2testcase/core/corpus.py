@@ -0,0 +1,218 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import tarfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from pep2testcase.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Matches canonical and legacy PEP URLs, e.g. https://peps.python.org/pep-0008/
+# or https://www.python.org/dev/peps/pep-0008/
+PEP_URL_RE = re.compile(r"(?:peps\.python\.org|python\.org/dev/peps)/pep-(\d{1,4})\b", re.IGNORECASE)
+
+# Source files inside a python/peps checkout or a built HTML tree:
+# peps/pep-0008.rst, pep-0008.txt, pep-0008.html, pep-0008/index.html
+_SOURCE_RE = re.compile(r"(?:^|/)pep-(\d{4})(?:\.(rst|txt|html)|/index\.(html))$")
+
+# Preferred source when a PEP exists in several formats. HTML yields exactly
+# the text fetch_pep_content would produce from the live site.
+_FORMAT_RANK = {"html": 0, "rst": 1, "txt": 2}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS peps (
+    number INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT,
+    format TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    text TEXT NOT NULL,
+    raw BLOB
+);
+"""
+
+def canonical_pep_url(number: int) -> str:
+    return f"https://peps.python.org/pep-{number:04d}/"
+
+def pep_number_from_url(url: str) -> Optional[int]:
+    """Returns the PEP number addressed by ``url``, or None for non-PEP URLs."""
+    match = PEP_URL_RE.search(url)
+    return int(match.group(1)) if match else None
+
+def normalize_pep_url(url: str) -> str:
+    """Maps any PEP URL spelling (legacy host, missing zero padding, anchors) to the canonical one."""
+    number = pep_number_from_url(url)
+    return canonical_pep_url(number) if number is not None else url
+
+@dataclass
+class PepRecord:
+    number: int
+    url: str
+    title: Optional[str]
+    format: str
+    text: str
+    raw: Optional[bytes] = None
+
+def _title_from_source(fmt: str, raw: str) -> Optional[str]:
+    if fmt == "html":
+        match = re.search(r"<title>(.*?)</title>", raw, re.IGNORECASE | re.DOTALL)
+        if match:
+            return match.group(1).split(" | ")[0].strip()
+        return None
+    match = re.search(r"^Title:\s*(.+)$", raw, re.MULTILINE)
+    return match.group(1).strip() if match else None
+
+def _to_record(number: int, fmt: str, data: bytes) -> PepRecord:
+    # Imported lazily: the tools package itself depends on this module.
+    from pep2testcase.core.agents.tools.extract import get_extractor
+
+    raw = data.decode("utf-8", errors="replace")
+    text = get_extractor()(data) if fmt == "html" else raw.strip()
+    return PepRecord(
+        number=number,
+        url=canonical_pep_url(number),
+        title=_title_from_source(fmt, raw),
+        format=fmt,
+        text=text,
+        raw=data,
+    )
+
+def _iter_directory(root: Path) -> Iterator[tuple[str, Callable[[], bytes]]]:
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = Path(dirpath) / filename
+            yield path.relative_to(root).as_posix(), path.read_bytes
+
+def _iter_tarball(path: Path) -> Iterator[tuple[str, Callable[[], bytes]]]:
+    with tarfile.open(path) as tar:
+        for member in tar:
+            if member.isfile():
+                yield member.name, lambda m=member: tar.extractfile(m).read()
+
+def scan_sources(source: Path | str) -> dict[int, tuple[str, bytes]]:
+    """
+    Finds PEP source files in a directory or tarball.
+    Returns ``{number: (format, data)}`` keeping the preferred format per PEP.
+    """
+    source = Path(source)
+    entries = _iter_directory(source) if source.is_dir() else _iter_tarball(source)
+    found: dict[int, tuple[str, bytes]] = {}
+    for name, read in entries:
+        match = _SOURCE_RE.search(name)
+        if not match:
+            continue
+        number = int(match.group(1))
+        fmt = match.group(2) or match.group(3)
+        current = found.get(number)
+        if current is None or _FORMAT_RANK[fmt] < _FORMAT_RANK[current[0]]:
+            # Read while the tarball is still open
+            found[number] = (fmt, read())
+    return found
+
+class PepCorpus:
+    """
+    Local SQLite store of PEP texts, indexed by PEP number (primary key) and URL.
+    Lets fetch_pep_content resolve peps.python.org URLs without network access.
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self._lock = threading.Lock()
+
+    def _migrate(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(peps)")}
+        if "raw" not in columns:
+            # Corpora ingested before section retrieval existed
+            self._conn.execute("ALTER TABLE peps ADD COLUMN raw BLOB")
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM peps").fetchone()[0]
+
+    def add(self, records: Iterable[PepRecord]) -> int:
+        """Inserts or replaces records. Returns the number written."""
+        rows = [
+            (r.number, r.url, r.title, r.format, hashlib.sha256(r.text.encode("utf-8")).hexdigest(), r.text, r.raw)
+            for r in records
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO peps (number, url, title, format, sha, text, raw) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def get(self, number: int, with_raw: bool = False) -> Optional[PepRecord]:
+        columns = "number, url, title, format, text" + (", raw" if with_raw else "")
+        with self._lock:
+            row = self._conn.execute(f"SELECT {columns} FROM peps WHERE number = ?", (number,)).fetchone()
+        return PepRecord(*row) if row else None
+
+    def lookup_url(self, url: str) -> Optional[str]:
+        """Returns the stored text for a PEP URL, or None if it is not a PEP or not ingested."""
+        number = pep_number_from_url(url)
+        if number is None:
+            return None
+        record = self.get(number)
+        return record.text if record else None
+
+    def numbers(self) -> list[int]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT number FROM peps ORDER BY number")]
+
+    def digests(self) -> dict[int, str]:
+        """PEP number -> sha256 of its stored text; cheap change detection for indexers."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT number, sha FROM peps"))
+
+    def iter_records(self) -> Iterator[PepRecord]:
+        with self._lock:
+            rows = self._conn.execute("SELECT number, url, title, format, text FROM peps ORDER BY number").fetchall()
+        for row in rows:
+            yield PepRecord(*row)
+
+    def ingest(self, source: Path | str, batch_size: int = 100) -> int:
+        """Bulk-loads every PEP found in a directory or tarball. Returns the count."""
+        found = scan_sources(source)
+        batch = []
+        total = 0
+        for number in sorted(found):
+            fmt, data = found[number]
+            batch.append(_to_record(number, fmt, data))
+            if len(batch) >= batch_size:
+                total += self.add(batch)
+                batch = []
+        total += self.add(batch)
+        logger.info(f"Ingested {total} PEPs from {source} into {self.path}")
+        return total
+
+_corpora: dict[str, PepCorpus] = {}
+_corpora_lock = threading.Lock()
+
+def default_corpus_path() -> str:
+    return settings.corpus.PATH or os.path.join(settings.cache.DIR, "corpus.sqlite")
+
+def get_corpus() -> Optional[PepCorpus]:
+    """Returns the shared corpus if one has been ingested, otherwise None."""
+    path = default_corpus_path()
+    with _corpora_lock:
+        corpus = _corpora.get(path)
+        if corpus is None:
+            if not os.path.exists(path):
+                return None
+            corpus = PepCorpus(path)
+            _corpora[path] = corpus
+        return corpus
@@ -1,16 +1,26 @@
+from typing import Optional
 from langgraph.graph import StateGraph, END
-from pep2testcase.core.state import AgentState
+from pep2testcase.core.state import AgentState, RunContext
+from pep2testcase.core.config import settings
+from pep2testcase.core.agents.pipeline import pipelined_research_node
 from pep2testcase.core.agents.researcher import research_node
 from pep2testcase.core.agents.tester import tester_node
 
-def create_graph():
+def create_graph(checkpointer=None, pipelined: Optional[bool] = None):
     """
     Constructs the LangGraph workflow for PEP-2-TestCase.
+    With a checkpointer (see core.checkpoint) the state is saved after every node,
+    so an interrupted or failed run can be resumed.
+    In pipelined mode (default: PEP2TC_PIPELINE) test design starts on the modules the
+    researcher finalizes while research is still running; the node keeps its name, so
+    checkpoints and --resume work the same in both modes.
     """
-    workflow = StateGraph(AgentState)
+    if pipelined is None:
+        pipelined = settings.research.PIPELINE
+    workflow = StateGraph(AgentState, context_schema=RunContext)
     
     # Define Nodes
-    workflow.add_node("researcher", research_node)
+    workflow.add_node("researcher", pipelined_research_node if pipelined else research_node)
     workflow.add_node("tester", tester_node)
     
     # Define Edges
@@ -21,5 +31,5 @@ def create_graph():
     workflow.add_edge("tester", END)
     
     # Compile
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=checkpointer)
     return app
@@ -0,0 +1,252 @@
+import asyncio
+import json
+import logging
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+
+from pep2testcase.core.config import settings
+from pep2testcase.core.ratelimit import RateLimiter, estimate_request_tokens, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "pep2testcase (+https://github.com/markshao/pep_2_testcase)"
+
+# httpx.AsyncClient and asyncio.Semaphore are bound to the event loop they are first
+# used on, so the "process-wide" pool is kept per running loop. The CLI runs a single
+# loop, which makes this one shared keep-alive pool per process in practice.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_host_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+def _make_async_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.http.MAX_CONNECTIONS,
+        max_keepalive_connections=settings.http.MAX_KEEPALIVE,
+        keepalive_expiry=settings.http.KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=settings.fetch.TIMEOUT,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT},
+    )
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Returns the shared keep-alive AsyncClient for the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _make_async_client()
+        _async_clients[loop] = client
+    return client
+
+def get_session() -> requests.Session:
+    """
+    Returns the shared requests.Session used by synchronous fetches,
+    so repeated calls reuse TCP/TLS connections.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers["User-Agent"] = USER_AGENT
+        return _session
+
+@asynccontextmanager
+async def host_slot(url: str):
+    """
+    Limits the number of concurrent requests to the host of ``url``.
+    """
+    loop = asyncio.get_running_loop()
+    slots = _host_slots.setdefault(loop, {})
+    host = urlsplit(url).netloc.lower()
+    semaphore = slots.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.http.PER_HOST_LIMIT)
+        slots[host] = semaphore
+    async with semaphore:
+        yield
+
+async def aclose_clients():
+    """Closes the pooled AsyncClients of the running loop (call before the loop exits)."""
+    loop = asyncio.get_running_loop()
+    _host_slots.pop(loop, None)
+    for clients in (_async_clients, _llm_async_clients):
+        client = clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+# --- Model API clients ---
+
+def _retry_after(response: httpx.Response) -> float:
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        return float(headers.get("retry-after", 1.0))
+    except ValueError:
+        return 1.0
+
+def _usage_tokens(body: bytes) -> int | None:
+    try:
+        usage = json.loads(body).get("usage") or {}
+    except (ValueError, AttributeError):
+        return None
+    return usage.get("total_tokens")
+
+class _LimitedStream:
+    """
+    Wraps a response stream so the limiter slot is released when the body is closed
+    (streamed completions hold their slot until the last chunk). JSON bodies are
+    buffered on the way through to reconcile the token estimate with the real usage.
+    """
+
+    def __init__(self, stream, limiter: RateLimiter, estimated: int, is_json: bool):
+        self._stream = stream
+        self._limiter = limiter
+        self._estimated = estimated
+        self._chunks = [] if is_json else None
+        self._released = False
+
+    def _consume(self, chunk: bytes) -> bytes:
+        if self._chunks is not None:
+            self._chunks.append(chunk)
+        return chunk
+
+    def _release(self):
+        if not self._released:
+            self._released = True
+            actual = _usage_tokens(b"".join(self._chunks)) if self._chunks else None
+            self._limiter.release(self._estimated, actual)
+
+    def __iter__(self):
+        for chunk in self._stream:
+            yield self._consume(chunk)
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield self._consume(chunk)
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+class _SyncLimitedStream(_LimitedStream, httpx.SyncByteStream):
+    pass
+
+class _AsyncLimitedStream(_LimitedStream, httpx.AsyncByteStream):
+    pass
+
+def _is_json(response: httpx.Response) -> bool:
+    return response.headers.get("content-type", "").startswith("application/json")
+
+def _finish(response: httpx.Response, limiter: RateLimiter, estimated: int) -> bool:
+    """
+    Applies a 429 pause. Returns True if the body is still to be read (release on close);
+    bodies the transport already loaded release the slot right away.
+    """
+    if response.status_code == 429:
+        limiter.pause(_retry_after(response))
+    if response.is_closed:
+        limiter.release(estimated, _usage_tokens(response.content) if _is_json(response) else None)
+        return False
+    return True
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """Applies the shared model API limits to every request sent through ``transport``."""
+
+    def __init__(self, transport: httpx.BaseTransport, limiter: RateLimiter):
+        self._transport = transport
+        self._limiter = limiter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        estimated = estimate_request_tokens(request.read())
+        # acquire holds no slot if it raises, so only the request itself needs the release below
+        self._limiter.acquire(estimated)
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            self._limiter.release(estimated)
+            raise
+        if _finish(response, self._limiter, estimated):
+            response.stream = _SyncLimitedStream(response.stream, self._limiter, estimated, _is_json(response))
+        return response
+
+    def close(self):
+        self._transport.close()
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: RateLimiter):
+        self._transport = transport
+        self._limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        estimated = estimate_request_tokens(await request.aread())
+        # aacquire holds no slot if it raises (e.g. cancelled while paused), so only the
+        # request itself needs the release below
+        await self._limiter.aacquire(estimated)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._limiter.release(estimated)
+            raise
+        if _finish(response, self._limiter, estimated):
+            response.stream = _AsyncLimitedStream(response.stream, self._limiter, estimated, _is_json(response))
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+_llm_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_llm_client: httpx.Client | None = None
+_llm_client_lock = threading.Lock()
+
+def _llm_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.http.MAX_CONNECTIONS,
+        max_keepalive_connections=settings.http.MAX_KEEPALIVE,
+        keepalive_expiry=settings.http.KEEPALIVE_EXPIRY,
+    )
+
+def _make_llm_transport() -> httpx.BaseTransport:
+    return httpx.HTTPTransport(limits=_llm_limits())
+
+def _make_llm_async_transport() -> httpx.AsyncBaseTransport:
+    return httpx.AsyncHTTPTransport(limits=_llm_limits())
+
+def get_llm_http_client() -> httpx.Client:
+    """Shared keep-alive client for synchronous model calls, behind the model rate limiter."""
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None or _llm_client.is_closed:
+            transport = RateLimitedTransport(_make_llm_transport(), get_rate_limiter())
+            _llm_client = httpx.Client(transport=transport, timeout=None)
+        return _llm_client
+
+def get_llm_async_client() -> httpx.AsyncClient:
+    """Shared keep-alive client for async model calls on the running loop, behind the rate limiter."""
+    loop = asyncio.get_running_loop()
+    client = _llm_async_clients.get(loop)
+    if client is None or client.is_closed:
+        transport = AsyncRateLimitedTransport(_make_llm_async_transport(), get_rate_limiter())
+        # Per-request timeouts come from the OpenAI client
+        client = httpx.AsyncClient(transport=transport, timeout=None)
+        _llm_async_clients[loop] = client
+    return client
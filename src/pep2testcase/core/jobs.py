@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from pep2testcase.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+PRAGMA journal_mode=WAL;
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pep_url TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_id TEXT,
+    worker TEXT,
+    lease_expires REAL,
+    not_before REAL NOT NULL,
+    error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, not_before);
+"""
+
+# Job states: queued -> running -> done, or back to queued (retry) / failed (out of attempts)
+STATUSES = ("queued", "running", "done", "failed")
+
+_COLUMNS = "id, pep_url, output_dir, status, attempts, run_id, worker, error"
+
+@dataclass
+class Job:
+    id: int
+    pep_url: str
+    output_dir: str
+    status: str
+    attempts: int
+    # Checkpoint run of the job, kept across attempts so a retry resumes it
+    run_id: Optional[str] = None
+    worker: Optional[str] = None
+    error: Optional[str] = None
+
+class JobQueue:
+    """
+    Durable PEP jobs shared by worker processes. A worker claims a job with a lease it
+    renews while the job runs; a job whose lease runs out (its worker crashed or hung)
+    is claimed again by another worker, and counts as a used attempt. Failed jobs are
+    retried with exponential backoff until ``max_attempts`` runs were made.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        lease: float = 120.0,
+        max_attempts: int = 3,
+        retry_delay: float = 30.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.lease = lease
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self._clock = clock
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Workers in other processes hold the write lock for a few milliseconds at a time
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def enqueue(self, pep_url: str, output_dir: str) -> tuple[int, bool]:
+        """Adds a job and returns (job ID, created); a queued or running job for the same target is reused."""
+        now = self._clock()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE pep_url = ? AND output_dir = ? AND status IN ('queued', 'running')",
+                (pep_url, output_dir),
+            ).fetchone()
+            if row is not None:
+                return row[0], False
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (pep_url, output_dir, status, not_before, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?)",
+                (pep_url, output_dir, now, now, now),
+            )
+            return cursor.lastrowid, True
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Leases the oldest runnable job to ``worker``, or returns None if there is none."""
+        now = self._clock()
+        with self._lock, self._conn:
+            # Jobs whose last allowed attempt was lost with its worker are given up first
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', worker = NULL, lease_expires = NULL, updated_at = ?, "
+                "error = 'worker lost its lease on the last attempt' "
+                "WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            # One statement, so two processes can never claim the same job
+            row = self._conn.execute(
+                f"UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, lease_expires = ?, "
+                f"updated_at = ? WHERE id = ("
+                f"SELECT id FROM jobs WHERE (status = 'queued' AND not_before <= ?) "
+                f"OR (status = 'running' AND lease_expires < ?) ORDER BY id LIMIT 1"
+                f") RETURNING {_COLUMNS}",
+                (worker, now + self.lease, now, now, now),
+            ).fetchone()
+        return Job(*row) if row else None
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        """Renews the lease; False if the job is no longer held by ``worker``."""
+        now = self._clock()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + self.lease, now, job_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def set_run_id(self, job_id: int, worker: str, run_id: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET run_id = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (run_id, job_id, worker),
+            )
+
+    def complete(self, job_id: int, worker: str, result: dict) -> bool:
+        now = self._clock()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'done', lease_expires = NULL, error = NULL, result = ?, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result), now, job_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker: str, error: str, result: Optional[dict] = None) -> Optional[str]:
+        """Records a failed attempt; returns the job's new status ("queued" or "failed"), None if not held."""
+        now = self._clock()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT attempts FROM jobs WHERE id = ? AND worker = ? AND status = 'running'", (job_id, worker)
+            ).fetchone()
+            if row is None:
+                return None
+            attempts = row[0]
+            status = "failed" if attempts >= self.max_attempts else "queued"
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, lease_expires = NULL, not_before = ?, error = ?, result = ?, "
+                "updated_at = ? WHERE id = ?",
+                (status, now + self.retry_delay * 2 ** (attempts - 1), error,
+                 json.dumps(result) if result else None, now, job_id),
+            )
+        return status
+
+    def release(self, job_id: int, worker: str):
+        """Hands a job back without using up an attempt (the worker is shutting down)."""
+        now = self._clock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, worker = NULL, lease_expires = NULL, "
+                "not_before = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (now, now, job_id, worker),
+            )
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(*row) if row else None
+
+    def jobs(self, status: Optional[str] = None) -> list[Job]:
+        with self._lock:
+            if status is None:
+                rows = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs ORDER BY id").fetchall()
+            else:
+                rows = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM jobs WHERE status = ? ORDER BY id", (status,)
+                ).fetchall()
+        return [Job(*row) for row in rows]
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in STATUSES} | dict(rows)
+
+    def pending(self) -> int:
+        """Jobs not finished yet: queued (including ones waiting to be retried) or running."""
+        counts = self.counts()
+        return counts["queued"] + counts["running"]
+
+    def close(self):
+        self._conn.close()
+
+def default_queue_path() -> str:
+    return settings.queue.PATH or os.path.join(settings.cache.DIR, "jobs.sqlite")
+
+def open_job_queue(path: Optional[str] = None) -> JobQueue:
+    """The job queue at ``path`` (default: PEP2TC_QUEUE_PATH or the cache directory) with the configured limits."""
+    return JobQueue(
+        path or default_queue_path(),
+        lease=settings.queue.LEASE,
+        max_attempts=settings.queue.MAX_ATTEMPTS,
+        retry_delay=settings.queue.RETRY_DELAY,
+    )
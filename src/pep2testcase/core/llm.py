@@ -1,23 +1,106 @@
-import os
+import asyncio
+import threading
+import weakref
+from typing import Optional
+
+import openai
 from langchain_openai import ChatOpenAI
+from pep2testcase.core.cache import get_llm_cache
 from pep2testcase.core.config import settings
+from pep2testcase.core.http import get_llm_async_client, get_llm_http_client
+
+# Errors after which the fallback model is tried: the provider is slow or overloaded,
+# not the request itself being wrong (those would fail on the fallback too).
+OVERLOAD_ERRORS: tuple[type[BaseException], ...] = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    asyncio.TimeoutError,
+)
+
+# Agent roles with their own model setting (see ModelSettings)
+ROLES = ("lead", "sub", "tester", "fallback")
+
+# Models are shared per event loop (their async HTTP client is bound to it), so every
+# agent in the process reuses the same keep-alive connections and rate limiter.
+_models: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple, ChatOpenAI]]" = weakref.WeakKeyDictionary()
+_sync_models: dict[tuple, ChatOpenAI] = {}
+_models_lock = threading.Lock()
 
-def get_model(temperature: float = 0) -> ChatOpenAI:
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+def model_name_for(role: Optional[str] = None) -> Optional[str]:
+    """The configured model for ``role`` (None = OPENAI_MODEL_NAME)."""
+    if role is None:
+        return settings.model.MODEL_NAME
+    if role not in ROLES:
+        raise ValueError(f"Unknown model role '{role}'. Expected one of: {', '.join(ROLES)}")
+    return getattr(settings.model, f"{role.upper()}_MODEL_NAME")
+
+def get_model(temperature: float = 0, role: Optional[str] = None) -> ChatOpenAI:
     """
     Returns a configured ChatOpenAI instance based on environment variables.
     Supports Kimi, DeepSeek, etc. via OPENAI_BASE_URL.
     
     Configuration is loaded from pep2testcase.core.config.settings
+
+    ``role`` ("lead", "sub", "tester", "fallback") selects the per-role model
+    (PEP2TC_MODEL_LEAD, ...), defaulting to OPENAI_MODEL_NAME.
+
+    Responses go through the persistent LLM cache (core/cache/llm.py), keyed on the
+    model config, the full message list and any bound tools / response schema.
+    Requests go through the shared HTTP pool and the process-wide rate limiter
+    (PEP2TC_LLM_RPM / _TPM / _MAX_IN_FLIGHT), see core/ratelimit.py.
     """
     api_key = settings.model.API_KEY
     base_url = settings.model.BASE_URL
-    model_name = settings.model.MODEL_NAME
-
-    # Ensure we don't pass None to base_url if it's not set, 
-    # though ChatOpenAI handles None by using default.
-    return ChatOpenAI(
-        model=model_name,
-        api_key=api_key,
-        base_url=base_url,
-        temperature=temperature
-    )
+    model_name = model_name_for(role)
+    if model_name is None:
+        raise ValueError(f"No model configured for role '{role}'")
+
+    if settings.llm.REPLAY and not api_key:
+        # Replay never reaches the API, but the client still insists on a key
+        api_key = "replay"
+
+    cache = get_llm_cache()
+    timeout = settings.model.TIMEOUT
+    max_retries = settings.model.MAX_RETRIES
+    loop = _running_loop()
+    http_client = get_llm_http_client()
+    http_async_client = get_llm_async_client() if loop is not None else None
+    key = (model_name, api_key, base_url, temperature, timeout, max_retries, cache, http_client, http_async_client)
+
+    with _models_lock:
+        models = _models.setdefault(loop, {}) if loop is not None else _sync_models
+        model = models.get(key)
+        if model is None:
+            # Ensure we don't pass None to base_url if it's not set, 
+            # though ChatOpenAI handles None by using default.
+            model = ChatOpenAI(
+                model=model_name,
+                api_key=api_key,
+                base_url=base_url,
+                temperature=temperature,
+                timeout=timeout,
+                max_retries=max_retries,
+                cache=cache,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+            models[key] = model
+        return model
+
+def get_fallback_model(temperature: float = 0, role: Optional[str] = None) -> Optional[ChatOpenAI]:
+    """
+    Returns the fallback model for calls made as ``role``, or None when no fallback is
+    configured or it is the same model as the primary.
+    """
+    fallback_name = settings.model.FALLBACK_MODEL_NAME
+    if not fallback_name or fallback_name == model_name_for(role):
+        return None
+    return get_model(temperature, role="fallback")
@@ -0,0 +1,172 @@
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from pep2testcase.core.cache import is_cached_response
+from pep2testcase.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens: (input, cached input, output). Override with PEP2TC_PRICE_PER_MTOK.
+MODEL_PRICES: dict[str, tuple[float, float, float]] = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "o3": (2.00, 0.50, 8.00),
+    "o4-mini": (1.10, 0.275, 4.40),
+    "deepseek-chat": (0.27, 0.07, 1.10),
+}
+
+def model_prices(model_name: Optional[str]) -> Optional[tuple[float, float, float]]:
+    override = settings.metrics.PRICE_PER_MTOK
+    if override:
+        return override
+    if not model_name:
+        return None
+    # Dated snapshots ("gpt-4o-2024-08-06") are priced like their base model
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model_name == name or model_name.startswith(f"{name}-"):
+            return MODEL_PRICES[name]
+    return None
+
+def estimate_cost(model_name: Optional[str], prompt: int, cached: int, completion: int) -> float:
+    prices = model_prices(model_name)
+    if prices is None:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    return ((prompt - cached) * input_price + cached * cached_price + completion * output_price) / 1_000_000
+
+@dataclass
+class Totals:
+    calls: int = 0
+    # Calls answered from the LLM cache (or --replay): no tokens billed, no cost
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    tool_calls: int = 0
+    latency_s: float = 0.0
+    cost_usd: float = 0.0
+
+    def add(self, other: "Totals"):
+        for name in self.__dataclass_fields__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["latency_s"] = round(self.latency_s, 3)
+        data["cost_usd"] = round(self.cost_usd, 6)
+        return data
+
+def usage_from_message(message: Any) -> tuple[int, int, int]:
+    """(prompt, completion, cached prompt) tokens from an AIMessage's usage_metadata."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return (
+        usage.get("input_tokens", 0) or 0,
+        usage.get("output_tokens", 0) or 0,
+        details.get("cache_read", 0) or 0,
+    )
+
+def model_name_of(message: Any) -> Optional[str]:
+    metadata = getattr(message, "response_metadata", None) or {}
+    return metadata.get("model_name") or settings.model.MODEL_NAME
+
+@dataclass
+class MetricsRecorder:
+    """
+    Accumulates model usage for one PEP run, broken down by phase and agent.
+    ``listeners`` are called after every record (the UI uses this to refresh totals).
+    """
+    pep_url: str
+    phases: dict[str, dict[str, Totals]] = field(default_factory=dict)
+    listeners: list[Callable[[], None]] = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        phase: str,
+        agent: str,
+        message: Any,
+        latency: float,
+    ):
+        """
+        Records one model call from its response message. A response served from the
+        LLM cache still carries the usage of the original call, so it only counts as a
+        cache hit.
+        """
+        tool_calls = len(getattr(message, "tool_calls", None) or [])
+        if is_cached_response(message):
+            call = Totals(cache_hits=1, tool_calls=tool_calls, latency_s=latency)
+        else:
+            prompt, completion, cached = usage_from_message(message)
+            call = Totals(
+                calls=1,
+                prompt_tokens=prompt,
+                completion_tokens=completion,
+                cached_tokens=cached,
+                tool_calls=tool_calls,
+                latency_s=latency,
+                cost_usd=estimate_cost(model_name_of(message), prompt, cached, completion),
+            )
+        with self._lock:
+            self.phases.setdefault(phase, {}).setdefault(agent, Totals()).add(call)
+        for listener in self.listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.debug(f"Metrics listener failed: {e}")
+
+    def totals(self, phase: Optional[str] = None) -> Totals:
+        total = Totals()
+        with self._lock:
+            for name, agents in self.phases.items():
+                if phase is None or name == phase:
+                    for agent_totals in agents.values():
+                        total.add(agent_totals)
+        return total
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            phases = {
+                name: {
+                    "agents": {agent: t.as_dict() for agent, t in agents.items()},
+                }
+                for name, agents in self.phases.items()
+            }
+        for name in phases:
+            phases[name]["totals"] = self.totals(name).as_dict()
+        return {
+            "pep_url": self.pep_url,
+            "model": settings.model.MODEL_NAME,
+            "wall_clock_s": round(time.time() - self.started_at, 3),
+            "totals": self.totals().as_dict(),
+            "phases": phases,
+        }
+
+    def write(self, path: Path | str) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+        return path
+
+    def summary(self) -> str:
+        """One-line totals for the UI header."""
+        t = self.totals()
+        return (
+            f"Tokens: {_human(t.prompt_tokens)} in ({_human(t.cached_tokens)} cached) / "
+            f"{_human(t.completion_tokens)} out | Calls: {t.calls} | Cache hits: {t.cache_hits} | Tools: {t.tool_calls} | "
+            f"Model time: {t.latency_s:.1f}s | Cost: ${t.cost_usd:.4f}"
+        )
+
+def _human(n: int) -> str:
+    return f"{n / 1000:.1f}k" if n >= 1000 else str(n)
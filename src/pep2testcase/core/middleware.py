@@ -1,10 +1,19 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
 from typing import Callable, Awaitable, Any, Optional
-from langchain.agents.middleware.types import AgentMiddleware, ModelRequest, ModelResponse
+from langchain.agents.middleware.types import AgentMiddleware, ModelRequest, ModelResponse, ToolCallRequest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
 from rich.tree import Tree
 
+from pep2testcase.core.cache.reports import ReportStore, StoredReport, content_hash
+
+logger = logging.getLogger(__name__)
+
 class SimpleToolLoggerMiddleware(AgentMiddleware):
     """
     Middleware that logs tool calls to a UI manager if provided, 
@@ -110,3 +119,293 @@ class SimpleToolLoggerMiddleware(AgentMiddleware):
             
         if self.ui:
             self.ui.add_log(Panel(content, border_style=color, title=f"[{color}]{title}[/] ({self.agent_name})", title_align="left"))
+
+
+def _response_message(response: Any) -> Optional[AIMessage]:
+    """The AIMessage of a model call (a structured-output ToolMessage may follow it)."""
+    if isinstance(response, AIMessage):
+        return response
+    return next((m for m in getattr(response, "result", None) or [] if isinstance(m, AIMessage)), None)
+
+class MetricsMiddleware(AgentMiddleware):
+    """
+    Records tokens (prompt / completion / cached), latency, tool calls and estimated
+    cost of every model call into a MetricsRecorder, under ``phase`` and ``agent_name``.
+    """
+
+    def __init__(self, recorder: Optional[Any], agent_name: str = "Agent", phase: str = "research"):
+        self.recorder = recorder
+        self.agent_name = agent_name
+        self.phase = phase
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        started = time.perf_counter()
+        response = await handler(request)
+        if self.recorder is not None:
+            msg = _response_message(response)
+            if msg is not None:
+                self.recorder.record(self.phase, self.agent_name, msg, time.perf_counter() - started)
+        return response
+
+class OverloadFallbackMiddleware(AgentMiddleware):
+    """
+    Retries a model call on ``fallback_model`` when the primary model times out or is
+    overloaded (``errors``, by default core.llm.OVERLOAD_ERRORS). Unlike LangChain's
+    ModelFallbackMiddleware, request errors (bad schema, auth, replay misses) propagate.
+    """
+
+    def __init__(self, fallback_model: Any, errors: Optional[tuple] = None, agent_name: str = "Agent"):
+        if errors is None:
+            from pep2testcase.core.llm import OVERLOAD_ERRORS
+            errors = OVERLOAD_ERRORS
+        self.fallback_model = fallback_model
+        self.errors = errors
+        self.agent_name = agent_name
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        try:
+            return await handler(request)
+        except self.errors as e:
+            logger.warning(
+                f"{self.agent_name}: primary model failed ({type(e).__name__}); "
+                f"retrying on {getattr(self.fallback_model, 'model_name', 'fallback model')}"
+            )
+            return await handler(request.override(model=self.fallback_model))
+
+class DelegationBudget:
+    """
+    Limits shared by the lead and its sub-agents for one research run: sub-agents in
+    flight, delegation rounds (lead turns that call ``task``), wall-clock seconds and
+    model tokens. A limit of 0 is unlimited.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_rounds: int,
+        max_seconds: float = 0,
+        max_tokens: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_rounds = max_rounds
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        self.clock = clock
+        self.started = clock()
+        self.rounds = 0
+        self.tokens = 0
+
+    def remaining_seconds(self) -> Optional[float]:
+        if not self.max_seconds:
+            return None
+        return self.max_seconds - (self.clock() - self.started)
+
+    def time_or_tokens_exhausted(self) -> Optional[str]:
+        remaining = self.remaining_seconds()
+        if remaining is not None and remaining <= 0:
+            return f"time budget of {self.max_seconds:.0f}s used up"
+        if self.max_tokens and self.tokens >= self.max_tokens:
+            return f"token budget of {self.max_tokens} used up ({self.tokens} tokens)"
+        return None
+
+    def exhausted(self) -> Optional[str]:
+        """Why no further delegation is allowed, or None."""
+        if self.max_rounds and self.rounds >= self.max_rounds:
+            return f"all {self.max_rounds} delegation rounds used"
+        return self.time_or_tokens_exhausted()
+
+FINALIZE_NOTE = (
+    "Research budget exhausted: {reason}. Do not delegate any further. "
+    "Produce the final result now from the findings gathered so far."
+)
+
+def _tool_name(tool: Any) -> Optional[str]:
+    return tool.get("name") if isinstance(tool, dict) else getattr(tool, "name", None)
+
+class DelegationSchedulerMiddleware(AgentMiddleware):
+    """
+    Enforces a DelegationBudget. On the lead (``lead=True``) it counts delegation
+    rounds, runs ``task`` calls under the concurrency semaphore (stopping a sub-agent
+    when the time budget runs out) and refuses them once the budget is exhausted.
+    Every agent's model tokens are charged to the budget. Once it is exhausted, the
+    ``task`` tool (on the lead) or every tool (on sub-agents) is withdrawn and the
+    model is told to finish with what it has, so the run ends cleanly.
+    """
+
+    def __init__(
+        self, budget: DelegationBudget, agent_name: str = "Agent", lead: bool = True, ui_manager: Optional[Any] = None
+    ):
+        self.budget = budget
+        self.agent_name = agent_name
+        self.lead = lead
+        self.ui = ui_manager
+        self._announced = False
+
+    def _exhausted(self) -> Optional[str]:
+        if self.lead:
+            return self.budget.exhausted()
+        return self.budget.time_or_tokens_exhausted()
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        reason = self._exhausted()
+        if reason:
+            if not self._announced:
+                self._announced = True
+                logger.warning(f"{self.agent_name}: {reason}; asking it to finish")
+                if self.ui:
+                    self.ui.add_log(f"[yellow]{self.agent_name}: {reason}, finishing research[/]")
+            tools = [t for t in request.tools if self.lead and _tool_name(t) != "task"]
+            request = request.override(
+                tools=tools,
+                messages=[*request.messages, HumanMessage(content=FINALIZE_NOTE.format(reason=reason))],
+            )
+
+        response = await handler(request)
+        msg = _response_message(response)
+        if msg is not None:
+            usage = msg.usage_metadata or {}
+            self.budget.tokens += usage.get("total_tokens", 0)
+            if self.lead and any(tc.get("name") == "task" for tc in msg.tool_calls):
+                self.budget.rounds += 1
+        return response
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[Any]],
+    ) -> Any:
+        if not self.lead or request.tool_call.get("name") != "task":
+            return await handler(request)
+
+        def refused(reason: str) -> ToolMessage:
+            return ToolMessage(
+                content=f"Delegation refused: {reason}. Finish the research with the findings you have.",
+                tool_call_id=request.tool_call["id"],
+                name="task",
+                status="error",
+            )
+
+        # Rounds are counted when the lead's turn is parsed, so this one is already included
+        if self.budget.max_rounds and self.budget.rounds > self.budget.max_rounds:
+            return refused(f"all {self.budget.max_rounds} delegation rounds used")
+        async with self.budget.semaphore:
+            reason = self.budget.time_or_tokens_exhausted()
+            if reason:
+                return refused(reason)
+            remaining = self.budget.remaining_seconds()
+            try:
+                return await asyncio.wait_for(handler(request), timeout=remaining)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self.agent_name}: sub-agent stopped, time budget of {self.budget.max_seconds:.0f}s used up")
+                return refused(f"time budget of {self.budget.max_seconds:.0f}s used up before the sub-agent finished")
+
+# Source tool results read by the sub-agent running in the current task delegation
+_report_sources: ContextVar[Optional[list]] = ContextVar("pep2tc_report_sources", default=None)
+
+def _tool_text(result: Any) -> Optional[str]:
+    """The text of a tool result: a ToolMessage, or the last message of a Command update."""
+    if isinstance(result, ToolMessage):
+        return None if result.status == "error" else str(result.content)
+    update = getattr(result, "update", None)
+    messages = update.get("messages") if isinstance(update, dict) else None
+    if messages and isinstance(messages[-1], ToolMessage):
+        return _tool_text(messages[-1])
+    return None
+
+class ReportMemoMiddleware(AgentMiddleware):
+    """
+    Serves sub-agent reports from a ReportStore across runs. On the lead (``lead=True``)
+    a ``task`` delegation whose fingerprint matches a stored report is answered with it
+    instantly, provided every source the report was built from (calls to the
+    ``source_tools``, re-run and re-hashed) is unchanged; a changed source invalidates
+    the entry. Otherwise the sub-agent runs and its report is stored. On a sub-agent the
+    middleware records the hash of each source tool result.
+    """
+
+    def __init__(
+        self,
+        store: ReportStore,
+        source_tools: list,
+        version: str,
+        lead: bool = True,
+        refresh: bool = False,
+        agent_name: str = "Agent",
+        ui_manager: Optional[Any] = None,
+    ):
+        self.store = store
+        self.source_tools = {tool.name: tool for tool in source_tools}
+        self.version = version
+        self.lead = lead
+        self.refresh = refresh
+        self.agent_name = agent_name
+        self.ui = ui_manager
+
+    async def _sources_unchanged(self, sources: list[dict]) -> bool:
+        for source in sources:
+            tool = self.source_tools.get(source["tool"])
+            if tool is None:
+                return False
+            try:
+                text = await tool.ainvoke(source["args"])
+            except Exception as e:
+                logger.warning(f"Could not re-check report source {source['tool']}({source['args']}): {e}")
+                return False
+            if content_hash(str(text)) != source["sha"]:
+                return False
+        return True
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[Any]],
+    ) -> Any:
+        name = request.tool_call.get("name")
+        if not self.lead:
+            result = await handler(request)
+            sources = _report_sources.get()
+            if sources is not None and name in self.source_tools:
+                text = _tool_text(result)
+                if text is not None:
+                    sources.append({"tool": name, "args": request.tool_call.get("args", {}), "sha": content_hash(text)})
+            return result
+        if name != "task":
+            return await handler(request)
+
+        args = request.tool_call.get("args", {})
+        subagent = args.get("subagent_type", "")
+        topic = args.get("description", "")
+        fingerprint = self.store.fingerprint(subagent, topic, self.version)
+        if not self.refresh:
+            stored = self.store.get(fingerprint)
+            if stored is not None:
+                if await self._sources_unchanged(stored.sources):
+                    logger.info(f"{self.agent_name}: serving stored report for {topic[:60]!r}")
+                    if self.ui:
+                        self.ui.add_log(f"[green]Reused stored sub-agent report[/] ({topic[:60]})")
+                    return ToolMessage(content=stored.report, tool_call_id=request.tool_call["id"], name="task")
+                logger.info(f"{self.agent_name}: sources of the stored report for {topic[:60]!r} changed; researching again")
+                self.store.invalidate(fingerprint)
+
+        sources: list[dict] = []
+        token = _report_sources.set(sources)
+        try:
+            result = await handler(request)
+        finally:
+            _report_sources.reset(token)
+        report = _tool_text(result)
+        if report:
+            self.store.put(fingerprint, subagent, topic, StoredReport(report=report, sources=sources))
+        return result
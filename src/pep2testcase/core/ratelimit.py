@@ -0,0 +1,189 @@
+import asyncio
+import collections
+import json
+import logging
+import threading
+import time
+from typing import Optional
+
+from pep2testcase.core.config import settings
+from pep2testcase.core.tokens import CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``per_minute`` tokens per minute, holding at
+    most one minute's worth. ``reserve`` never blocks: it takes the tokens (the balance
+    may go negative) and returns how long the caller must wait before using them, so
+    concurrent callers are served in arrival order without polling.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float = 1) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # A request larger than the whole bucket must still go through eventually
+            self.tokens -= min(amount, self.capacity)
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def adjust(self, delta: float):
+        """Corrects an earlier reservation once the real cost is known (positive = refund)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + delta)
+
+class InFlightLimiter:
+    """
+    Caps concurrent requests across threads and event loops. Released slots are handed
+    directly to the oldest waiter, whether it is a thread or a coroutine on any loop.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: collections.deque = collections.deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.active < self.limit:
+                self.active += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.active < self.limit:
+                self.active += 1
+                return
+            future = loop.create_future()
+            self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if future in self._waiters:
+                    self._waiters.remove(future)
+                    raise
+            # The slot was handed over just as we were cancelled: pass it on.
+            self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                if not waiter.done() and not waiter.get_loop().is_closed():
+                    waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+                    return
+            self.active -= 1
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+def estimate_request_tokens(body: bytes) -> int:
+    """
+    Rough token cost of a chat completion request: prompt (serialized messages, tools
+    and schema) by character count, plus the completion budget when one is set.
+    """
+    tokens = len(body) // CHARS_PER_TOKEN
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return tokens
+    if isinstance(payload, dict):
+        tokens += int(payload.get("max_completion_tokens") or payload.get("max_tokens") or 0)
+    return tokens
+
+class RateLimiter:
+    """
+    Process-wide limits for model API calls: requests per minute, tokens per minute and
+    requests in flight. A limit of 0 disables that dimension. A 429 pauses every caller
+    for the server's Retry-After instead of letting each agent retry on its own.
+    """
+
+    def __init__(self, rpm: int, tpm: int, max_in_flight: int):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.in_flight = InFlightLimiter(max_in_flight) if max_in_flight > 0 else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _delay(self, tokens: int) -> float:
+        delay = 0.0
+        if self.requests:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens:
+            delay = max(delay, self.tokens.reserve(tokens))
+        with self._lock:
+            return max(delay, self._paused_until - time.monotonic())
+
+    # If waiting is interrupted (e.g. the caller is cancelled during a 429 pause or an
+    # RPM/TPM delay), the in-flight slot taken so far is given back before re-raising.
+
+    def acquire(self, tokens: int):
+        if self.in_flight:
+            self.in_flight.acquire()
+        try:
+            delay = self._delay(tokens)
+            if delay > 0:
+                time.sleep(delay)
+        except BaseException:
+            if self.in_flight:
+                self.in_flight.release()
+            raise
+
+    async def aacquire(self, tokens: int):
+        if self.in_flight:
+            await self.in_flight.aacquire()
+        try:
+            delay = self._delay(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except BaseException:
+            if self.in_flight:
+                self.in_flight.release()
+            raise
+
+    def release(self, estimated: int, actual: Optional[int] = None):
+        if self.in_flight:
+            self.in_flight.release()
+        if self.tokens and actual is not None:
+            self.tokens.adjust(estimated - actual)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"Model API rate limited; pausing all model calls for {seconds:.1f}s")
+
+_limiters: dict[tuple, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """Returns the limiter shared by every model client for the current settings."""
+    key = (settings.llm.RPM, settings.llm.TPM, settings.llm.MAX_IN_FLIGHT)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(*key)
+            _limiters[key] = limiter
+        return limiter
@@ -1,7 +1,7 @@
 from .research import PepKnowledgeGraph, FeatureModule, RequirementAtom
-from .test import TestPlan, TestCase
+from .test import TestPlan, TestCase, ModuleTests
 
 __all__ = [
     "PepKnowledgeGraph", "FeatureModule", "RequirementAtom",
-    "TestPlan", "TestCase"
+    "TestPlan", "TestCase", "ModuleTests"
 ]
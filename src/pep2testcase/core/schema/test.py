@@ -1,6 +1,8 @@
 from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 
+from .research import FeatureModule
+
 class TestCase(BaseModel):
     id: str = Field(..., description="Unique ID, e.g., TC-001")
     related_req_ids: List[str] = Field(default_factory=list, description="List of Requirement IDs covered by this test case")
@@ -14,3 +16,8 @@ class TestCase(BaseModel):
 class TestPlan(BaseModel):
     pep_title: str
     test_cases: List[TestCase]
+
+class ModuleTests(BaseModel):
+    """Test cases designed for a module the researcher finalized before research ended (pipelined mode)."""
+    module: FeatureModule
+    test_cases: List[TestCase]
@@ -0,0 +1,199 @@
+import heapq
+import logging
+import math
+import os
+import pickle
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout or tokenizer changes; older files are rebuilt.
+INDEX_VERSION = 1
+
+_TERM_RE = re.compile(r"[a-z0-9_]+")
+
+_STOP_WORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i if in into is it its
+no not of on or over should so such that the their then there these this to under
+was we were what when where which who why will with without you
+""".split())
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased word terms without stop words. Numbers lose zero padding ("0484" == "484")."""
+    terms = []
+    for term in _TERM_RE.findall(text.lower()):
+        if term in _STOP_WORDS:
+            continue
+        if term.isdigit():
+            term = term.lstrip("0") or "0"
+        terms.append(term)
+    return terms
+
+@dataclass
+class IndexedDoc:
+    key: str
+    url: str
+    title: str
+    stamp: str
+    length: int
+    terms: tuple[str, ...]
+
+class BM25Index:
+    """
+    In-memory inverted index with Okapi BM25 ranking.
+
+    Documents are identified by a caller-chosen ``key`` and carry a ``stamp`` (content
+    hash or file signature), so callers can re-index only what changed. Postings map
+    term -> {doc id: term frequency}; a query only touches the postings of its terms.
+    Document texts are not kept, only what ranking needs.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs: dict[int, IndexedDoc] = {}
+        self.postings: dict[str, dict[int, int]] = {}
+        self._ids: dict[str, int] = {}
+        self._next_id = 0
+        self._total_length = 0
+        # Per-document length normalisation and per-term BM25 weights, computed lazily
+        # and dropped on every update (both depend on the average document length)
+        self._norms: Optional[dict[int, float]] = None
+        self._weights: dict[str, dict[int, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def keys(self) -> set[str]:
+        return set(self._ids)
+
+    def stamp(self, key: str) -> Optional[str]:
+        doc_id = self._ids.get(key)
+        return self.docs[doc_id].stamp if doc_id is not None else None
+
+    def add(self, key: str, url: str, title: str, text: str, stamp: str):
+        """Indexes (or re-indexes) a document. The title counts as part of the text."""
+        self.remove(key)
+        counts = Counter(tokenize(title))
+        counts.update(tokenize(text))
+        doc_id = self._next_id
+        self._next_id += 1
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        length = sum(counts.values())
+        self.docs[doc_id] = IndexedDoc(key, url, title, stamp, length, tuple(counts))
+        self._ids[key] = doc_id
+        self._total_length += length
+        self._invalidate()
+
+    def remove(self, key: str) -> bool:
+        doc_id = self._ids.pop(key, None)
+        if doc_id is None:
+            return False
+        doc = self.docs.pop(doc_id)
+        for term in doc.terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+        self._total_length -= doc.length
+        self._invalidate()
+        return True
+
+    def _invalidate(self):
+        self._norms = None
+        self._weights = {}
+
+    def _compute_norms(self) -> dict[int, float]:
+        avg = self._total_length / len(self.docs) if self.docs else 0.0
+        k1, b = self.k1, self.b
+        return {
+            doc_id: k1 * (1 - b + b * (doc.length / avg if avg else 0.0))
+            for doc_id, doc in self.docs.items()
+        }
+
+    def _term_weights(self, term: str) -> Optional[dict[int, float]]:
+        weights = self._weights.get(term)
+        if weights is None:
+            posting = self.postings.get(term)
+            if not posting:
+                return None
+            if self._norms is None:
+                self._norms = self._compute_norms()
+            norms = self._norms
+            df = len(posting)
+            idf = math.log(1 + (len(self.docs) - df + 0.5) / (df + 0.5))
+            scale = idf * (self.k1 + 1)
+            weights = {doc_id: scale * tf / (tf + norms[doc_id]) for doc_id, tf in posting.items()}
+            self._weights[term] = weights
+        return weights
+
+    def search(self, query: str, limit: int = 5) -> list[tuple[IndexedDoc, float]]:
+        """Returns up to ``limit`` (document, score) pairs, best first."""
+        postings = [w for term in set(tokenize(query)) if (w := self._term_weights(term))]
+        if not postings:
+            return []
+        # Start from the longest posting list so the merge touches as few entries as possible
+        postings.sort(key=len, reverse=True)
+        scores = dict(postings[0])
+        for weights in postings[1:]:
+            for doc_id, weight in weights.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(self.docs[doc_id], score) for doc_id, score in best]
+
+    # --- Persistence ---
+
+    def save(self, path: Path | str):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        state = {
+            "version": INDEX_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "docs": self.docs,
+            "postings": self.postings,
+            "next_id": self._next_id,
+        }
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path | str) -> "BM25Index":
+        """Loads a saved index; returns an empty one if the file is missing, corrupt or outdated."""
+        index = cls()
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return index
+        except Exception as e:
+            logger.warning(f"Rebuilding unreadable search index {path}: {e}")
+            return index
+        if not isinstance(state, dict) or state.get("version") != INDEX_VERSION:
+            return index
+        index.k1, index.b = state["k1"], state["b"]
+        index.docs = state["docs"]
+        index.postings = state["postings"]
+        index._next_id = state["next_id"]
+        index._ids = {doc.key: doc_id for doc_id, doc in index.docs.items()}
+        index._total_length = sum(doc.length for doc in index.docs.values())
+        return index
+
+def make_snippet(text: str, query: str, width: int = 200) -> str:
+    """Returns ``width`` characters of ``text`` around the first query term it contains."""
+    text = " ".join(text.split())
+    lowered = text.lower()
+    positions = [
+        m.start() for term in set(tokenize(query))
+        if (m := re.search(rf"\b0*{re.escape(term)}\b", lowered))
+    ]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    return text[start:start + width]
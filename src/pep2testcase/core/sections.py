@@ -0,0 +1,175 @@
+import functools
+import re
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+
+from bs4 import BeautifulSoup, Tag
+
+from pep2testcase.core.tokens import count_tokens
+
+PREAMBLE_ID = "preamble"
+
+@dataclass
+class Section:
+    """
+    A node of the PEP section tree. ``text`` covers the whole subtree
+    (heading, body and nested sections) so it can be served on its own.
+    """
+    id: str
+    title: str
+    level: int
+    text: str = ""
+    children: List["Section"] = field(default_factory=list)
+
+    def walk(self) -> Iterator["Section"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+@dataclass
+class SectionTree:
+    """Parsed PEP: the header fields before the first heading, plus top-level sections."""
+    preamble: str
+    sections: List[Section]
+
+    def walk(self) -> Iterator[Section]:
+        for section in self.sections:
+            yield from section.walk()
+
+    def find(self, section_id: str) -> Optional[Section]:
+        if section_id == PREAMBLE_ID:
+            return Section(id=PREAMBLE_ID, title="Preamble", level=1, text=self.preamble)
+        wanted = section_id.strip().lstrip("#").lower()
+        for section in self.walk():
+            if section.id == wanted:
+                return section
+        # Be forgiving with titles passed instead of ids
+        for section in self.walk():
+            if section.title.lower() == wanted:
+                return section
+        return None
+
+    def ids(self) -> list[str]:
+        return [s.id for s in self.walk()]
+
+def _clean(text: str) -> str:
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+def slugify(title: str) -> str:
+    """docutils-style section id."""
+    slug = re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+    return slug or "section"
+
+# --- HTML (peps.python.org and legacy python.org layouts) ---
+
+def _is_section(tag: Tag) -> bool:
+    if tag.name == "section":
+        return bool(tag.get("id")) and tag.get("id") != "contents"
+    return tag.name == "div" and "section" in (tag.get("class") or [])
+
+def _heading(tag: Tag) -> Optional[Tag]:
+    for child in tag.children:
+        if isinstance(child, Tag) and re.fullmatch(r"h[1-6]", child.name):
+            return child
+    return None
+
+def _child_sections(tag: Tag) -> list[Tag]:
+    """Sections nested in ``tag`` that are not nested in another section first."""
+    found = []
+    for child in tag.children:
+        if not isinstance(child, Tag):
+            continue
+        if _is_section(child):
+            found.append(child)
+        else:
+            found.extend(_child_sections(child))
+    return found
+
+def _build(tag: Tag, level: int) -> Section:
+    heading = _heading(tag)
+    title = " ".join(heading.get_text(" ").split()) if heading else tag.get("id", "")
+    return Section(
+        id=tag.get("id") or slugify(title),
+        title=title,
+        level=level,
+        text=_clean(tag.get_text(separator="\n")),
+        children=[_build(child, level + 1) for child in _child_sections(tag)],
+    )
+
+def parse_html_sections(html: bytes) -> SectionTree:
+    soup = BeautifulSoup(html, "html.parser")
+    root = (
+        soup.find("section", id="pep-content")
+        or soup.find("article", class_="content")
+        or soup.find("div", class_="document")
+        or soup.body
+        or soup
+    )
+    for toc in root.find_all(["section", "div"], id="contents"):
+        toc.decompose()
+
+    top = _child_sections(root)
+    sections = [_build(tag, 1) for tag in top]
+    for tag in top:
+        tag.extract()
+    return SectionTree(preamble=_clean(root.get_text(separator="\n")), sections=sections)
+
+# --- reStructuredText (corpus sources) ---
+
+_UNDERLINE = re.compile(r"^([=\-~^\"'`#*+:.])\1{2,}\s*$")
+
+def parse_rst_sections(text: str) -> SectionTree:
+    lines = text.splitlines()
+    headings = []  # (line index, title, style)
+    styles: list[str] = []
+    i = 0
+    while i < len(lines) - 1:
+        title, underline = lines[i].rstrip(), lines[i + 1]
+        match = _UNDERLINE.match(underline)
+        if title.strip() and not _UNDERLINE.match(title) and match and len(underline.rstrip()) >= len(title.strip()):
+            overlined = i > 0 and lines[i - 1].strip() == underline.strip()
+            style = ("o" if overlined else "") + match.group(1)
+            if style not in styles:
+                styles.append(style)
+            start = i - 1 if overlined else i
+            headings.append((start, title.strip(), style))
+            i += 2
+            continue
+        i += 1
+
+    if not headings:
+        return SectionTree(preamble=text.strip(), sections=[])
+
+    roots: list[Section] = []
+    stack: list[Section] = []
+    used: dict[str, int] = {}
+    bounds = [h[0] for h in headings] + [len(lines)]
+    for index, (start, title, style) in enumerate(headings):
+        level = styles.index(style) + 1
+        slug = slugify(title)
+        used[slug] = used.get(slug, 0) + 1
+        section = Section(id=slug if used[slug] == 1 else f"{slug}-{used[slug] - 1}", title=title, level=level)
+        # The subtree ends at the next heading of the same or a higher level
+        end = next((bounds[j] for j in range(index + 1, len(headings)) if styles.index(headings[j][2]) + 1 <= level), len(lines))
+        section.text = _clean("\n".join(lines[start:end]))
+        while stack and stack[-1].level >= level:
+            stack.pop()
+        (stack[-1].children if stack else roots).append(section)
+        stack.append(section)
+
+    return SectionTree(preamble=_clean("\n".join(lines[:headings[0][0]])), sections=roots)
+
+@functools.lru_cache(maxsize=64)
+def parse_sections(raw: bytes, fmt: str) -> SectionTree:
+    """Parses PEP source (``html`` or ``rst``/``txt``) into a section tree. Memoized per content."""
+    if fmt == "html":
+        return parse_html_sections(raw)
+    return parse_rst_sections(raw.decode("utf-8", errors="replace"))
+
+def render_toc(tree: SectionTree) -> str:
+    """Table of contents with section ids and sizes, for the lead prompt."""
+    lines = [f"- [{PREAMBLE_ID}] Preamble (~{count_tokens(tree.preamble)} tokens)"]
+    for section in tree.walk():
+        indent = "  " * (section.level - 1)
+        lines.append(f"{indent}- [{section.id}] {section.title} (~{count_tokens(section.text)} tokens)")
+    return "\n".join(lines)
@@ -1,9 +1,11 @@
+from dataclasses import dataclass
 from typing import Annotated, List, Optional, Any
 from pydantic import BaseModel, Field
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage
+from langgraph.runtime import Runtime
 
-from pep2testcase.core.schema import PepKnowledgeGraph, TestPlan
+from pep2testcase.core.schema import ModuleTests, PepKnowledgeGraph, TestPlan
 
 class AgentState(BaseModel):
     """
@@ -19,6 +21,9 @@ class AgentState(BaseModel):
     # Phase 1 Output: Now using the Knowledge Graph (Mind Map)
     knowledge_graph: Optional[PepKnowledgeGraph] = Field(None, description="Structured PEP Mind Map")
     
+    # Tests designed while Phase 1 was still running (pipelined mode)
+    early_tests: List[ModuleTests] = Field(default_factory=list, description="Tests of modules finalized during research")
+    
     # Phase 2 Output
     test_plan: Optional[TestPlan] = Field(None, description="Generated test plan")
     
@@ -26,5 +31,23 @@ class AgentState(BaseModel):
     iteration_count: int = Field(0, description="Counter for research iterations")
     current_phase: str = Field("init", description="Current phase of the workflow")
     
-    # UI Manager (Runtime only, excluded from serialization ideally)
-    ui_manager: Optional[Any] = Field(None, description="Reference to UI Manager", exclude=True)
+    # Where artifacts are written; the tester streams test cases there as they are generated
+    artifact_dir: Optional[str] = Field(None, description="Output directory for artifacts")
+
+@dataclass
+class RunContext:
+    """
+    Per-run objects passed to the nodes through the LangGraph runtime context.
+    Unlike the state they are never checkpointed.
+    """
+    # UI Manager (cli.ui.UIManager)
+    ui_manager: Optional[Any] = None
+
+    # Usage accounting: a core.metrics.MetricsRecorder
+    metrics: Optional[Any] = None
+
+def run_context(runtime: Optional[Runtime[RunContext]]) -> RunContext:
+    """The run context of a node invocation (empty when the node is called directly)."""
+    if runtime is None or runtime.context is None:
+        return RunContext()
+    return runtime.context
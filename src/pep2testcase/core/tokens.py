@@ -0,0 +1,40 @@
+import functools
+import logging
+
+from pep2testcase.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Average characters per token for English prose with the OpenAI tokenizers.
+# Used when tiktoken (or its encoding files) is not available, e.g. offline.
+CHARS_PER_TOKEN = 4
+
+@functools.lru_cache(maxsize=8)
+def _encoding(model_name: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            return None
+    except Exception as e:
+        # Encoding files are downloaded on first use; offline runs fall back to estimates.
+        logger.debug(f"tiktoken unavailable ({e}); estimating token counts")
+        return None
+
+def count_tokens(text: str, model_name: str | None = None) -> int:
+    """
+    Counts tokens for ``text`` with the model's tokenizer, or estimates them
+    from the character count when no tokenizer is available.
+    """
+    if not text:
+        return 0
+    encoding = _encoding(model_name or settings.model.MODEL_NAME)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,75 @@
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from pep2testcase.core.agents.tester import node
+from pep2testcase.core.agents.tester.coverage import build_coverage
+from pep2testcase.core.schema import FeatureModule, PepKnowledgeGraph, RequirementAtom, TestCase, TestPlan
+from pep2testcase.core.state import AgentState
+
+def req(req_id: str, priority: str = "Must") -> RequirementAtom:
+    return RequirementAtom(id=req_id, description=f"{req_id} {priority} hold", priority=priority, source_quote="q")
+
+def case(case_id: str, *req_ids: str) -> TestCase:
+    return TestCase(id=case_id, related_req_ids=list(req_ids), title=case_id, description="",
+                    expected_result="", test_type="Positive")
+
+KG = PepKnowledgeGraph(
+    title="PEP 9999", status="Draft", global_constraints=[req("REQ-G", "Should")],
+    root_modules=[FeatureModule(name="Core", requirements=[req("REQ-1"), req("REQ-2")], sub_modules=[
+        FeatureModule(name="Errors", requirements=[req("REQ-3", "May")]),
+    ])],
+)
+
+def test_coverage_index():
+    plan = TestPlan(pep_title="PEP 9999", test_cases=[
+        case("TC-001", "REQ-1", "REQ-1"), case("TC-002", "REQ-1", "REQ-X"), case("TC-003", "REQ-3"),
+    ])
+
+    coverage = build_coverage(KG, plan)
+
+    assert coverage.tests["REQ-1"] == ["TC-001", "TC-002"]
+    assert coverage.uncovered == ["REQ-G", "REQ-2"]
+    assert coverage.dangling == [("TC-002", "REQ-X")]
+    assert coverage.by_priority() == {"Must": (1, 2), "Should": (0, 1), "May": (1, 1)}
+    assert coverage.percent() == 50.0
+    assert coverage.to_dict()["by_priority"]["Must"]["percent"] == 50.0
+    assert not coverage.complete
+
+@pytest.mark.asyncio
+async def test_gap_fill_asks_only_about_uncovered_requirements(monkeypatch):
+    monkeypatch.setenv("PEP2TC_TEST_SHARDING", "off")
+    prompts = []
+    replies = [
+        [case("TC-001", "REQ-1"), case("TC-002", "REQ-3")],
+        [case("TC-001", "REQ-G"), case("TC-002", "REQ-2")],
+    ]
+
+    async def fake_design(chain, spec_text, metrics=None, on_case=None, title=""):
+        prompts.append(spec_text)
+        return TestPlan(pep_title=title, test_cases=replies[len(prompts) - 1])
+
+    monkeypatch.setattr(node, "design_test_plan", fake_design)
+    # The chain is never invoked: design_test_plan is replaced
+    monkeypatch.setattr(node, "get_model", lambda **kwargs: RunnableLambda(lambda x: x))
+    monkeypatch.setattr(node, "get_fallback_model", lambda **kwargs: None)
+    monkeypatch.setattr(node, "streaming_model", lambda model: model)
+
+    result = await node.tester_node(AgentState(pep_url="https://peps.python.org/pep-9999/", knowledge_graph=KG))
+
+    assert len(prompts) == 2
+    assert prompts[1].startswith(node.GAP_FILL_NOTE)
+    assert "REQ-G" in prompts[1] and "REQ-2" in prompts[1]
+    assert "REQ-1" not in prompts[1] and "REQ-3" not in prompts[1]
+    assert [c.id for c in result["test_plan"].test_cases] == ["TC-001", "TC-002", "TC-003", "TC-004"]
+    assert build_coverage(KG, result["test_plan"]).complete
+
+@pytest.mark.asyncio
+async def test_failed_gap_fill_keeps_plan(monkeypatch):
+    plan = TestPlan(pep_title="PEP 9999", test_cases=[case("TC-001", "REQ-1")])
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("overloaded")
+
+    monkeypatch.setattr(node, "design_test_plan", fail)
+
+    assert await node.fill_coverage_gaps(None, KG, plan) == plan
@@ -0,0 +1,114 @@
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from pep2testcase.core.agents.tester import node
+from pep2testcase.core.agents.tester.incremental import (
+    carry_over, diff_graphs, merge_incremental, subgraph,
+)
+from pep2testcase.core.schema import FeatureModule, PepKnowledgeGraph, RequirementAtom, TestCase, TestPlan
+from pep2testcase.core.state import AgentState
+
+def req(req_id: str, description: str = "") -> RequirementAtom:
+    return RequirementAtom(id=req_id, description=description or f"{req_id} MUST hold", priority="Must", source_quote="q")
+
+def graph(*reqs: RequirementAtom) -> PepKnowledgeGraph:
+    return PepKnowledgeGraph(title="PEP 9999", status="Draft", root_modules=[
+        FeatureModule(name="Core", requirements=list(reqs[:2]), sub_modules=[
+            FeatureModule(name="Errors", requirements=list(reqs[2:])),
+        ]),
+    ])
+
+def case(case_id: str, *req_ids: str) -> TestCase:
+    return TestCase(id=case_id, related_req_ids=list(req_ids), title=case_id, description="",
+                    expected_result="", test_type="Positive")
+
+OLD = graph(req("REQ-1"), req("REQ-2"), req("REQ-3"))
+NEW = graph(req("REQ-1", "REQ-1   MUST hold"), req("REQ-2", "REQ-2 MUST NOT hold"), req("REQ-4"))
+OLD_PLAN = TestPlan(pep_title="PEP 9999", test_cases=[
+    case("TC-001", "REQ-1"), case("TC-002", "REQ-2"), case("TC-003", "REQ-3"), case("TC-004", "REQ-1", "REQ-3"),
+])
+
+def test_diff_hashes_requirements():
+    diff = diff_graphs(OLD, NEW)
+    # Whitespace-only edits are not changes
+    assert (diff.added, diff.changed, diff.removed, diff.unchanged) == ({"REQ-4"}, {"REQ-2"}, {"REQ-3"}, {"REQ-1"})
+
+def test_carry_over_and_merge():
+    kept = carry_over(OLD_PLAN, diff_graphs(OLD, NEW))
+
+    assert [(c.id, c.related_req_ids) for c in kept] == [("TC-001", ["REQ-1"]), ("TC-004", ["REQ-1"])]
+    merged = merge_incremental("PEP 9999", kept, [case("TC-001", "REQ-2"), case("TC-002", "REQ-4")])
+    assert [c.id for c in merged.test_cases] == ["TC-001", "TC-004", "TC-005", "TC-006"]
+
+def test_subgraph_keeps_only_targets():
+    sub = subgraph(NEW, {"REQ-4"})
+    assert sub.root_modules[0].requirements == []
+    assert [r.id for r in sub.root_modules[0].sub_modules[0].requirements] == ["REQ-4"]
+    assert subgraph(NEW, set()).root_modules == []
+
+@pytest.mark.asyncio
+async def test_tester_node_only_designs_changed_requirements(tmp_path, monkeypatch):
+    monkeypatch.setenv("PEP2TC_TEST_INCREMENTAL", "1")
+    (tmp_path / "knowledge_graph.json").write_text(OLD.model_dump_json())
+    (tmp_path / "test_plan.json").write_text(OLD_PLAN.model_dump_json())
+    prompts = []
+
+    async def fake_design(chain, spec_text, metrics=None, on_case=None, title=""):
+        prompts.append(spec_text)
+        return TestPlan(pep_title=title, test_cases=[case("TC-001", "REQ-2"), case("TC-002", "REQ-4")])
+
+    monkeypatch.setattr(node, "design_test_plan", fake_design)
+    # The chain is never invoked: design_test_plan is replaced
+    monkeypatch.setattr(node, "get_model", lambda **kwargs: RunnableLambda(lambda x: x))
+    monkeypatch.setattr(node, "get_fallback_model", lambda **kwargs: None)
+    monkeypatch.setattr(node, "streaming_model", lambda model: model)
+    state = AgentState(pep_url="https://peps.python.org/pep-9999/", knowledge_graph=NEW, artifact_dir=str(tmp_path))
+
+    result = await node.tester_node(state)
+
+    assert result["current_phase"] == "done"
+    assert len(prompts) == 1
+    assert "REQ-2" in prompts[0] and "REQ-4" in prompts[0] and "REQ-1" not in prompts[0]
+    assert [c.id for c in result["test_plan"].test_cases] == ["TC-001", "TC-004", "TC-005", "TC-006"]
+    on_disk = TestPlan.model_validate_json((tmp_path / "test_plan.json").read_text())
+    assert on_disk == result["test_plan"]
+
+@pytest.mark.asyncio
+async def test_unchanged_graph_needs_no_model_call(tmp_path, monkeypatch):
+    monkeypatch.setenv("PEP2TC_TEST_INCREMENTAL", "1")
+    (tmp_path / "knowledge_graph.json").write_text(OLD.model_dump_json())
+    (tmp_path / "test_plan.json").write_text(OLD_PLAN.model_dump_json())
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("no model call expected")
+
+    monkeypatch.setattr(node, "design_test_plan", fail)
+    monkeypatch.setattr(node, "get_model", lambda **kwargs: None)
+    state = AgentState(pep_url="https://peps.python.org/pep-9999/", knowledge_graph=OLD, artifact_dir=str(tmp_path))
+
+    result = await node.tester_node(state)
+
+    assert result["test_plan"] == OLD_PLAN
+
+@pytest.mark.asyncio
+async def test_cases_streamed_before_an_error_are_renumbered(tmp_path, monkeypatch):
+    monkeypatch.setenv("PEP2TC_TEST_INCREMENTAL", "1")
+    monkeypatch.setenv("PEP2TC_TEST_STREAM", "1")
+    (tmp_path / "knowledge_graph.json").write_text(OLD.model_dump_json())
+    (tmp_path / "test_plan.json").write_text(OLD_PLAN.model_dump_json())
+
+    async def failing_design(chain, spec_text, metrics=None, on_case=None, title=""):
+        on_case(case("TC-001", "REQ-2"))
+        on_case(case("GAP-TC-001", "REQ-4"))
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(node, "design_test_plan", failing_design)
+    monkeypatch.setattr(node, "build_tester_chain", lambda: None)
+    state = AgentState(pep_url="https://peps.python.org/pep-9999/", knowledge_graph=NEW, artifact_dir=str(tmp_path))
+
+    result = await node.tester_node(state)
+
+    assert result["current_phase"] == "error"
+    assert [c.id for c in result["test_plan"].test_cases] == ["TC-001", "TC-004", "TC-005", "TC-006"]
+    on_disk = TestPlan.model_validate_json((tmp_path / "test_plan.json").read_text())
+    assert on_disk == result["test_plan"]
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+
+from pep2testcase.core import graph
+from pep2testcase.core.agents import pipeline
+from pep2testcase.core.agents.tester import node
+from pep2testcase.core.agents.tools import finalize_module_tool, module_sink
+from pep2testcase.core.checkpoint import open_checkpointer
+from pep2testcase.core.schema import FeatureModule, ModuleTests, PepKnowledgeGraph, RequirementAtom, TestCase, TestPlan
+from pep2testcase.core.state import AgentState
+
+def req(req_id: str, description: str = "") -> RequirementAtom:
+    return RequirementAtom(id=req_id, description=description or f"{req_id} MUST hold", priority="Must", source_quote="q")
+
+def case(case_id: str, *req_ids: str) -> TestCase:
+    return TestCase(id=case_id, related_req_ids=list(req_ids), title=case_id, description="",
+                    expected_result="", test_type="Positive")
+
+SYNTAX = FeatureModule(name="Syntax", requirements=[req("REQ-1"), req("REQ-2")])
+ERRORS = FeatureModule(name="Errors", requirements=[req("REQ-3")])
+FINAL = PepKnowledgeGraph(title="PEP 9999", status="Draft", global_constraints=[req("REQ-0")], root_modules=[
+    SYNTAX,
+    FeatureModule(name="Errors", requirements=[req("REQ-3", "REQ-3 MUST raise")]),
+    FeatureModule(name="Runtime", requirements=[req("REQ-4")]),
+])
+
+@pytest.mark.asyncio
+async def test_tester_node_keeps_tests_of_unchanged_early_modules(monkeypatch):
+    prompts = []
+
+    async def fake_design(chain, spec_text, metrics=None, on_case=None, title=""):
+        prompts.append(spec_text)
+        return TestPlan(pep_title=title, test_cases=[case("TC-001", "REQ-4"), case("TC-002", "REQ-3"), case("TC-003", "REQ-0")])
+
+    monkeypatch.setattr(node, "design_test_plan", fake_design)
+    monkeypatch.setattr(node, "build_tester_chain", lambda: None)
+    monkeypatch.setenv("PEP2TC_TEST_GAP_FILL_PASSES", "0")
+    state = AgentState(pep_url="https://peps.python.org/pep-9999/", knowledge_graph=FINAL, early_tests=[
+        ModuleTests(module=SYNTAX, test_cases=[case("TC-001", "REQ-2"), case("TC-002", "REQ-1")]),
+        ModuleTests(module=ERRORS, test_cases=[case("TC-001", "REQ-3")]),
+    ])
+
+    result = await node.tester_node(state)
+
+    # Only the changed module, the module never finalized and the global constraints are designed
+    assert len(prompts) == 1 and prompts[0].startswith(node.REMAINDER_NOTE)
+    assert "REQ-0" in prompts[0] and "REQ-3" in prompts[0] and "REQ-4" in prompts[0]
+    assert "REQ-1" not in prompts[0] and "REQ-2" not in prompts[0]
+    # Merged in requirement order and renumbered
+    cases = result["test_plan"].test_cases
+    assert [(c.id, c.related_req_ids) for c in cases] == [
+        ("TC-001", ["REQ-0"]), ("TC-002", ["REQ-1"]), ("TC-003", ["REQ-2"]), ("TC-004", ["REQ-3"]), ("TC-005", ["REQ-4"]),
+    ]
+
+@pytest.mark.asyncio
+async def test_finalize_module_tool_reports_to_the_sink():
+    received = []
+    token = module_sink.set(lambda module: received.append(module) or "ok")
+    try:
+        result = await finalize_module_tool.ainvoke({"module": SYNTAX.model_dump()})
+    finally:
+        module_sink.reset(token)
+
+    assert result == "ok" and received == [SYNTAX]
+    assert "does not run in parallel" in await finalize_module_tool.ainvoke({"module": SYNTAX.model_dump()})
+
+@pytest.mark.asyncio
+async def test_pipelined_graph_designs_modules_during_research(tmp_path, monkeypatch):
+    designed, titles = [], []
+
+    async def fake_research(state, runtime=None):
+        sink = module_sink.get()
+        sink(SYNTAX)
+        sink(FeatureModule(name="Errors", requirements=[req("REQ-3", "draft")]))
+        await asyncio.sleep(0.1)
+        # Reported again after a change: the first design is replaced
+        sink(FINAL.root_modules[1])
+        await asyncio.sleep(0.3)
+        return {"knowledge_graph": FINAL, "current_phase": "research_done"}
+
+    async def fake_design(chain, spec_text, metrics=None, on_case=None, title=""):
+        await asyncio.sleep(0.3)
+        designed.append(spec_text)
+        titles.append(title)
+        ids = [r for r in ("REQ-1", "REQ-3") if r in spec_text]
+        return TestPlan(pep_title=title, test_cases=[case(f"TC-00{n}", r) for n, r in enumerate(ids, 1)])
+
+    async def fake_tester(state, runtime=None):
+        return {"test_plan": TestPlan(pep_title="PEP 9999", test_cases=[]), "current_phase": "done"}
+
+    monkeypatch.setattr(pipeline.researcher, "research_node", fake_research)
+    monkeypatch.setattr(pipeline.tester, "design_test_plan", fake_design)
+    monkeypatch.setattr(pipeline.tester, "build_tester_chain", lambda: None)
+    monkeypatch.setattr(graph, "tester_node", fake_tester)
+
+    async with open_checkpointer(str(tmp_path / "checkpoints.sqlite")) as checkpointer:
+        app = graph.create_graph(checkpointer, pipelined=True)
+        config = {"configurable": {"thread_id": "t"}}
+        started = time.perf_counter()
+        await app.ainvoke({"pep_url": "https://peps.python.org/pep-9999/"}, config)
+        elapsed = time.perf_counter() - started
+        early = (await app.aget_state(config)).values["early_tests"]
+
+    # Design overlapped research (0.4s) instead of following it (+0.3s)
+    assert elapsed < 0.65
+    assert len(designed) == 2 and all(text.startswith(node.PIPELINE_NOTE) for text in designed)
+    # The URL is no PEP title; the final graph's title is applied later
+    assert titles == ["", ""] and not any("peps.python.org" in text for text in designed)
+    assert [(m.module, [c.related_req_ids for c in m.test_cases]) for m in early] == [
+        (SYNTAX, [["REQ-1"]]), (FINAL.root_modules[1], [["REQ-3"]]),
+    ]
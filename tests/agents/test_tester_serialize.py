@@ -0,0 +1,84 @@
+from pep2testcase.core.agents.tester.serialize import serialize_knowledge_graph
+from pep2testcase.core.schema import FeatureModule, PepKnowledgeGraph, RequirementAtom
+from pep2testcase.core.tokens import count_tokens
+
+def req(req_id: str, priority: str = "Must", quote: str = "quoted text", tags=("Syntax",)) -> RequirementAtom:
+    return RequirementAtom(
+        id=req_id, description=f"{req_id} description", priority=priority,
+        source_quote=quote, context_tags=list(tags),
+    )
+
+def small_graph() -> PepKnowledgeGraph:
+    return PepKnowledgeGraph(
+        title="PEP 9999", status="Draft",
+        root_modules=[FeatureModule(
+            name="Core", description="Core rules",
+            requirements=[req("REQ-1")],
+            sub_modules=[FeatureModule(name="Errors", requirements=[req("REQ-2", "Should")])],
+        )],
+        global_constraints=[req("REQ-G", "May")],
+        ambiguities=["unclear"],
+    )
+
+def test_default_layout():
+    assert serialize_knowledge_graph(small_graph()).text == (
+        "PEP Title: PEP 9999\nStatus: Draft\n\n"
+        "Global Constraints:\n- [REQ-G] (May) REQ-G description\n\n"
+        "Ambiguities (Handle carefully):\n- unclear\n\n"
+        "--- Feature Modules ---\n"
+        "# Module: Core\nDescription: Core rules\nRequirements:\n"
+        "- [REQ-1] (Must) REQ-1 description\n  Quote: quoted text\n\n"
+        "## Module: Errors\nRequirements:\n"
+        "- [REQ-2] (Should) REQ-2 description\n  Quote: quoted text\n\n"
+    )
+
+def big_graph(n: int = 300) -> PepKnowledgeGraph:
+    priorities = ["May", "Should", "Must"]
+    return PepKnowledgeGraph(
+        title="PEP 9999", status="Draft",
+        root_modules=[
+            FeatureModule(name=f"Module {m}", requirements=[
+                req(f"REQ-{m}-{i}", priorities[(m + i) % 3], quote=f"quote {m} {i} " * 5)
+                for i in range(n // 10)
+            ])
+            for m in range(10)
+        ],
+    )
+
+def test_budget_keeps_must_before_should_before_may():
+    kg = big_graph()
+    full = serialize_knowledge_graph(kg, budget=10**9)
+    budget = full.tokens // 2
+
+    result = serialize_knowledge_graph(kg, budget=budget)
+
+    assert result.truncated
+    assert count_tokens(result.text) <= budget
+    assert result.dropped["Must"] == 0
+    assert result.dropped["May"] == 100  # every May goes before any Should
+    assert 0 < result.dropped["Should"] < 100
+    assert "(May)" not in result.text
+    assert "omitted" in result.text.splitlines()[-1]
+
+def test_truncation_skips_empty_modules():
+    kg = big_graph()
+    result = serialize_knowledge_graph(kg, budget=400)
+
+    headings = [line for line in result.text.splitlines() if line.startswith("# Module")]
+    assert 0 < len(headings) < 10
+    assert result.dropped["Must"] > 0
+
+def test_compact_mode_dedupes_tags_and_redundant_quotes():
+    module = FeatureModule(name="Core", requirements=[
+        req("REQ-1", quote="REQ-1 description", tags=("Syntax", "Parser")),
+        req("REQ-2", quote="Different words", tags=("Syntax",)),
+        req("REQ-3", quote="Different words", tags=("Syntax", "Errors")),
+    ])
+    kg = PepKnowledgeGraph(title="PEP 9999", status="Draft", root_modules=[module])
+
+    text = serialize_knowledge_graph(kg, compact=True).text
+
+    assert "# Core\nTags: Syntax, Parser, Errors\n" in text
+    assert "- REQ-1 Must: REQ-1 description\n- REQ-2" in text  # quote repeats the description
+    assert text.count("> Different words") == 1  # REQ-3 repeats REQ-2's quote
+    assert count_tokens(text) < count_tokens(serialize_knowledge_graph(kg).text)
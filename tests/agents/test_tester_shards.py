@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from pep2testcase.core.agents.tester.node import design_sharded, should_shard
+from pep2testcase.core.agents.tester.shards import (
+    count_requirements, merge_test_plans, shard_knowledge_graph,
+)
+from pep2testcase.core.schema import FeatureModule, PepKnowledgeGraph, RequirementAtom, TestCase, TestPlan
+
+def req(req_id: str) -> RequirementAtom:
+    return RequirementAtom(id=req_id, description=f"{req_id} MUST hold", priority="Must", source_quote="...")
+
+def module(name: str, n: int, subs=()) -> FeatureModule:
+    return FeatureModule(name=name, requirements=[req(f"REQ-{name}-{i}") for i in range(n)], sub_modules=list(subs))
+
+def graph(*modules) -> PepKnowledgeGraph:
+    return PepKnowledgeGraph(
+        title="PEP 9999", status="Draft", root_modules=list(modules),
+        global_constraints=[req("REQ-GLOBAL-1")], ambiguities=["unclear"],
+    )
+
+def req_ids(kg: PepKnowledgeGraph) -> list[str]:
+    def walk(m):
+        return [r.id for r in m.requirements] + [i for s in m.sub_modules for i in walk(s)]
+    return [i for m in kg.root_modules for i in walk(m)]
+
+def test_small_modules_are_packed_and_large_ones_split():
+    kg = graph(module("A", 3), module("B", 4), module("C", 5, [module("D", 8), module("E", 2)]))
+
+    shards = shard_knowledge_graph(kg, budget=10)
+
+    assert all(
+        sum(count_requirements(m) for m in s.root_modules) + len(s.global_constraints) <= 10 for s in shards
+    )
+    # Every requirement lands in exactly one shard, in document order
+    assert [i for s in shards for i in req_ids(s)] == req_ids(kg)
+    assert [m.name for m in shards[0].root_modules] == ["A", "B"]  # 1 global + 3 + 4
+    assert "C / D" in [m.name for s in shards for m in s.root_modules]
+    # Global constraints are tested once, ambiguities are context everywhere
+    assert [len(s.global_constraints) for s in shards] == [1] + [0] * (len(shards) - 1)
+    assert all(s.ambiguities == ["unclear"] for s in shards)
+
+def test_module_with_many_direct_requirements_is_chunked():
+    kg = graph(module("Big", 23)).model_copy(update={"global_constraints": []})
+    shards = shard_knowledge_graph(kg, budget=10)
+    assert [count_requirements(s.root_modules[0]) for s in shards] == [10, 10, 3]
+
+def test_merge_renumbers_ids_deterministically():
+    def plan(*ids):
+        return TestPlan(pep_title="x", test_cases=[
+            TestCase(id=i, title=i, description="", expected_result="", test_type="Positive") for i in ids
+        ])
+
+    merged = merge_test_plans("PEP 9999", [plan("TC-001", "TC-002"), plan("TC-001")])
+
+    assert [c.id for c in merged.test_cases] == ["TC-001", "TC-002", "TC-003"]
+    assert [c.title for c in merged.test_cases] == ["TC-001", "TC-002", "TC-001"]
+
+def test_should_shard_modes(monkeypatch):
+    kg = graph(module("A", 30))
+    assert should_shard(kg)
+    monkeypatch.setenv("PEP2TC_TEST_SHARDING", "off")
+    assert not should_shard(kg)
+    monkeypatch.setenv("PEP2TC_TEST_SHARDING", "always")
+    assert should_shard(graph(module("A", 1)))
+
+@pytest.mark.asyncio
+async def test_design_sharded_bounds_parallelism(monkeypatch):
+    monkeypatch.setenv("PEP2TC_TEST_SHARD_MAX_REQUIREMENTS", "2")
+    monkeypatch.setenv("PEP2TC_TEST_CONCURRENCY", "2")
+    state = {"active": 0, "peak": 0}
+
+    async def fake_model(inputs: dict) -> dict:
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        ids = [line.split("]")[0].lstrip("- [") for line in inputs["spec_text"].splitlines() if line.startswith("- [REQ-")]
+        cases = [
+            TestCase(id="TC-001", related_req_ids=[i], title=i, description="", expected_result="", test_type="Positive")
+            for i in ids
+        ]
+        return {"raw": AIMessage(content=""), "parsed": TestPlan(pep_title="x", test_cases=cases)}
+
+    kg = graph(module("A", 3), module("B", 4))
+    plan = await design_sharded(RunnableLambda(fake_model), kg)
+
+    assert state["peak"] == 2
+    assert len({c.id for c in plan.test_cases}) == len(plan.test_cases) == 8
+    assert [c.related_req_ids[0] for c in plan.test_cases][:3] == ["REQ-GLOBAL-1", "REQ-A-0", "REQ-A-1"]
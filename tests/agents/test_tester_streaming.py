@@ -0,0 +1,129 @@
+import json
+from typing import Any, AsyncIterator
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from pep2testcase.core.agents.tester import node
+from pep2testcase.core.agents.tester.streaming import TestCaseStreamParser, plan_from_message
+from pep2testcase.core.artifacts import TestPlanWriter, render_markdown
+from pep2testcase.core.schema import FeatureModule, PepKnowledgeGraph, RequirementAtom, TestCase, TestPlan
+from langgraph.runtime import Runtime
+
+from pep2testcase.core.state import AgentState, RunContext
+
+def case(i: int) -> dict:
+    return {
+        "id": f"TC-{i:03d}", "related_req_ids": [f"REQ-{i}"], "title": f"Case {i} with \"quotes\" and }} braces",
+        "description": "d", "preconditions": [], "steps": ["a", "b"], "expected_result": "ok", "test_type": "Positive",
+    }
+
+PLAN_JSON = json.dumps({"pep_title": "PEP 9999", "test_cases": [case(i) for i in range(1, 4)]})
+
+def test_parser_emits_each_case_once_complete():
+    parser = TestCaseStreamParser()
+    emitted = []
+    for i, ch in enumerate(PLAN_JSON):
+        for tc in parser.feed(ch):
+            emitted.append((tc.id, i))
+
+    assert [tc_id for tc_id, _ in emitted] == ["TC-001", "TC-002", "TC-003"]
+    # The first case is available long before the document ends
+    assert emitted[0][1] < len(PLAN_JSON) // 2
+
+def test_parser_ignores_nested_arrays_outside_test_cases():
+    parser = TestCaseStreamParser()
+    doc = json.dumps({"notes": [{"x": 1}], "test_cases": [case(1)], "extra": [{"y": 2}]})
+    assert [tc.id for tc in parser.feed(doc)] == ["TC-001"]
+
+def test_truncated_output_keeps_streamed_cases():
+    parser = TestCaseStreamParser()
+    streamed = parser.feed(PLAN_JSON[: PLAN_JSON.index("TC-003")])
+    message = AIMessage(content="", invalid_tool_calls=[{"name": "TestPlan", "args": "{...", "id": "1", "error": None}])
+
+    plan = plan_from_message(message, streamed, "PEP 9999")
+
+    assert [tc.id for tc in plan.test_cases] == ["TC-001", "TC-002"]
+
+def test_writer_keeps_valid_files_while_streaming(tmp_path):
+    writer = TestPlanWriter(tmp_path, "PEP 9999")
+    writer.add(TestCase.model_validate(case(1)))
+
+    partial = TestPlan.model_validate_json((tmp_path / "test_plan.json").read_text())
+    assert [tc.id for tc in partial.test_cases] == ["TC-001"]
+    assert "## TC-001" in (tmp_path / "test_plan.md").read_text()
+
+    final = TestPlan(pep_title="PEP 9999", test_cases=[TestCase.model_validate(case(i)) for i in (1, 2)])
+    writer.finalize(final)
+    assert (tmp_path / "test_plan.md").read_text() == render_markdown(final)
+
+class StreamingToolModel(BaseChatModel):
+    """Streams a TestPlan tool call in small argument chunks."""
+    arguments: str
+    chunk_size: int = 7
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming-tool"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(**kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = AIMessage(content="", tool_calls=[{"name": "TestPlan", "args": json.loads(self.arguments), "id": "1"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        for start in range(0, len(self.arguments), self.chunk_size):
+            piece = self.arguments[start:start + self.chunk_size]
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[{"name": "TestPlan" if start == 0 else None, "args": piece, "id": "1", "index": 0}],
+            ))
+            if run_manager:
+                await run_manager.on_llm_new_token("", chunk=chunk)
+            yield chunk
+
+class FakeUI:
+    def __init__(self):
+        self.counts = []
+
+    def set_phase(self, phase: str):
+        pass
+
+    def add_log(self, renderable: Any):
+        pass
+
+    def set_test_case_count(self, count: int):
+        self.counts.append(count)
+
+@pytest.mark.asyncio
+async def test_tester_node_streams_cases_to_artifacts(tmp_path, monkeypatch):
+    monkeypatch.setenv("PEP2TC_TEST_SHARDING", "off")
+    model = StreamingToolModel(arguments=PLAN_JSON)
+    monkeypatch.setattr(node, "get_model", lambda **kwargs: model)
+    monkeypatch.setattr(node, "get_fallback_model", lambda **kwargs: None)
+    written = []
+    original_add = TestPlanWriter.add
+
+    def spy_add(self, tc):
+        original_add(self, tc)
+        written.append(len(TestPlan.model_validate_json(self.json_path.read_text()).test_cases))
+
+    monkeypatch.setattr(TestPlanWriter, "add", spy_add)
+    kg = PepKnowledgeGraph(title="PEP 9999", status="Draft", root_modules=[FeatureModule(
+        name="M", requirements=[RequirementAtom(id="REQ-1", description="x", priority="Must", source_quote="x")],
+    )])
+    ui = FakeUI()
+    state = AgentState(pep_url="https://peps.python.org/pep-9999/", knowledge_graph=kg, artifact_dir=str(tmp_path))
+
+    result = await node.tester_node(state, Runtime(context=RunContext(ui_manager=ui)))
+
+    assert result["current_phase"] == "done"
+    assert [tc.id for tc in result["test_plan"].test_cases] == ["TC-001", "TC-002", "TC-003"]
+    # Each case hit the disk as soon as it was complete, before the call returned
+    assert written == [1, 2, 3]
+    assert ui.counts[:3] == [1, 2, 3]
+    assert (tmp_path / "test_plan.md").read_text() == render_markdown(result["test_plan"])
@@ -10,3 +10,32 @@ def configure_logging():
     logging.getLogger("httpcore").setLevel(logging.WARNING)
     logging.getLogger("openai").setLevel(logging.WARNING)
     logging.getLogger("urllib3").setLevel(logging.WARNING)
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """
+    Point every on-disk cache at a per-test directory so tests never share state.
+    """
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv("PEP2TC_CACHE_DIR", str(cache_dir))
+    return cache_dir
+
+@pytest.fixture
+def async_pages(monkeypatch):
+    """
+    Serves pages to the pooled async HTTP client: fill the returned dict with
+    ``{url: html_bytes}``; unknown URLs get a 404.
+    """
+    import httpx
+    from pep2testcase.core import http
+
+    pages = {}
+
+    def handler(request):
+        body = pages.get(str(request.url))
+        if body is None:
+            return httpx.Response(404, request=request)
+        return httpx.Response(200, content=body, request=request)
+
+    monkeypatch.setattr(http, "_make_async_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return pages
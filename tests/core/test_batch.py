@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+import pytest
+
+from pep2testcase.cli import batch
+from pep2testcase.core import graph
+from pep2testcase.core.schema import FeatureModule, PepKnowledgeGraph, RequirementAtom, TestCase, TestPlan
+
+def test_parse_targets():
+    urls = batch.parse_targets(["8", "pep-0020", "1-3", "# comment", "", "https://www.python.org/dev/peps/pep-0008/"])
+    assert urls == [
+        "https://peps.python.org/pep-0008/", "https://peps.python.org/pep-0020/",
+        "https://peps.python.org/pep-0001/", "https://peps.python.org/pep-0002/", "https://peps.python.org/pep-0003/",
+    ]
+    with pytest.raises(ValueError):
+        batch.parse_targets(["eight"])
+
+@pytest.mark.asyncio
+async def test_run_batch_bounds_concurrency_and_writes_artifacts(tmp_path, monkeypatch):
+    in_flight = peak = 0
+
+    async def researcher(state, runtime=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if state.pep_url.endswith("pep-0003/"):
+            raise RuntimeError("research crashed")
+        return {"knowledge_graph": PepKnowledgeGraph(title=state.pep_url, status="Final", root_modules=[
+            FeatureModule(name="M", requirements=[RequirementAtom(id="REQ-1", description="x", priority="Must", source_quote="x")]),
+        ]), "current_phase": "research_done"}
+
+    async def tester(state, runtime=None):
+        return {"test_plan": TestPlan(pep_title=state.knowledge_graph.title, test_cases=[TestCase(
+            id="TC-001", related_req_ids=["REQ-1"], title="t", description="", expected_result="", test_type="Positive",
+        )]), "current_phase": "done"}
+
+    monkeypatch.setattr(graph, "research_node", researcher)
+    monkeypatch.setattr(graph, "tester_node", tester)
+    urls = batch.parse_targets(["1-5"])
+
+    entries = await batch.run_batch(urls, str(tmp_path), concurrency=2)
+    json_path, md_path = batch.write_summary(entries, tmp_path, 1.0)
+
+    assert peak == 2
+    assert [e["status"] for e in entries] == ["done", "done", "failed", "done", "done"]
+    assert (tmp_path / "pep-0001" / "test_plan.md").exists()
+    assert json.loads((tmp_path / "pep-0004" / "coverage.json").read_text())["percent"] == 100.0
+    assert (tmp_path / "pep-0003" / "metrics.json").exists()
+    summary = json.loads(json_path.read_text())
+    assert (summary["done"], summary["failed"], summary["test_cases"]) == (4, 1, 4)
+    assert "| https://peps.python.org/pep-0003/ | failed |" in md_path.read_text()
@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from pep2testcase.core import graph
+from pep2testcase.core.checkpoint import find_run, new_run_id, open_checkpointer, prepare_resume, run_config
+from pep2testcase.core.schema import FeatureModule, PepKnowledgeGraph, RequirementAtom, TestCase, TestPlan
+from pep2testcase.core.state import RunContext
+
+URL = "https://peps.python.org/pep-9999/"
+KG = PepKnowledgeGraph(title="PEP 9999", status="Draft", root_modules=[FeatureModule(
+    name="M", requirements=[RequirementAtom(id="REQ-1", description="x", priority="Must", source_quote="x")],
+)])
+PLAN = TestPlan(pep_title="PEP 9999", test_cases=[TestCase(
+    id="TC-001", related_req_ids=["REQ-1"], title="t", description="", expected_result="", test_type="Positive",
+)])
+
+class UI:
+    """Not serializable: the run fails if it ever ends up in a checkpoint."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.phases = []
+
+    def set_phase(self, phase: str):
+        self.phases.append(phase)
+
+@pytest.fixture
+def phases(monkeypatch):
+    """Fake researcher / tester nodes; each tester call pops its outcome from ``tester_outcomes``."""
+    calls = {"researcher": 0, "tester": 0, "tester_outcomes": []}
+
+    async def researcher(state, runtime=None):
+        calls["researcher"] += 1
+        runtime.context.ui_manager.set_phase("research")
+        return {"knowledge_graph": KG, "current_phase": "research_done"}
+
+    async def tester(state, runtime=None):
+        calls["tester"] += 1
+        assert state.knowledge_graph == KG
+        outcome = calls["tester_outcomes"].pop(0)
+        if outcome == "crash":
+            raise RuntimeError("killed")
+        if outcome == "error":
+            return {"current_phase": "error"}
+        return {"test_plan": PLAN, "current_phase": "done"}
+
+    monkeypatch.setattr(graph, "research_node", researcher)
+    monkeypatch.setattr(graph, "tester_node", tester)
+    return calls
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("failure", ["error", "crash"])
+async def test_resume_retries_only_the_failed_phase(phases, failure):
+    phases["tester_outcomes"] = [failure, "ok"]
+    run_id = new_run_id()
+    context = RunContext(ui_manager=UI())
+
+    async with open_checkpointer() as saver:
+        app = graph.create_graph(saver)
+        initial = {"pep_url": URL, "artifact_dir": "out"}
+        if failure == "crash":
+            with pytest.raises(RuntimeError):
+                await app.ainvoke(initial, run_config(URL, run_id), context=context)
+        else:
+            state = await app.ainvoke(initial, run_config(URL, run_id), context=context)
+            assert state["current_phase"] == "error"
+
+    # A later process finds the run by URL and continues it
+    async with open_checkpointer() as saver:
+        app = graph.create_graph(saver)
+        assert await find_run(saver, URL) == run_id
+        assert await find_run(saver, "https://peps.python.org/pep-0001/") is None
+        config = run_config(URL, run_id)
+
+        assert await prepare_resume(app, config) == "tester"
+        state = await app.ainvoke(None, config, context=context)
+
+        assert state["test_plan"] == PLAN
+        assert state["artifact_dir"] == "out"
+        assert (phases["researcher"], phases["tester"]) == (1, 2)
+        assert await prepare_resume(app, config) is None
+
+@pytest.mark.asyncio
+async def test_latest_run_is_resumed(phases):
+    phases["tester_outcomes"] = ["ok", "ok"]
+    async with open_checkpointer() as saver:
+        app = graph.create_graph(saver)
+        for run_id in ("run-1", "run-2"):
+            await app.ainvoke({"pep_url": URL}, run_config(URL, run_id), context=RunContext(ui_manager=UI()))
+
+        assert await find_run(saver, URL) == "run-2"
+        assert await find_run(saver, URL, "run-1") == "run-1"
@@ -0,0 +1,136 @@
+from pathlib import Path
+
+import pytest
+
+from pep2testcase.core.agents.tools.fetcher import compress_pep_content, extract_text, fetch_pep_for_prompt
+from pep2testcase.core.compression import compress_source, normative_counts
+from pep2testcase.core.tokens import count_tokens
+
+FIXTURES = Path(__file__).parent.parent / "fixtures" / "peps"
+
+def page(body: str) -> bytes:
+    return (
+        "<html><body><nav id='pep-sidebar'>Contents</nav><article>"
+        f"<section id='pep-content'><h1>PEP 9999 – Test</h1>{body}</section>"
+        "</article></body></html>"
+    ).encode()
+
+def test_pep_3333_is_smaller_and_keeps_normative_keywords():
+    data = (FIXTURES / "pep-3333.html").read_bytes()
+    extracted = extract_text(data)
+
+    result = compress_source(data, "html", "pep-3333", extracted)
+
+    assert result.guard_ok
+    assert count_tokens(result.text) < count_tokens(extracted)
+    assert normative_counts(result.text) == normative_counts(extracted)
+    assert "MUST transmit" in result.text and "SHOULD NOT buffer" in result.text
+    # Page furniture and boilerplate are gone
+    assert "colour theme" not in result.text
+    assert "Table of Contents" not in result.text
+    assert "public domain" not in result.text
+    assert "Last modified" not in result.text
+
+def test_duplicate_code_block_is_collapsed():
+    data = (FIXTURES / "pep-3333.html").read_bytes()
+
+    result = compress_source(data, "html", "pep-3333", extract_text(data))
+
+    assert result.text.count("def simple_app") == 1
+    assert "identical to the one in section 'the-application-framework-side'" in result.text
+
+def test_long_listing_and_table_are_truncated_with_pointer():
+    code = "\n".join(f"line_{i} = {i}" for i in range(100))
+    rows = "".join(f"<tr><td>k{i}</td><td>v{i}</td></tr>" for i in range(50))
+    data = page(
+        f"<section id='example'><h2>Example</h2><pre>{code}</pre>"
+        f"<table><tr><th>Key</th><th>Value</th></tr>{rows}</table></section>"
+    )
+
+    text = compress_source(data, "html", "pep-9999", extract_text(data)).text
+
+    assert "line_0 = 0" in text and "line_99 = 99" not in text
+    assert "k0 | v0" in text and "k49" not in text
+    assert "get_pep_section('pep-9999', 'example')" in text
+    assert "## Example" in text
+
+def test_blocks_with_normative_keywords_are_never_truncated():
+    code = "\n".join(f"line_{i} = {i}" for i in range(100)) + "\n# Servers MUST NOT reorder"
+    data = page(f"<section id='spec'><h2>Spec</h2><pre>{code}</pre><pre>{code}</pre></section>")
+
+    text = compress_source(data, "html", "pep-9999", extract_text(data)).text
+
+    assert text.count("MUST NOT reorder") == 2
+    assert "line_99 = 99" in text
+
+def test_guard_falls_back_to_full_text(monkeypatch):
+    # A reference list is normally collapsed; it is kept if it carries normative text,
+    # and the guard catches any loss the renderer did not anticipate.
+    monkeypatch.setattr("pep2testcase.core.compression.REFERENCE_SECTIONS", {"spec"})
+    monkeypatch.setattr("pep2testcase.core.compression._has_normative", lambda text: False)
+    data = page("<section id='spec'><h2>Spec</h2><p>Clients MAY retry.</p></section>")
+
+    result = compress_source(data, "html", "pep-guard", extract_text(data))
+
+    assert not result.guard_ok
+    assert "Clients MAY retry." in result.text
+
+def test_guard_fallback_keeps_the_extracted_line_structure(monkeypatch):
+    monkeypatch.setattr("pep2testcase.core.compression.REFERENCE_SECTIONS", {"spec"})
+    monkeypatch.setattr("pep2testcase.core.compression._has_normative", lambda text: False)
+    data = page(
+        "<section id='spec'><h2>Spec</h2><p>Clients MAY retry.</p>"
+        "<pre>def retry():\n    pass</pre></section>"
+    )
+    extracted = extract_text(data)
+    assert "\n    pass" in extracted
+
+    result = compress_source(data, "html", "pep-guard-lines", extracted)
+
+    assert not result.guard_ok
+    assert result.text == extracted
+
+def test_rst_source_drops_boilerplate_and_duplicate_literals():
+    source = (
+        "PEP: 9999\nTitle: Test\n\nAbstract\n========\n\nImplementations SHOULD do it::\n\n"
+        "    x = 1\n    y = 2\n\nAgain::\n\n    x = 1\n    y = 2\n\n"
+        ".. _PEP 8: https://peps.python.org/pep-0008/\n\n"
+        "Copyright\n=========\n\nThis document has been placed in the public domain.\n"
+    )
+
+    result = compress_source(source.encode(), "rst", "pep-9999", source)
+
+    assert result.guard_ok
+    assert "SHOULD" in result.text
+    assert result.text.count("y = 2") == 1
+    assert "public domain" not in result.text
+    assert "_PEP 8:" not in result.text
+
+@pytest.mark.parametrize("enabled", ["0", "1"])
+def test_compress_pep_content_honours_setting(monkeypatch, enabled):
+    monkeypatch.setenv("PEP2TC_COMPRESS", enabled)
+    data = page("<p>Body</p><section id='copyright'><h2>Copyright</h2><p>Public domain.</p></section>")
+    monkeypatch.setattr(
+        "pep2testcase.core.agents.tools.fetcher.fetch_pep_source", lambda url: (data, "html")
+    )
+
+    text = compress_pep_content("https://peps.python.org/pep-9999/", "extracted")
+
+    assert (text == "extracted") == (enabled == "0")
+    if enabled == "1":
+        assert "Body" in text and "Public domain" not in text
+
+def test_errors_are_passed_through():
+    assert compress_pep_content("https://x", "Error fetching PEP content: 404") == (
+        "Error fetching PEP content: 404"
+    )
+
+def test_prompt_fetch_downloads_the_page_once_without_the_fetch_cache(requests_mock, monkeypatch):
+    monkeypatch.setenv("PEP2TC_FETCH_CACHE", "0")
+    url = "https://example.com/spec"
+    requests_mock.get(url, content=page("<p>Body</p><section id='copyright'><h2>Copyright</h2><p>Public domain.</p></section>"))
+
+    text = fetch_pep_for_prompt(url)
+
+    assert "Body" in text and "Public domain" not in text
+    assert requests_mock.call_count == 1
@@ -0,0 +1,88 @@
+import shutil
+import sys
+import tarfile
+from pathlib import Path
+import pytest
+from pep2testcase.core.agents.tools.extract import get_extractor
+from pep2testcase.core.agents.tools.fetcher import fetch_pep_content
+from pep2testcase.core.corpus import PepCorpus, get_corpus, pep_number_from_url
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures" / "peps"
+
+RST_SOURCE = """PEP: 20
+Title: The Zen of Python
+Author: Tim Peters <tim.peters@gmail.com>
+Status: Active
+
+Abstract
+========
+
+Long time Pythoneer Tim Peters succinctly channels the BDFL's guiding
+principles for Python's design into 20 aphorisms.
+"""
+
+@pytest.fixture
+def checkout(tmp_path):
+    """A python/peps style checkout with RST sources and one built HTML page."""
+    root = tmp_path / "peps-main"
+    (root / "peps").mkdir(parents=True)
+    (root / "peps" / "pep-0020.rst").write_text(RST_SOURCE)
+    (root / "peps" / "pep-0008.rst").write_text("PEP: 8\nTitle: Style Guide for Python Code\n")
+    (root / "build" / "pep-0008").mkdir(parents=True)
+    shutil.copy(FIXTURES / "pep-0008.html", root / "build" / "pep-0008" / "index.html")
+    (root / "README.rst").write_text("not a PEP")
+    return root
+
+def test_pep_number_from_url():
+    assert pep_number_from_url("https://peps.python.org/pep-0008/") == 8
+    assert pep_number_from_url("https://www.python.org/dev/peps/pep-0572/") == 572
+    assert pep_number_from_url("https://docs.python.org/3/") is None
+
+def test_ingest_directory(checkout, tmp_path):
+    corpus = PepCorpus(tmp_path / "corpus.sqlite")
+    assert corpus.ingest(checkout) == 2
+
+    zen = corpus.get(20)
+    assert zen.title == "The Zen of Python"
+    assert zen.format == "rst"
+    assert "20 aphorisms" in zen.text
+
+    # Built HTML wins over RST and matches what the live fetcher would extract.
+    style = corpus.get(8)
+    assert style.format == "html"
+    assert style.title == "PEP 8 – Style Guide for Python Code"
+    assert style.text == get_extractor()((FIXTURES / "pep-0008.html").read_bytes())
+
+def test_ingest_tarball(checkout, tmp_path):
+    archive = tmp_path / "peps.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        tar.add(checkout, arcname="peps-main")
+
+    corpus = PepCorpus(tmp_path / "corpus.sqlite")
+    assert corpus.ingest(archive) == 2
+    assert corpus.numbers() == [8, 20]
+
+def test_fetch_resolves_from_corpus_without_network(checkout, isolated_cache_dir, requests_mock):
+    PepCorpus(isolated_cache_dir / "corpus.sqlite").ingest(checkout)
+
+    text = fetch_pep_content("https://peps.python.org/pep-0020/")
+
+    assert "20 aphorisms" in text
+    assert requests_mock.call_count == 0
+
+def test_non_pep_urls_still_use_network(checkout, isolated_cache_dir, requests_mock):
+    PepCorpus(isolated_cache_dir / "corpus.sqlite").ingest(checkout)
+    requests_mock.get("https://example.com/doc", content=b"<html><body><p>Remote</p></body></html>")
+
+    assert fetch_pep_content("https://example.com/doc") == "Remote"
+
+def test_no_corpus_by_default():
+    assert get_corpus() is None
+
+def test_ingest_command(checkout, tmp_path, monkeypatch):
+    from pep2testcase.cli.main import main
+
+    db = tmp_path / "cli.sqlite"
+    monkeypatch.setattr(sys, "argv", ["pep2testcase", "ingest", str(checkout), "--db", str(db)])
+    main()
+    assert PepCorpus(db).numbers() == [8, 20]
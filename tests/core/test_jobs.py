@@ -0,0 +1,115 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pep2testcase.cli import worker as worker_cli
+from pep2testcase.core import graph
+from pep2testcase.core.checkpoint import open_checkpointer
+from pep2testcase.core.jobs import JobQueue
+from pep2testcase.core.schema import FeatureModule, PepKnowledgeGraph, RequirementAtom, TestCase, TestPlan
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_claim_lease_and_retry(tmp_path):
+    clock = Clock()
+    queue = JobQueue(tmp_path / "jobs.sqlite", lease=60, max_attempts=2, retry_delay=10, clock=clock)
+    first, created = queue.enqueue("https://peps.python.org/pep-0008/", "/out")
+    assert created and queue.enqueue("https://peps.python.org/pep-0008/", "/out") == (first, False)
+
+    job = queue.claim("a")
+    assert (job.id, job.attempts) == (first, 1)
+    assert queue.claim("b") is None
+
+    # The lease of a worker that stopped sending heartbeats runs out
+    clock.now += 61
+    job = queue.claim("b")
+    assert (job.worker, job.attempts) == ("b", 2)
+    assert not queue.heartbeat(job.id, "a") and queue.heartbeat(job.id, "b")
+    assert queue.complete(job.id, "a", {}) is False
+
+    assert queue.fail(job.id, "b", "boom") == "failed"
+    assert queue.get(job.id).error == "boom"
+    assert queue.counts() == {"queued": 0, "running": 0, "done": 0, "failed": 1}
+
+def test_failed_job_backs_off_and_release_keeps_attempts(tmp_path):
+    clock = Clock()
+    queue = JobQueue(tmp_path / "jobs.sqlite", lease=60, max_attempts=3, retry_delay=10, clock=clock)
+    queue.enqueue("https://peps.python.org/pep-0001/", "/out")
+
+    job = queue.claim("a")
+    queue.release(job.id, "a")
+    job = queue.claim("a")
+    assert job.attempts == 1
+
+    assert queue.fail(job.id, "a", "boom") == "queued"
+    assert queue.claim("a") is None and queue.pending() == 1
+    clock.now += 10
+    job = queue.claim("a")
+    assert queue.fail(job.id, "a", "boom") == "queued"
+    clock.now += 19
+    assert queue.claim("a") is None
+    clock.now += 1
+    assert queue.claim("a").attempts == 3
+
+def test_each_job_is_claimed_once_across_connections(tmp_path):
+    path = tmp_path / "jobs.sqlite"
+    queue = JobQueue(path)
+    for n in range(40):
+        queue.enqueue(f"https://peps.python.org/pep-{n:04d}/", "/out")
+
+    def drain(name):
+        own = JobQueue(path)
+        claimed = []
+        while (job := own.claim(name)) is not None:
+            claimed.append(job.id)
+        return claimed
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(drain, ["a", "b", "c", "d"]))
+    claimed = [job_id for ids in results for job_id in ids]
+    assert sorted(claimed) == list(range(1, 41))
+
+@pytest.mark.asyncio
+async def test_retried_job_resumes_only_the_failed_phase(tmp_path, monkeypatch):
+    calls = {"research": 0, "test": 0}
+
+    async def researcher(state, runtime=None):
+        calls["research"] += 1
+        return {"knowledge_graph": PepKnowledgeGraph(title="PEP 8", status="Final", root_modules=[
+            FeatureModule(name="M", requirements=[RequirementAtom(id="REQ-1", description="x", priority="Must", source_quote="x")]),
+        ]), "current_phase": "research_done"}
+
+    async def tester(state, runtime=None):
+        calls["test"] += 1
+        if calls["test"] == 1:
+            raise RuntimeError("tester crashed")
+        return {"test_plan": TestPlan(pep_title="PEP 8", test_cases=[TestCase(
+            id="TC-001", related_req_ids=["REQ-1"], title="t", description="", expected_result="", test_type="Positive",
+        )]), "current_phase": "done"}
+
+    monkeypatch.setattr(graph, "research_node", researcher)
+    monkeypatch.setattr(graph, "tester_node", tester)
+    clock = Clock()
+    queue = JobQueue(tmp_path / "jobs.sqlite", retry_delay=5, clock=clock)
+    job_id, _ = queue.enqueue("https://peps.python.org/pep-0008/", str(tmp_path / "out"))
+
+    async with open_checkpointer(str(tmp_path / "checkpoints.sqlite")) as checkpointer:
+        app = graph.create_graph(checkpointer)
+        entry = await worker_cli.process_job(app, queue, queue.claim("w"), "w", True)
+        assert entry["status"] == "failed" and queue.get(job_id).status == "queued"
+
+        clock.now += 5
+        job = queue.claim("w")
+        assert job.run_id == entry["run_id"]
+        entry = await worker_cli.process_job(app, queue, job, "w", True)
+
+    assert entry["status"] == "done" and entry["run_id"] == job.run_id
+    assert calls == {"research": 1, "test": 2}
+    assert queue.get(job_id).status == "done"
+    assert (tmp_path / "out" / "pep-0008" / "test_plan.json").exists()
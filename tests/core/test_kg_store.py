@@ -0,0 +1,83 @@
+import pytest
+
+from pep2testcase.core.agents.researcher import node
+from pep2testcase.core.cache import KnowledgeGraphStore, get_kg_store
+from pep2testcase.core.schema import FeatureModule, PepKnowledgeGraph
+from pep2testcase.core.state import AgentState
+
+URL = "https://peps.python.org/pep-9999/"
+TEXT = "PEP 9999 -- Example\n\nImplementations MUST do things."
+KG = PepKnowledgeGraph(title="PEP 9999", status="Draft", root_modules=[FeatureModule(name="Cached")])
+
+def test_store_keys_on_normalized_content_model_and_prompt(tmp_path):
+    store = KnowledgeGraphStore(tmp_path / "kg.sqlite")
+    store.put(URL, TEXT, "gpt-4o+gpt-4o-mini", "v1", KG)
+
+    assert store.get("  PEP 9999 -- Example\n Implementations MUST\tdo things.\n", "gpt-4o+gpt-4o-mini", "v1") == KG
+    assert store.get(TEXT + " Revised.", "gpt-4o+gpt-4o-mini", "v1") is None
+    assert store.get(TEXT, "gpt-4o+gpt-4o", "v1") is None
+    assert store.get(TEXT, "gpt-4o+gpt-4o-mini", "v2") is None
+    assert (store.stats.hits, store.stats.misses) == (1, 3)
+
+class FakeAgent:
+    def __init__(self, calls: list):
+        self.calls = calls
+
+    async def ainvoke(self, inputs):
+        self.calls.append(inputs)
+        return {"structured_response": KG.model_copy(update={"title": "PEP 9999 (researched)"})}
+
+@pytest.fixture
+def fake_research(monkeypatch):
+    """Replaces the deep agent and its inputs; returns the list of agent invocations."""
+    calls = []
+
+    async def passthrough(pep_url, content, html=None):
+        return content
+
+    async def no_prefetch(pep_url, content):
+        return None
+
+    monkeypatch.setattr(node, "prefetch_references", no_prefetch)
+    monkeypatch.setattr(node, "acompress_pep_content", passthrough)
+    monkeypatch.setattr(node, "build_primary_content", passthrough)
+    monkeypatch.setattr(node, "get_model", lambda **kwargs: None)
+    monkeypatch.setattr(node, "get_fallback_model", lambda **kwargs: None)
+    monkeypatch.setattr(node, "create_deep_agent", lambda **kwargs: FakeAgent(calls))
+    return calls
+
+@pytest.mark.asyncio
+async def test_unchanged_pep_skips_research(fake_research):
+    state = AgentState(pep_url=URL, raw_pep_content=TEXT)
+
+    first = await node.research_node(state)
+    second = await node.research_node(state)
+
+    assert len(fake_research) == 1
+    assert second["knowledge_graph"] == first["knowledge_graph"]
+    assert second["current_phase"] == "research_done"
+
+@pytest.mark.asyncio
+async def test_refresh_researches_again(fake_research, monkeypatch):
+    get_kg_store().put(URL, TEXT, node.research_model_key(), node.research_prompt_version(), KG)
+    monkeypatch.setenv("PEP2TC_KG_REFRESH", "1")
+
+    result = await node.research_node(AgentState(pep_url=URL, raw_pep_content=TEXT))
+
+    assert len(fake_research) == 1
+    assert result["knowledge_graph"].title == "PEP 9999 (researched)"
+    # The fresh graph replaced the stored one
+    monkeypatch.delenv("PEP2TC_KG_REFRESH")
+    assert (await node.research_node(AgentState(pep_url=URL, raw_pep_content=TEXT)))["knowledge_graph"].title == "PEP 9999 (researched)"
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("content", ["Error fetching PEP content: 503 Server Error", "  \n"])
+async def test_failed_fetch_is_never_stored_or_reused(fake_research, content):
+    get_kg_store().put(URL, content, node.research_model_key(), node.research_prompt_version(), KG)
+
+    await node.research_node(AgentState(pep_url=URL, raw_pep_content=content))
+    await node.research_node(AgentState(pep_url=URL, raw_pep_content=content))
+
+    assert len(fake_research) == 2
+    # The researched graph did not replace the one stored under the error text
+    assert get_kg_store().get(content, node.research_model_key(), node.research_prompt_version()) == KG
@@ -0,0 +1,88 @@
+import pytest
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+
+from pep2testcase.core.cache import LLMCacheMiss, SQLiteLLMCache, get_llm_cache
+from pep2testcase.core.llm import get_model
+
+class CountingModel(GenericFakeChatModel):
+    calls: int = 0
+
+    def _generate(self, *args, **kwargs):
+        self.calls += 1
+        return super()._generate(*args, **kwargs)
+
+def model(cache, *replies) -> CountingModel:
+    return CountingModel(messages=iter([AIMessage(content=r) for r in replies]), cache=cache)
+
+def test_hit_skips_the_model(tmp_path):
+    cache = SQLiteLLMCache(tmp_path / "llm.sqlite", max_bytes=1 << 20)
+    first = model(cache, "one", "two")
+    assert first.invoke([HumanMessage(content="hi")]).content == "one"
+    assert first.invoke([HumanMessage(content="hi")]).content == "one"
+    assert first.invoke([HumanMessage(content="other")]).content == "two"
+    assert first.calls == 2
+    assert cache.stats.hits == 1
+
+    # Persisted across processes
+    reopened = SQLiteLLMCache(tmp_path / "llm.sqlite", max_bytes=1 << 20)
+    second = model(reopened)
+    assert second.invoke([HumanMessage(content="hi")]).content == "one"
+    assert second.calls == 0
+
+def test_replay_fails_on_miss(tmp_path):
+    SQLiteLLMCache(tmp_path / "llm.sqlite", max_bytes=1 << 20)
+    replay = SQLiteLLMCache(tmp_path / "llm.sqlite", max_bytes=1 << 20, replay=True)
+    with pytest.raises(LLMCacheMiss):
+        model(replay, "never").invoke([HumanMessage(content="hi")])
+
+@pytest.mark.asyncio
+async def test_async_path_and_tool_calls(tmp_path):
+    cache = SQLiteLLMCache(tmp_path / "llm.sqlite", max_bytes=1 << 20)
+    reply = AIMessage(content="", tool_calls=[{"name": "lookup", "args": {"q": "pep 8"}, "id": "call_1"}])
+    m = CountingModel(messages=iter([reply]), cache=cache)
+    first = await m.ainvoke([HumanMessage(content="hi")])
+    second = await m.ainvoke([HumanMessage(content="hi")])
+    assert m.calls == 1
+    assert second.tool_calls == first.tool_calls
+
+def test_size_eviction(tmp_path):
+    cache = SQLiteLLMCache(tmp_path / "llm.sqlite", max_bytes=1 << 20)
+    m = model(cache, "a" * 1000, "b" * 1000, "c" * 1000)
+    m.invoke([HumanMessage(content="1")])
+    m.invoke([HumanMessage(content="2")])
+    entry_size = cache._conn.execute("SELECT MAX(size) FROM responses").fetchone()[0]
+    cache.max_bytes = 2 * entry_size + 10
+    m.invoke([HumanMessage(content="1")])  # hit: "2" is now least recently used
+    m.invoke([HumanMessage(content="3")])
+    assert cache.stats.evictions >= 1
+    assert len(cache) == 2
+    assert m.invoke([HumanMessage(content="1")]).content == "a" * 1000
+
+def test_get_model_keys_on_model_temperature_and_tools(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+    @tool
+    def lookup(q: str) -> str:
+        """Looks something up."""
+        return q
+
+    base = get_model()
+    assert isinstance(base.cache, SQLiteLLMCache)
+    assert base.cache is get_llm_cache()
+    keys = {
+        base._get_llm_string(),
+        get_model(temperature=0.7)._get_llm_string(),
+        base.bind_tools([lookup]).bound._get_llm_string(**base.bind_tools([lookup]).kwargs),
+    }
+    monkeypatch.setenv("OPENAI_MODEL_NAME", "other-model")
+    keys.add(get_model()._get_llm_string())
+    assert len(keys) == 4
+
+def test_cache_can_be_disabled_but_not_in_replay(monkeypatch):
+    monkeypatch.setenv("PEP2TC_LLM_CACHE", "0")
+    assert get_llm_cache() is None
+    monkeypatch.setenv("PEP2TC_LLM_REPLAY", "1")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    assert get_model().cache.replay
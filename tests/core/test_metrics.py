@@ -0,0 +1,110 @@
+import json
+
+import pytest
+from langchain.agents.middleware.types import ModelResponse
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from pep2testcase.cli.ui import UIManager
+from pep2testcase.core.cache import get_llm_cache
+from pep2testcase.core.metrics import MetricsRecorder, estimate_cost, model_prices
+from pep2testcase.core.middleware import MetricsMiddleware
+
+def reply(prompt: int, completion: int, cached: int = 0, tools: int = 0, model: str = "gpt-4o-2024-08-06") -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": "fetch_pep_content", "args": {}, "id": f"call_{i}"} for i in range(tools)],
+        usage_metadata={
+            "input_tokens": prompt,
+            "output_tokens": completion,
+            "total_tokens": prompt + completion,
+            "input_token_details": {"cache_read": cached},
+        },
+        response_metadata={"model_name": model},
+    )
+
+def test_cost_uses_snapshot_prices_and_override(monkeypatch):
+    assert model_prices("gpt-4o-mini-2024-07-18") == model_prices("gpt-4o-mini")
+    # 1M prompt tokens of which half cached, 1M completion tokens on gpt-4o
+    assert estimate_cost("gpt-4o", 1_000_000, 500_000, 1_000_000) == pytest.approx(1.25 + 0.625 + 10)
+    assert estimate_cost("unknown-model", 1000, 0, 1000) == 0
+    monkeypatch.setenv("PEP2TC_PRICE_PER_MTOK", "1,0.5,2")
+    assert estimate_cost("unknown-model", 1_000_000, 0, 1_000_000) == pytest.approx(3)
+
+def test_recorder_breaks_down_by_phase_and_agent(tmp_path):
+    metrics = MetricsRecorder("https://peps.python.org/pep-0008/")
+    metrics.record("research", "Lead Researcher", reply(1000, 100, cached=200, tools=2), 1.5)
+    metrics.record("research", "Sub Researcher", reply(500, 50), 0.5)
+    metrics.record("research", "Sub Researcher", reply(500, 50, tools=1), 0.5)
+    metrics.record("test_design", "Tester", reply(2000, 800), 3.0)
+
+    research = metrics.totals("research")
+    assert research.calls == 3
+    assert research.prompt_tokens == 2000
+    assert research.cached_tokens == 200
+    assert research.tool_calls == 3
+    assert research.latency_s == pytest.approx(2.5)
+    assert metrics.totals().completion_tokens == 1000
+
+    data = json.loads(metrics.write(tmp_path / "pep-0008" / "metrics.json").read_text())
+    assert data["pep_url"] == "https://peps.python.org/pep-0008/"
+    assert data["phases"]["research"]["agents"]["Sub Researcher"]["calls"] == 2
+    assert data["phases"]["test_design"]["totals"]["cost_usd"] > 0
+    assert data["totals"]["calls"] == 4
+
+def test_cached_call_adds_no_cost():
+    model = GenericFakeChatModel(messages=iter([reply(1000, 100)]), cache=get_llm_cache())
+    metrics = MetricsRecorder("https://peps.python.org/pep-0008/")
+    metrics.record("research", "Lead Researcher", model.invoke([HumanMessage(content="hi")]), 2.0)
+    # The cached response still carries the usage of the first call
+    metrics.record("research", "Lead Researcher", model.invoke([HumanMessage(content="hi")]), 0.01)
+
+    totals = metrics.totals()
+    assert (totals.calls, totals.cache_hits, totals.prompt_tokens) == (1, 1, 1000)
+    assert totals.cost_usd == pytest.approx(estimate_cost("gpt-4o", 1000, 0, 100))
+    assert "Cache hits: 1" in metrics.summary()
+
+def test_replayed_calls_add_no_cost(monkeypatch):
+    monkeypatch.setenv("PEP2TC_LLM_REPLAY", "1")
+    metrics = MetricsRecorder("https://peps.python.org/pep-0008/")
+    metrics.record("test_design", "Tester", reply(2000, 800), 0.01)
+
+    assert metrics.totals().as_dict() | {"latency_s": 0} == {
+        "calls": 0, "cache_hits": 1, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0,
+        "tool_calls": 0, "latency_s": 0, "cost_usd": 0,
+    }
+
+@pytest.mark.asyncio
+async def test_middleware_records_model_calls():
+    metrics = MetricsRecorder("https://peps.python.org/pep-0008/")
+    updates = []
+    metrics.listeners.append(lambda: updates.append(1))
+    middleware = MetricsMiddleware(metrics, agent_name="Sub Researcher", phase="research")
+
+    async def handler(request):
+        # Structured output adds a ToolMessage after the AIMessage
+        return ModelResponse(result=[reply(300, 30, tools=1), ToolMessage(content="ok", tool_call_id="call_0")])
+
+    await middleware.awrap_model_call(None, handler)
+
+    totals = metrics.totals()
+    assert (totals.calls, totals.prompt_tokens, totals.tool_calls) == (1, 300, 1)
+    assert updates == [1]
+
+@pytest.mark.asyncio
+async def test_middleware_without_recorder_is_a_no_op():
+    response = ModelResponse(result=[reply(1, 1)])
+
+    async def handler(request):
+        return response
+
+    assert await MetricsMiddleware(None).awrap_model_call(None, handler) is response
+
+def test_ui_header_shows_totals():
+    ui = UIManager("https://peps.python.org/pep-0008/")
+    metrics = MetricsRecorder(ui.url)
+    ui.attach_metrics(metrics)
+    metrics.record("research", "Lead Researcher", reply(1500, 20), 1.0)
+    assert "1.5k in" in metrics.summary()
+    header = ui._render_header()
+    assert header.renderable.row_count == 2
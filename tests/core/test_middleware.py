@@ -37,3 +37,97 @@ async def test_middleware_generic_tool_logging():
     # Verify "unknown_tool" was logged
     # add_log is called with a Panel. We can inspect the Panel content if needed,
     # but checking call count is enough to prove the "else" branch was taken.
+
+def _model_request(*tool_names):
+    from langchain_core.messages import HumanMessage
+    return ModelRequest(model=MagicMock(), messages=[HumanMessage(content="go")],
+                        tools=[{"name": name} for name in tool_names])
+
+def _task_call(i: int) -> dict:
+    return {"name": "task", "args": {"description": f"q{i}", "subagent_type": "research_subagent"}, "id": f"call-{i}"}
+
+@pytest.mark.asyncio
+async def test_scheduler_caps_delegation_rounds_and_forces_finish():
+    from langchain_core.messages import AIMessage
+    from pep2testcase.core.middleware import DelegationBudget, DelegationSchedulerMiddleware
+
+    budget = DelegationBudget(max_concurrent=2, max_rounds=1)
+    lead = DelegationSchedulerMiddleware(budget, agent_name="Lead Researcher")
+    seen = []
+
+    async def handler(request):
+        seen.append(request)
+        return AIMessage(content="", tool_calls=[_task_call(1)],
+                         usage_metadata={"input_tokens": 90, "output_tokens": 10, "total_tokens": 100})
+
+    await lead.awrap_model_call(_model_request("task", "fetch_pep_content"), handler)
+    assert (budget.rounds, budget.tokens) == (1, 100)
+    assert [t["name"] for t in seen[0].tools] == ["task", "fetch_pep_content"]
+
+    await lead.awrap_model_call(_model_request("task", "fetch_pep_content"), handler)
+    # The round limit is reached: the task tool is withdrawn and the lead is told to finish
+    assert [t["name"] for t in seen[1].tools] == ["fetch_pep_content"]
+    assert "Research budget exhausted" in seen[1].messages[-1].content
+
+    # A task call the lead issues anyway is refused without starting a sub-agent
+    from langchain.agents.middleware.types import ToolCallRequest
+
+    async def never(request):
+        raise AssertionError("sub-agent should not start")
+
+    refused = await lead.awrap_tool_call(ToolCallRequest(tool_call=_task_call(2), tool=None, state={}, runtime=None), never)
+    assert refused.content.startswith("Delegation refused: all 1 delegation rounds used")
+
+@pytest.mark.asyncio
+async def test_scheduler_bounds_sub_agents_in_flight():
+    import asyncio
+    from langchain_core.messages import ToolMessage
+    from langchain.agents.middleware.types import ToolCallRequest
+    from pep2testcase.core.middleware import DelegationBudget, DelegationSchedulerMiddleware
+
+    lead = DelegationSchedulerMiddleware(DelegationBudget(max_concurrent=2, max_rounds=3))
+    in_flight = peak = 0
+
+    async def run_sub_agent(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return ToolMessage(content="findings", tool_call_id=request.tool_call["id"])
+
+    requests = [ToolCallRequest(tool_call=_task_call(i), tool=None, state={}, runtime=None) for i in range(5)]
+    results = await asyncio.gather(*(lead.awrap_tool_call(r, run_sub_agent) for r in requests))
+
+    assert peak == 2
+    assert [m.content for m in results] == ["findings"] * 5
+
+@pytest.mark.asyncio
+async def test_scheduler_time_and_token_budgets():
+    from langchain_core.messages import AIMessage
+    from langchain.agents.middleware.types import ToolCallRequest
+    from pep2testcase.core.middleware import DelegationBudget, DelegationSchedulerMiddleware
+
+    now = [0.0]
+    budget = DelegationBudget(max_concurrent=3, max_rounds=3, max_seconds=60, max_tokens=1000, clock=lambda: now[0])
+    lead = DelegationSchedulerMiddleware(budget)
+    sub = DelegationSchedulerMiddleware(budget, agent_name="Sub Researcher", lead=False)
+    seen = []
+
+    async def handler(request):
+        seen.append(request)
+        return AIMessage(content="done")
+
+    async def never(request):
+        raise AssertionError("sub-agent should not start")
+
+    now[0] = 61.0
+    refused = await lead.awrap_tool_call(ToolCallRequest(tool_call=_task_call(1), tool=None, state={}, runtime=None), never)
+    assert "Delegation refused: time budget" in refused.content
+
+    # Sub-agents lose all tools once the budget is used up
+    await sub.awrap_model_call(_model_request("internet_search"), handler)
+    assert seen[-1].tools == []
+
+    budget.started, budget.tokens = now[0], 1000
+    assert "token budget" in budget.exhausted()
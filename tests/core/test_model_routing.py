@@ -0,0 +1,69 @@
+from unittest.mock import MagicMock
+
+import httpx
+import openai
+import pytest
+
+from pep2testcase.core.llm import get_fallback_model, get_model, model_name_for
+from pep2testcase.core.middleware import OverloadFallbackMiddleware
+
+@pytest.fixture(autouse=True)
+def api_key(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_MODEL_NAME", "gpt-4o")
+
+def test_roles_default_to_openai_model_name(monkeypatch):
+    assert {model_name_for(r) for r in ("lead", "sub", "tester")} == {"gpt-4o"}
+    monkeypatch.setenv("PEP2TC_MODEL_SUB", "gpt-4o-mini")
+    assert get_model(role="sub").model_name == "gpt-4o-mini"
+    assert get_model(role="lead").model_name == "gpt-4o"
+    with pytest.raises(ValueError):
+        get_model(role="critic")
+
+def test_fallback_model(monkeypatch):
+    assert get_fallback_model() is None
+    monkeypatch.setenv("PEP2TC_MODEL_FALLBACK", "gpt-4o-mini")
+    assert get_fallback_model(role="lead").model_name == "gpt-4o-mini"
+    # No point falling back to the model that just failed
+    monkeypatch.setenv("PEP2TC_MODEL_SUB", "gpt-4o-mini")
+    assert get_fallback_model(role="sub") is None
+
+def test_timeouts_and_retries_are_configurable(monkeypatch):
+    monkeypatch.setenv("PEP2TC_MODEL_TIMEOUT", "15")
+    monkeypatch.setenv("PEP2TC_MODEL_MAX_RETRIES", "0")
+    model = get_model(role="sub")
+    assert model.request_timeout == 15
+    assert model.max_retries == 0
+
+def overloaded() -> Exception:
+    return openai.APITimeoutError(request=httpx.Request("POST", "https://api.example.com/v1/chat/completions"))
+
+@pytest.mark.asyncio
+async def test_fallback_middleware_retries_on_overload():
+    fallback = MagicMock(model_name="gpt-4o-mini")
+    request = MagicMock()
+    request.override.return_value = "fallback-request"
+    seen = []
+
+    async def handler(req):
+        seen.append(req)
+        if req is request:
+            raise overloaded()
+        return "ok"
+
+    result = await OverloadFallbackMiddleware(fallback).awrap_model_call(request, handler)
+
+    assert result == "ok"
+    assert seen == [request, "fallback-request"]
+    request.override.assert_called_once_with(model=fallback)
+
+@pytest.mark.asyncio
+async def test_fallback_middleware_propagates_request_errors():
+    request = MagicMock()
+
+    async def handler(req):
+        raise ValueError("bad schema")
+
+    with pytest.raises(ValueError):
+        await OverloadFallbackMiddleware(MagicMock()).awrap_model_call(request, handler)
+    request.override.assert_not_called()
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from pep2testcase.core import http
+from pep2testcase.core.llm import get_model
+from pep2testcase.core.ratelimit import InFlightLimiter, RateLimiter, TokenBucket, estimate_request_tokens
+
+def test_token_bucket_reserves_in_arrival_order():
+    bucket = TokenBucket(per_minute=60)  # 1 token/s, burst of 60
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(1) == pytest.approx(1, abs=0.05)
+    assert bucket.reserve(1) == pytest.approx(2, abs=0.05)
+    bucket.adjust(10)
+    assert bucket.reserve(1) == 0
+
+def test_token_bucket_oversized_request_waits_for_full_bucket():
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(1000) == 0  # capped at the bucket size
+    assert bucket.reserve(1) > 0
+
+def test_estimate_includes_completion_budget():
+    body = json.dumps({"messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 50}).encode()
+    assert estimate_request_tokens(body) == len(body) // 4 + 50
+
+@pytest.mark.asyncio
+async def test_in_flight_cap_across_tasks_and_threads():
+    limiter = InFlightLimiter(2)
+    active = peak = 0
+    lock = threading.Lock()
+
+    def enter():
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+
+    def leave():
+        nonlocal active
+        with lock:
+            active -= 1
+
+    async def task():
+        await limiter.aacquire()
+        enter()
+        await asyncio.sleep(0.02)
+        leave()
+        limiter.release()
+
+    def thread_work():
+        limiter.acquire()
+        enter()
+        time.sleep(0.02)
+        leave()
+        limiter.release()
+
+    threads = [threading.Thread(target=thread_work) for _ in range(3)]
+    for t in threads:
+        t.start()
+    await asyncio.gather(*(task() for _ in range(6)))
+    await asyncio.to_thread(lambda: [t.join(5) for t in threads])
+
+    assert peak == 2
+    assert limiter.active == 0
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = InFlightLimiter(1)
+    await limiter.aacquire()
+    waiter = asyncio.create_task(limiter.aacquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    limiter.release()
+    assert limiter.active == 0
+
+def completion(tokens: int) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [], "usage": {"total_tokens": tokens}})
+
+@pytest.mark.asyncio
+async def test_transport_releases_slot_and_reconciles_usage():
+    limiter = RateLimiter(rpm=0, tpm=6000, max_in_flight=1)
+    transport = http.AsyncRateLimitedTransport(httpx.MockTransport(lambda r: completion(10)), limiter)
+    async with httpx.AsyncClient(transport=transport) as client:
+        body = {"messages": [{"role": "user", "content": "x" * 4000}]}
+        first = await client.post("https://api.example.com/v1/chat/completions", json=body)
+        assert first.json()["usage"]["total_tokens"] == 10
+        # The slot was released, so a second request does not block
+        await asyncio.wait_for(client.post("https://api.example.com/v1/chat/completions", json=body), 1)
+
+    assert limiter.in_flight.active == 0
+    # ~1000 tokens estimated per request, 10 actually used: the bucket got the difference back
+    assert limiter.tokens.tokens > 6000 - 100
+
+@pytest.mark.asyncio
+async def test_429_pauses_every_caller():
+    limiter = RateLimiter(rpm=0, tpm=0, max_in_flight=4)
+    responses = iter([httpx.Response(429, headers={"retry-after-ms": "200"}), completion(1)])
+    transport = http.AsyncRateLimitedTransport(httpx.MockTransport(lambda r: next(responses)), limiter)
+    async with httpx.AsyncClient(transport=transport) as client:
+        assert (await client.post("https://api.example.com/v1/chat/completions", json={})).status_code == 429
+        started = time.monotonic()
+        assert (await client.post("https://api.example.com/v1/chat/completions", json={})).status_code == 200
+    assert time.monotonic() - started >= 0.15
+
+@pytest.mark.asyncio
+async def test_request_cancelled_during_pause_gives_back_its_slot():
+    limiter = RateLimiter(rpm=0, tpm=0, max_in_flight=2)
+    transport = http.AsyncRateLimitedTransport(httpx.MockTransport(lambda r: completion(1)), limiter)
+    limiter.pause(5)
+    async with httpx.AsyncClient(transport=transport) as client:
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.post("https://api.example.com/v1/chat/completions", json={}), 0.05)
+        assert limiter.in_flight.active == 0
+
+        limiter._paused_until = 0.0
+        response = await asyncio.wait_for(client.post("https://api.example.com/v1/chat/completions", json={}), 1)
+    assert response.status_code == 200
+    assert limiter.in_flight.active == 0
+
+def test_sync_transport():
+    limiter = RateLimiter(rpm=0, tpm=0, max_in_flight=1)
+    transport = http.RateLimitedTransport(httpx.MockTransport(lambda r: completion(1)), limiter)
+    with httpx.Client(transport=transport) as client:
+        for _ in range(3):
+            client.post("https://api.example.com/v1/chat/completions", json={})
+    assert limiter.in_flight.active == 0
+
+@pytest.mark.asyncio
+async def test_get_model_shares_clients_and_limits(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    first = get_model()
+    assert get_model() is first
+    other = get_model(temperature=0.5)
+    assert other is not first
+    assert other.http_async_client is first.http_async_client is http.get_llm_async_client()
+    assert other.http_client is first.http_client
+    await http.aclose_clients()
+
+class ChunkedBody(httpx.AsyncByteStream):
+    def __init__(self, *chunks: bytes):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+@pytest.mark.asyncio
+async def test_streamed_body_holds_slot_until_closed():
+    limiter = RateLimiter(rpm=0, tpm=6000, max_in_flight=1)
+    body = ChunkedBody(b'{"choices": [], ', b'"usage": {"total_tokens": 5}}')
+    transport = http.AsyncRateLimitedTransport(
+        httpx.MockTransport(lambda r: httpx.Response(200, headers={"content-type": "application/json"}, stream=body)),
+        limiter,
+    )
+    async with httpx.AsyncClient(transport=transport) as client:
+        request = client.build_request("POST", "https://api.example.com/v1/chat/completions", json={})
+        response = await client.send(request, stream=True)
+        assert limiter.in_flight.active == 1
+        await response.aread()
+        await response.aclose()
+    assert limiter.in_flight.active == 0
+    # Estimated 0 tokens for an empty body; the 5 actually used are charged on close
+    assert limiter.tokens.tokens == pytest.approx(5995, abs=1)
@@ -0,0 +1,86 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from deepagents import create_deep_agent
+
+from pep2testcase.core.cache import ReportStore, StoredReport
+from pep2testcase.core.middleware import ReportMemoMiddleware
+
+PAGES = {"https://peps.python.org/pep-0484/": "PEP 484 -- Type Hints"}
+
+@tool
+def fetch_pep_content(url: str) -> str:
+    """Fetches a PEP."""
+    return PAGES[url]
+
+class ToolModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+def test_fingerprint_normalizes_instructions(tmp_path):
+    store = ReportStore(tmp_path / "reports.sqlite", ttl=3600)
+    fp = store.fingerprint("research_subagent", "Explain the basics of PEP 484 type hints.", "v1")
+    store.put(fp, "research_subagent", "PEP 484 basics", StoredReport(report="r"))
+
+    assert store.fingerprint("research_subagent", "  explain the basics of\npep 484 TYPE hints.", "v1") == fp
+    assert store.fingerprint("research_subagent", "Explain the basics of PEP 484 type hints.", "v2") != fp
+    assert store.get(fp).report == "r"
+    assert ReportStore(tmp_path / "reports.sqlite", ttl=0).get(fp) is None
+
+def test_fingerprint_keeps_word_order_and_small_words(tmp_path):
+    fingerprint = ReportStore(tmp_path / "reports.sqlite", ttl=3600).fingerprint
+    assert fingerprint("research_subagent", "Does __init_subclass__ override __set_name__?", "v1") != fingerprint(
+        "research_subagent", "Does __set_name__ override __init_subclass__?", "v1")
+    assert fingerprint("research_subagent", "Check PEP 487 with metaclasses", "v1") != fingerprint(
+        "research_subagent", "Check PEP 487 without metaclasses", "v1")
+
+def delegate(store: ReportStore, sub_runs: list):
+    """A lead that delegates one PEP 484 question; ``sub_runs`` records each sub-agent run."""
+    def sub_turns():
+        sub_runs.append(1)
+        yield AIMessage(content="", tool_calls=[
+            {"name": "fetch_pep_content", "args": {"url": "https://peps.python.org/pep-0484/"}, "id": "f1"},
+        ])
+        yield AIMessage(content=f"Report #{len(sub_runs)}: type hints are optional")
+
+    memo = dict(store=store, source_tools=[fetch_pep_content], version="v1")
+    lead_model = ToolModel(messages=iter([
+        AIMessage(content="", tool_calls=[{"name": "task", "id": "t1", "args": {
+            "description": "PEP 484 type hints basics", "subagent_type": "research_subagent",
+        }}]),
+        AIMessage(content="done"),
+    ]))
+    return create_deep_agent(
+        model=lead_model,
+        subagents=[{
+            "name": "research_subagent", "description": "d", "system_prompt": "s", "tools": [fetch_pep_content],
+            "model": ToolModel(messages=sub_turns()), "middleware": [ReportMemoMiddleware(**memo, lead=False)],
+        }],
+        middleware=[ReportMemoMiddleware(**memo)],
+    )
+
+@pytest.mark.asyncio
+async def test_repeated_delegation_is_served_until_sources_change(tmp_path):
+    store = ReportStore(tmp_path / "reports.sqlite", ttl=3600)
+    sub_runs = []
+
+    async def run() -> str:
+        result = await delegate(store, sub_runs).ainvoke({"messages": [("user", "research")]})
+        return next(m.content for m in result["messages"] if m.type == "tool" and m.name == "task")
+
+    assert await run() == "Report #1: type hints are optional"
+    stored = store.get(store.fingerprint("research_subagent", "PEP 484 type hints basics", "v1"))
+    assert [s["tool"] for s in stored.sources] == ["fetch_pep_content"]
+
+    # Same question, unchanged source: answered from the store, the sub-agent never runs
+    assert await run() == "Report #1: type hints are optional"
+    assert len(sub_runs) == 1
+
+    # The PEP changed: the stored report is invalidated and the sub-agent researches again
+    PAGES["https://peps.python.org/pep-0484/"] = "PEP 484 -- Type Hints (revised)"
+    try:
+        assert await run() == "Report #2: type hints are optional"
+        assert store.stats.invalidated == 1
+    finally:
+        PAGES["https://peps.python.org/pep-0484/"] = "PEP 484 -- Type Hints"
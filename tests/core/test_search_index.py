@@ -0,0 +1,46 @@
+from pep2testcase.core.search_index import BM25Index, make_snippet, tokenize
+
+def build() -> BM25Index:
+    index = BM25Index()
+    index.add("a", "https://a", "Tabs", "Use spaces, not tabs. Tabs are evil.", "1")
+    index.add("b", "https://b", "WSGI", "The WSGI application callable and the start_response callable.", "1")
+    index.add("c", "https://c", "Style", "Indentation: use 4 spaces per level.", "1")
+    return index
+
+def test_tokenize_drops_stop_words_and_zero_padding():
+    assert tokenize("The PEP-0008 style for tabs") == ["pep", "8", "style", "tabs"]
+
+def test_ranking():
+    results = build().search("tabs or spaces")
+    assert [doc.key for doc, _ in results] == ["a", "c"]
+    assert results[0][1] > results[1][1]
+    assert build().search("nonexistent words") == []
+
+def test_incremental_update_and_remove():
+    index = build()
+    index.add("c", "https://c", "Style", "Nothing about indentation here: callable", "2")
+    assert index.stamp("c") == "2"
+    assert [doc.key for doc, _ in index.search("spaces")] == ["a"]
+    assert {doc.key for doc, _ in index.search("callable")} == {"b", "c"}
+
+    assert index.remove("b")
+    assert not index.remove("b")
+    assert [doc.key for doc, _ in index.search("wsgi")] == []
+    assert "wsgi" not in index.postings
+
+def test_persistence(tmp_path):
+    path = tmp_path / "index.pickle"
+    build().save(path)
+    loaded = BM25Index.load(path)
+    assert len(loaded) == 3
+    assert loaded.stamp("b") == "1"
+    assert [doc.key for doc, _ in loaded.search("wsgi")] == ["b"]
+
+    path.write_bytes(b"garbage")
+    assert len(BM25Index.load(path)) == 0
+
+def test_snippet_centres_on_match():
+    text = "x " * 300 + "the start_response callable"
+    snippet = make_snippet(text, "start_response", width=60)
+    assert "start_response" in snippet
+    assert len(snippet) <= 60
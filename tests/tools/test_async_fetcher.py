@@ -0,0 +1,64 @@
+import asyncio
+import httpx
+import pytest
+from pep2testcase.core import http
+from pep2testcase.core.agents.tools import fetch_pep_tool
+from pep2testcase.core.agents.tools.fetcher import afetch_pep_content
+
+def html(body: str) -> bytes:
+    return f"<html><body><article class='content'><p>{body}</p></article></body></html>".encode()
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Routes the pooled AsyncClient through a mock transport that tracks concurrency."""
+    state = {"active": 0, "peak": 0, "calls": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        state["calls"] += 1
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.02)
+        state["active"] -= 1
+        if "missing" in request.url.path:
+            return httpx.Response(404, request=request)
+        return httpx.Response(200, content=html(request.url.path), headers={"ETag": '"x"'})
+
+    def make_client():
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    monkeypatch.setattr(http, "_make_async_client", make_client)
+    return state
+
+@pytest.mark.asyncio
+async def test_async_fetch_uses_cache(transport):
+    url = "https://peps.python.org/pep-0008/"
+    assert await afetch_pep_content(url) == "/pep-0008/"
+    assert await afetch_pep_content(url) == "/pep-0008/"
+    assert transport["calls"] == 1
+
+@pytest.mark.asyncio
+async def test_async_fetch_shares_one_client():
+    assert http.get_async_client() is http.get_async_client()
+
+@pytest.mark.asyncio
+async def test_concurrent_fetches_overlap_within_host_limit(transport, monkeypatch):
+    monkeypatch.setenv("PEP2TC_HTTP_PER_HOST_LIMIT", "3")
+    urls = [f"https://peps.python.org/pep-{i:04d}/" for i in range(8)]
+
+    results = await asyncio.gather(*(afetch_pep_content(u) for u in urls))
+
+    assert results == [f"/pep-{i:04d}/" for i in range(8)]
+    assert transport["peak"] == 3
+
+@pytest.mark.asyncio
+async def test_async_fetch_error(transport):
+    result = await afetch_pep_content("https://peps.python.org/missing/")
+    assert "Error fetching PEP content" in result
+    assert "404" in result
+
+@pytest.mark.asyncio
+async def test_tool_exposes_async_path(transport):
+    assert fetch_pep_tool.name == "fetch_pep_content"
+    result = await fetch_pep_tool.ainvoke({"url": "https://peps.python.org/pep-0001/"})
+    assert result == "/pep-0001/"
+    assert transport["calls"] == 1
@@ -0,0 +1,35 @@
+from pathlib import Path
+import pytest
+from pep2testcase.core.agents.tools.extract import (
+    available_extractors, extract_with_bs4, get_extractor
+)
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures" / "peps"
+PAGES = sorted(FIXTURES.glob("*.html"))
+
+@pytest.mark.parametrize("page", PAGES, ids=lambda p: p.name)
+def test_fast_backend_matches_reference(page):
+    if "lxml" not in available_extractors():
+        pytest.skip("lxml is not installed")
+    html = page.read_bytes()
+    assert get_extractor("lxml")(html) == extract_with_bs4(html)
+
+@pytest.mark.parametrize("backend", available_extractors())
+def test_content_selection(backend):
+    extract = get_extractor(backend)
+
+    legacy = extract((FIXTURES / "legacy-document.html").read_bytes())
+    assert legacy.startswith("PEP:")
+    assert "Hosted by python.org" not in legacy
+    assert "var trackers" not in legacy
+
+    article = extract(b"<html><body><nav>Menu</nav><article class='main content'><p>Body</p></article></body></html>")
+    assert article == "Body"
+
+    body = extract((FIXTURES / "pep-0008.html").read_bytes())
+    assert "Python Enhancement Proposals" in body
+    assert "localStorage" not in body
+
+def test_unknown_backend_falls_back(monkeypatch):
+    monkeypatch.setenv("PEP2TC_HTML_EXTRACTOR", "does-not-exist")
+    assert get_extractor() is extract_with_bs4
@@ -0,0 +1,88 @@
+import os
+import time
+import pytest
+from pep2testcase.core.agents.tools import fetcher
+from pep2testcase.core.agents.tools.fetcher import fetch_pep_content
+from pep2testcase.core.cache import get_fetch_cache
+
+URL = "https://peps.python.org/pep-0001/"
+
+def page(body: str) -> bytes:
+    return f"<html><body><article class='content'><p>{body}</p></article></body></html>".encode()
+
+def test_repeat_fetch_is_served_from_cache(requests_mock):
+    requests_mock.get(URL, content=page("PEP Purpose and Guidelines"), headers={"ETag": '"v1"'})
+
+    first = fetch_pep_content(URL)
+    second = fetch_pep_content(URL)
+
+    assert first == second == "PEP Purpose and Guidelines"
+    assert requests_mock.call_count == 1
+    stats = get_fetch_cache().stats
+    assert (stats.misses, stats.hits) == (1, 1)
+
+def test_stale_entry_is_revalidated(requests_mock, monkeypatch):
+    monkeypatch.setenv("PEP2TC_FETCH_CACHE_TTL", "0")
+    requests_mock.get(URL, content=page("Original"), headers={
+        "ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"
+    })
+    assert fetch_pep_content(URL) == "Original"
+
+    requests_mock.get(URL, status_code=304)
+    assert fetch_pep_content(URL) == "Original"
+
+    last = requests_mock.last_request
+    assert last.headers["If-None-Match"] == '"v1"'
+    assert last.headers["If-Modified-Since"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+    assert get_fetch_cache().stats.revalidated == 1
+
+def test_changed_page_replaces_entry(requests_mock, monkeypatch):
+    monkeypatch.setenv("PEP2TC_FETCH_CACHE_TTL", "0")
+    requests_mock.get(URL, content=page("Original"))
+    fetch_pep_content(URL)
+
+    requests_mock.get(URL, content=page("Revised"))
+    assert fetch_pep_content(URL) == "Revised"
+
+def test_identical_content_is_parsed_once(requests_mock, mocker):
+    other = "https://mirror.example.org/peps/pep-0001.html"
+    requests_mock.get(URL, content=page("Same bytes"))
+    requests_mock.get(other, content=page("Same bytes"))
+    extract = mocker.spy(fetcher, "extract_text")
+
+    fetch_pep_content(URL)
+    fetch_pep_content(other)
+
+    assert extract.call_count == 1
+
+def test_lru_eviction_drops_oldest_entry(requests_mock, monkeypatch):
+    urls = [f"https://peps.python.org/pep-000{i}/" for i in range(1, 4)]
+    for i, url in enumerate(urls):
+        requests_mock.get(url, content=page(f"Document number {i} " + "x" * 60))
+
+    fetch_pep_content(urls[0])
+    fetch_pep_content(urls[1])
+    # Room for two pages only, with the first one least recently used.
+    monkeypatch.setenv("PEP2TC_FETCH_CACHE_MAX_BYTES", str(get_fetch_cache().size_bytes() + 10))
+    cache = get_fetch_cache()
+    old = time.time() - 100
+    os.utime(cache._entry_path(urls[0]), (old, old))
+    fetch_pep_content(urls[2])
+
+    assert cache.get(urls[0]) is None
+    assert cache.get(urls[1]) is not None
+    assert cache.get(urls[2]) is not None
+    assert cache.stats.evictions == 1
+
+def test_errors_are_not_cached(requests_mock):
+    requests_mock.get(URL, status_code=404)
+    assert "404" in fetch_pep_content(URL)
+    assert get_fetch_cache().get(URL) is None
+
+def test_cache_can_be_disabled(requests_mock, monkeypatch):
+    monkeypatch.setenv("PEP2TC_FETCH_CACHE", "0")
+    requests_mock.get(URL, content=page("Uncached"))
+    fetch_pep_content(URL)
+    fetch_pep_content(URL)
+    assert requests_mock.call_count == 2
+    assert get_fetch_cache() is None
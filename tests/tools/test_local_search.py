@@ -0,0 +1,91 @@
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import requests_mock
+
+from pep2testcase.core.agents.tools.fetcher import fetch_pep_content
+from pep2testcase.core.agents.tools.local_search import LocalSearch, get_local_search
+from pep2testcase.core.agents.tools.search import internet_search
+from pep2testcase.core.corpus import PepCorpus, default_corpus_path
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures" / "peps"
+
+def test_corpus_results_use_search_format(monkeypatch):
+    monkeypatch.delenv("TAVILY_API_KEY", raising=False)
+    PepCorpus(default_corpus_path()).ingest(FIXTURES)
+
+    result = internet_search("WSGI start_response callable")
+
+    first = result.splitlines()[0]
+    assert first.startswith("- [PEP 3333")
+    assert "(https://peps.python.org/pep-3333/)" in first
+    assert first.endswith("...")
+    assert "Mock search result" not in result
+
+def test_indexes_fetch_cache_and_mirror(isolated_cache_dir, monkeypatch):
+    mirror = isolated_cache_dir / "mirror"
+    (mirror / "python-dev" / "2003-09").mkdir(parents=True)
+    (mirror / "python-dev" / "2003-09" / "msg1.txt").write_text("Subject: Web server gateway\n\nmiddleware stacking discussion")
+    url = "https://peps.python.org/pep-0008/"
+    with requests_mock.Mocker() as m:
+        m.get(url, content=(FIXTURES / "pep-0008.html").read_bytes())
+        fetch_pep_content(url)
+
+    search = get_local_search()
+    assert search.refresh(force=True) == 2
+
+    results = search.search("middleware stacking")
+    assert results[0][0].title == "Subject: Web server gateway"
+    assert results[0][0].url.startswith("file://")
+    assert search.search("indentation")[0][0].url == url
+
+def test_incremental_refresh(isolated_cache_dir, tmp_path):
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    doc = mirror / "note.md"
+    doc.write_text("# Notes\n\nfirst draft about generators")
+    (mirror / "other.md").write_text("# Other\n\ncoroutines")
+    index_path = tmp_path / "index.pickle"
+
+    search = LocalSearch(index_path, mirror, refresh_interval=0)
+    assert search.refresh() == 2
+    assert search.refresh() == 0
+
+    doc.write_text("# Notes\n\nsecond draft about decorators")
+    assert search.refresh() == 1
+    assert search.search("decorators")[0][0].key.endswith("note.md")
+    assert search.search("generators") == []
+
+    (mirror / "other.md").unlink()
+    search.refresh()
+    assert len(search.index) == 1
+
+    # The persisted index is reused by a new process
+    assert LocalSearch(index_path, mirror, refresh_interval=0).refresh() == 0
+
+def test_query_latency(monkeypatch):
+    PepCorpus(default_corpus_path()).ingest(FIXTURES)
+    search = get_local_search()
+    search.refresh()
+    started = time.perf_counter()
+    for _ in range(200):
+        search.index.search("application callable environ headers")
+    assert (time.perf_counter() - started) / 200 < 0.001
+
+def test_empty_index_falls_back_to_mock(monkeypatch):
+    monkeypatch.delenv("TAVILY_API_KEY", raising=False)
+    assert "Mock search result for 'PEP 8'" in internet_search("PEP 8")
+
+def test_tavily_backend_without_key(monkeypatch):
+    monkeypatch.delenv("TAVILY_API_KEY", raising=False)
+    monkeypatch.setenv("PEP2TC_SEARCH_BACKEND", "tavily")
+    assert "requires TAVILY_API_KEY" in internet_search("PEP 8")
+
+@patch("pep2testcase.core.agents.tools.search.TavilyClient")
+def test_local_backend_with_key(mock_tavily_cls, monkeypatch):
+    monkeypatch.setenv("TAVILY_API_KEY", "local-backend-key")
+    monkeypatch.setenv("PEP2TC_SEARCH_BACKEND", "local")
+    PepCorpus(default_corpus_path()).ingest(FIXTURES)
+    assert "pep-3333" in internet_search("WSGI")
+    mock_tavily_cls.assert_not_called()
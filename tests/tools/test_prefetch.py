@@ -0,0 +1,68 @@
+import asyncio
+from pathlib import Path
+import pytest
+from pep2testcase.core.agents.tools import fetcher
+from pep2testcase.core.agents.tools.fetcher import fetch_pep_content
+from pep2testcase.core.agents.tools.prefetch import find_pep_references, prefetch_references, prefetch_urls
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures" / "peps"
+
+def page(n: int) -> bytes:
+    return f"<html><body><article class='content'><p>PEP {n} body</p></article></body></html>".encode()
+
+def test_find_references_in_text_and_links():
+    text = "See PEP 484 and PEP-0526, also https://www.python.org/dev/peps/pep-0008/ and PEP 484 again. PEP 0 lists all."
+    html = b'<a href="../pep-0007/">C style</a><a href="../pep-0484/#generics">x</a>'
+
+    refs = find_pep_references(text, html, exclude=[8])
+
+    assert refs == [
+        "https://peps.python.org/pep-0484/",
+        "https://peps.python.org/pep-0526/",
+        "https://peps.python.org/pep-0007/",
+    ]
+
+def test_find_references_in_fixture():
+    html = (FIXTURES / "pep-3333.html").read_bytes()
+    refs = find_pep_references(fetcher.extract_text(html), html, exclude=[3333])
+    assert refs == [
+        "https://peps.python.org/pep-0333/",
+        "https://peps.python.org/pep-0444/",
+        "https://peps.python.org/pep-3116/",
+    ]
+
+@pytest.mark.asyncio
+async def test_prefetch_respects_concurrency(monkeypatch):
+    active = peak = 0
+
+    async def slow_fetch(url):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return "text"
+
+    monkeypatch.setattr("pep2testcase.core.agents.tools.prefetch.afetch_pep_content", slow_fetch)
+    fetched = await prefetch_urls([f"https://peps.python.org/pep-{i:04d}/" for i in range(10)], concurrency=3)
+
+    assert fetched == 10
+    assert peak == 3
+
+@pytest.mark.asyncio
+async def test_prefetched_peps_are_served_from_cache(async_pages, requests_mock):
+    for n in (484, 526):
+        async_pages[f"https://peps.python.org/pep-{n:04d}/"] = page(n)
+
+    urls = await prefetch_references("https://peps.python.org/pep-0008/", "Builds on PEP 484 and PEP 526.")
+    assert len(urls) == 2
+
+    # Sub-agent style sync fetches (with a different URL spelling) hit the cache
+    assert fetch_pep_content("https://peps.python.org/pep-484/") == "PEP 484 body"
+    assert fetch_pep_content("https://peps.python.org/pep-0526/") == "PEP 526 body"
+    assert requests_mock.call_count == 0
+
+@pytest.mark.asyncio
+async def test_prefetch_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("PEP2TC_PREFETCH", "0")
+    assert await prefetch_references("https://peps.python.org/pep-0008/", "PEP 484") == []
@@ -28,15 +28,16 @@ def test_internet_search_real_integration():
     assert "pep" in result.lower() or "python" in result.lower()
     assert "8" in result
 
-@patch.dict('os.environ', {}, clear=True)
-def test_internet_search_no_key_fallback():
+def test_internet_search_no_key_fallback(tmp_path):
     # We need to reload settings or patch the settings object because settings might have cached the env var
     # But our Settings class reads os.getenv every time in the property, so patch.dict on os.environ works!
     
     # However, we must ensure the key is actually gone.
     # The @patch.dict clears os.environ for the duration of this test.
     
-    result = internet_search("PEP 8")
+    # With no key the local index is searched; an empty cache dir means nothing is indexed.
+    with patch.dict('os.environ', {'PEP2TC_CACHE_DIR': str(tmp_path)}, clear=True):
+        result = internet_search("PEP 8")
     assert "Mock search result" in result
     assert "PEP 8" in result
 
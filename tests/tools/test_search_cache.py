@@ -0,0 +1,123 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pep2testcase.core.agents.tools import search
+from pep2testcase.core.agents.tools.search import internet_search
+from pep2testcase.core.cache import SearchCache, get_search_cache, normalize_query
+
+def test_normalize_query_ignores_case_whitespace_and_stop_words():
+    assert normalize_query("How does PEP 8 handle tabs?") == normalize_query("  pep 8   HANDLE tabs ")
+    assert normalize_query("the of a") == "the of a"
+    assert normalize_query("PEP 8 tabs") != normalize_query("PEP 8 spaces")
+
+def test_negated_queries_do_not_share_an_entry(tmp_path):
+    assert normalize_query("PEP 484 with generics") != normalize_query("PEP 484 without generics")
+    cache = SearchCache(tmp_path / "search.sqlite", ttl=60, max_entries=10)
+    cache.put("PEP 484 with generics", "with generics")
+    assert cache.get("PEP 484 without generics") is None
+
+def test_reversed_queries_do_not_share_an_entry(tmp_path):
+    cache = SearchCache(tmp_path / "search.sqlite", ttl=60, max_entries=10)
+    cache.put("convert int to str", "int to str")
+    cache.put("tabs vs spaces", "tabs first")
+
+    assert cache.get("convert str to int") is None
+    assert cache.get("spaces vs tabs") is None
+    assert cache.get("Convert int to str?") == "int to str"
+
+def test_ttl_expiry(tmp_path):
+    cache = SearchCache(tmp_path / "search.sqlite", ttl=0.05, max_entries=10)
+    cache.put("pep 8", "result")
+    assert cache.get("PEP 8") == "result"
+    time.sleep(0.06)
+    assert cache.get("pep 8") is None
+
+def test_lru_eviction(tmp_path):
+    cache = SearchCache(tmp_path / "search.sqlite", ttl=60, max_entries=2)
+    cache.put("one", "1")
+    cache.put("two", "2")
+    cache.get("one")  # "two" is now least recently used
+    cache.put("three", "3")
+    assert cache.get("two") is None
+    assert cache.get("one") == "1"
+    assert cache.stats.evictions == 1
+
+def test_persistence(tmp_path):
+    path = tmp_path / "search.sqlite"
+    SearchCache(path, ttl=60, max_entries=10).put("pep 8 tabs", "cached")
+    assert SearchCache(path, ttl=60, max_entries=10).get("PEP 8 tabs?") == "cached"
+    # Expired entries are dropped on load
+    assert SearchCache(path, ttl=0, max_entries=10).get("pep 8 tabs") is None
+
+def test_instances_sharing_a_file_keep_each_others_entries(tmp_path):
+    # Each worker process opens its own instance of the same file
+    path = tmp_path / "search.sqlite"
+    first, second = SearchCache(path, ttl=60, max_entries=10), SearchCache(path, ttl=60, max_entries=10)
+    first.put("pep 8 tabs", "tabs")
+    second.put("pep 257 docstrings", "docstrings")
+    first.put("pep 484 generics", "generics")
+
+    assert second.get("pep 8 tabs") == "tabs"
+    assert first.get("pep 257 docstrings") == "docstrings"
+    assert len(SearchCache(path, ttl=60, max_entries=10)) == 3
+
+def test_inflight_coalescing(tmp_path):
+    cache = SearchCache(tmp_path / "search.sqlite", ttl=60, max_entries=10)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "shared"
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(cache.get_or_compute("PEP 8", compute)))
+    owner.start()
+    started.wait(5)
+    waiters = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("pep  8", compute)))
+        for _ in range(3)
+    ]
+    for t in waiters:
+        t.start()
+    while cache.stats.coalesced < 3:
+        time.sleep(0.01)
+    release.set()
+    for t in [owner, *waiters]:
+        t.join(5)
+
+    assert results == ["shared"] * 4
+    assert len(calls) == 1
+
+def test_errors_are_not_cached(tmp_path):
+    cache = SearchCache(tmp_path / "search.sqlite", ttl=60, max_entries=10)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("pep 8", fail)
+    assert cache.get_or_compute("pep 8", lambda: "ok") == "ok"
+
+@patch("pep2testcase.core.agents.tools.search.TavilyClient")
+def test_internet_search_uses_cache_and_shared_client(mock_tavily_cls, monkeypatch):
+    monkeypatch.setenv("TAVILY_API_KEY", "cache-test-key")
+    monkeypatch.setattr(search, "_clients", {})
+    client = MagicMock()
+    client.search.return_value = {"results": [{"title": "PEP 8", "url": "https://peps.python.org/pep-0008/", "content": "Style"}]}
+    mock_tavily_cls.return_value = client
+
+    first = internet_search("PEP 8 style guide")
+    second = internet_search("the pep 8 style guide?")
+
+    assert first == second
+    assert "PEP 8" in first
+    assert client.search.call_count == 1
+    assert mock_tavily_cls.call_count == 1
+    assert get_search_cache().stats.hits == 1
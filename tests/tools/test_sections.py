@@ -0,0 +1,71 @@
+from pathlib import Path
+import pytest
+from pep2testcase.core.agents.researcher.node import build_primary_content
+from pep2testcase.core.agents.tools.sections import get_pep_section, resolve_pep_url
+from pep2testcase.core.sections import parse_rst_sections, parse_sections, render_toc
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures" / "peps"
+PEP_3333 = (FIXTURES / "pep-3333.html").read_bytes()
+URL = "https://peps.python.org/pep-3333/"
+
+def test_html_section_tree():
+    tree = parse_sections(PEP_3333, "html")
+
+    assert [s.id for s in tree.sections] == [
+        "preface-for-readers-of-pep-333", "abstract", "specification-overview",
+        "specification-details", "copyright",
+    ]
+    overview = tree.find("specification-overview")
+    assert [c.id for c in overview.children] == ["the-application-framework-side", "the-server-gateway-side"]
+    assert "MUST transmit" in overview.text
+    assert tree.preamble.startswith("PEP 3333")
+    assert "Table of Contents" not in tree.preamble
+
+def test_toc_lists_ids_by_level():
+    toc = render_toc(parse_sections(PEP_3333, "html"))
+    assert "- [abstract] Abstract" in toc
+    assert "  - [environ-variables] environ Variables" in toc
+
+def test_rst_section_tree():
+    source = "PEP: 1\nTitle: Demo\n\nAbstract\n========\n\nShort.\n\nSpecification\n=============\n\nIntro.\n\nSyntax\n------\n\nMUST parse.\n\nCopyright\n=========\n\nPublic domain.\n"
+    tree = parse_rst_sections(source)
+
+    assert tree.preamble == "PEP: 1\nTitle: Demo"
+    assert [s.id for s in tree.sections] == ["abstract", "specification", "copyright"]
+    spec = tree.find("specification")
+    assert spec.children[0].id == "syntax"
+    assert "MUST parse." in spec.text
+    assert "Public domain" not in spec.text
+
+def test_resolve_pep_url():
+    assert resolve_pep_url("484") == "https://peps.python.org/pep-0484/"
+    assert resolve_pep_url("PEP 8") == "https://peps.python.org/pep-0008/"
+    assert resolve_pep_url(URL) == URL
+
+def test_get_pep_section_tool(requests_mock):
+    requests_mock.get(URL, content=PEP_3333)
+
+    section = get_pep_section("3333", "the-server-gateway-side")
+    assert section.startswith("[the-server-gateway-side] The Server/Gateway Side")
+    assert "SHOULD NOT" in section
+
+    missing = get_pep_section("3333", "nope")
+    assert "not found" in missing and "abstract" in missing
+    # Second and third calls were served from the fetch cache
+    assert requests_mock.call_count == 1
+
+@pytest.mark.asyncio
+async def test_lead_prompt_uses_toc_for_large_peps(async_pages, monkeypatch):
+    async_pages[URL] = PEP_3333
+    raw = "x" * 100
+
+    monkeypatch.setenv("PEP2TC_LEAD_TOC_MIN_TOKENS", "0")
+    toc = await build_primary_content(URL, raw)
+    assert "<Primary PEP Table of Contents>" in toc
+    assert "[specification-overview]" in toc
+
+    monkeypatch.setenv("PEP2TC_LEAD_TOC_MIN_TOKENS", "100000")
+    assert "<Primary PEP Content>" in await build_primary_content(URL, raw)
+
+    monkeypatch.setenv("PEP2TC_LEAD_CONTEXT", "full")
+    assert "<Primary PEP Content>" in await build_primary_content(URL, raw)